@@ -0,0 +1,167 @@
+# Funções de Análise
+# Todas operam sobre a tabela fato (dados.carregar_fatos), que já traz Categoria,
+# PrecoUnitario, CategoriaPreco e Pais, portanto nenhuma delas faz merge.
+import pandas as pd
+
+from filtros import fatiar_periodo
+from instrumentacao import instrumentar
+
+
+def _anexar_atributos_produto(resumo, produtos):
+    produtos_indexados = produtos.drop_duplicates(subset=['CodigoProduto']).set_index('CodigoProduto')
+    atributos = produtos_indexados.reindex(resumo['CodigoProduto'].astype(str)).reset_index(drop=True)
+    return pd.concat([resumo.reset_index(drop=True), atributos], axis=1)
+
+
+@instrumentar
+def calcular_receita_total(itens_fatura):
+    return itens_fatura['ValorTotal'].sum()
+
+@instrumentar
+def calcular_receita_diaria(itens_fatura, start_date, end_date):
+    periodo = fatiar_periodo(itens_fatura, start_date, end_date)
+    receita_diaria = periodo.groupby(periodo['DataFatura'].dt.normalize())['ValorTotal'].sum()
+    receita_diaria.index = receita_diaria.index.date
+    receita_diaria.index.name = 'DataFatura'
+    return receita_diaria
+
+@instrumentar
+def calcular_receita_mensal(itens_fatura):
+    receita_mensal = itens_fatura.groupby(itens_fatura['DataFatura'].dt.to_period('M'))['ValorTotal'].sum()
+    return receita_mensal
+
+@instrumentar
+def calcular_receita_por_pais(itens_fatura):
+    if 'Pais' not in itens_fatura.columns:
+        return pd.Series()
+    receita_pais = itens_fatura.groupby('Pais', observed=True)['ValorTotal'].sum()
+    return receita_pais
+
+@instrumentar
+def calcular_clientes_unicos(itens_fatura):
+    return itens_fatura['IDCliente'].nunique()
+
+@instrumentar
+def calcular_top_clientes(itens_fatura, n=100):
+    top_clientes = itens_fatura.groupby('IDCliente')['ValorTotal'].sum().nlargest(n).reset_index()
+    top_clientes['IDCliente'] = top_clientes['IDCliente'].astype(str)
+    return top_clientes
+
+@instrumentar
+def calcular_frequencia_compras(itens_fatura):
+    frequencia = itens_fatura.groupby('IDCliente').size()
+    return frequencia
+
+@instrumentar
+def calcular_produtos_mais_vendidos(itens_fatura, produtos):
+    vendidos = itens_fatura.groupby('CodigoProduto', observed=True)['Quantidade'].sum().nlargest(10).reset_index()
+    return _anexar_atributos_produto(vendidos, produtos)
+
+@instrumentar
+def calcular_produtos_melhor_desempenho(itens_fatura, produtos):
+    desempenho = itens_fatura.groupby('CodigoProduto', observed=True)['ValorTotal'].sum().nlargest(10).reset_index()
+    return _anexar_atributos_produto(desempenho, produtos)
+
+@instrumentar
+def calcular_produtos_mais_devolvidos(itens_fatura, produtos):
+    devolvidos = itens_fatura[itens_fatura['Devolucao']].groupby('CodigoProduto', observed=True)['Quantidade'].sum().nlargest(10).reset_index()
+    return _anexar_atributos_produto(devolvidos, produtos)
+
+@instrumentar
+def calcular_numero_transacoes(itens_fatura):
+    return itens_fatura['NumeroFatura'].nunique()
+
+@instrumentar
+def calcular_transacoes_com_devolucoes(itens_fatura):
+    return itens_fatura.loc[itens_fatura['Devolucao'], 'NumeroFatura'].nunique()
+
+@instrumentar
+def calcular_ticket_medio(itens_fatura):
+    return itens_fatura['ValorTotal'].mean()
+
+@instrumentar
+def calcular_variacao_sazonal(itens_fatura):
+    variacao = itens_fatura.groupby(itens_fatura['DataFatura'].dt.month)['ValorTotal'].sum()
+    return variacao
+
+@instrumentar
+def calcular_tendencia_vendas(itens_fatura):
+    tendencia = itens_fatura.groupby(itens_fatura['DataFatura'].dt.to_period('M'))['ValorTotal'].sum()
+    return tendencia
+
+
+# Motor de indicadores: calcula todos os indicadores da página em uma única passada
+# agrupada por chave (cliente, produto, fatura, dia, país); mês e sazonalidade saem
+# da série diária. Retorna um dicionário com os mesmos resultados das funções acima.
+# Com incluir_series=False as séries de receita (diária, mensal, por país, sazonal) são
+# omitidas, para quando elas vêm do cubo pré-agregado.
+@instrumentar
+def calcular_indicadores(itens_fatura, produtos, start_date=None, end_date=None, n_top_clientes=100, incluir_series=True):
+    valor = itens_fatura['ValorTotal']
+    devolucao = itens_fatura['Devolucao']
+
+    por_cliente = itens_fatura.groupby('IDCliente')['ValorTotal'].agg(['sum', 'size'])
+    top_clientes = por_cliente['sum'].nlargest(n_top_clientes).rename('ValorTotal').reset_index()
+    top_clientes['IDCliente'] = top_clientes['IDCliente'].astype(str)
+    frequencia = por_cliente['size']
+    frequencia.name = None
+
+    por_produto = pd.DataFrame({
+        'CodigoProduto': itens_fatura['CodigoProduto'],
+        'Quantidade': itens_fatura['Quantidade'],
+        'ValorTotal': valor,
+        'QuantidadeDevolvida': itens_fatura['Quantidade'].where(devolucao, 0),
+        'Devolucoes': devolucao,
+    }).groupby('CodigoProduto', observed=True).sum()
+    vendidos = por_produto['Quantidade'].nlargest(10).reset_index()
+    desempenho = por_produto['ValorTotal'].nlargest(10).reset_index()
+    devolvidos = por_produto.loc[por_produto['Devolucoes'] > 0, 'QuantidadeDevolvida'].nlargest(10)
+    devolvidos = devolvidos.rename('Quantidade').reset_index()
+
+    por_fatura = devolucao.groupby(itens_fatura['NumeroFatura'], sort=False).any()
+
+    indicadores = {
+        'receita_total': valor.sum(),
+        'clientes_unicos': len(por_cliente),
+        'top_clientes': top_clientes,
+        'frequencia_compras': frequencia,
+        'produtos_mais_vendidos': _anexar_atributos_produto(vendidos, produtos),
+        'produtos_melhor_desempenho': _anexar_atributos_produto(desempenho, produtos),
+        'produtos_mais_devolvidos': _anexar_atributos_produto(devolvidos, produtos),
+        'numero_transacoes': len(por_fatura),
+        'transacoes_com_devolucoes': int(por_fatura.sum()),
+        'ticket_medio': valor.mean(),
+    }
+    if incluir_series:
+        indicadores.update(_calcular_series_receita(itens_fatura, start_date, end_date))
+    return indicadores
+
+
+def _calcular_series_receita(itens_fatura, start_date, end_date):
+    valor = itens_fatura['ValorTotal']
+    por_dia = valor.groupby(itens_fatura['DataFatura'].dt.normalize()).sum()
+    receita_diaria = por_dia
+    if start_date is not None or end_date is not None:
+        inicio = pd.Timestamp(start_date) if start_date is not None else None
+        fim = pd.Timestamp(end_date) if end_date is not None else None
+        receita_diaria = por_dia.loc[inicio:fim]
+    receita_diaria = receita_diaria.copy()
+    receita_diaria.index = receita_diaria.index.date
+    receita_diaria.index.name = 'DataFatura'
+    receita_mensal = por_dia.groupby(por_dia.index.to_period('M')).sum()
+    receita_mensal.index.name = 'DataFatura'
+    variacao_sazonal = por_dia.groupby(por_dia.index.month).sum()
+    variacao_sazonal.index.name = 'DataFatura'
+
+    if 'Pais' in itens_fatura.columns:
+        receita_por_pais = valor.groupby(itens_fatura['Pais'], observed=True).sum()
+    else:
+        receita_por_pais = pd.Series()
+
+    return {
+        'receita_diaria': receita_diaria,
+        'receita_mensal': receita_mensal,
+        'receita_por_pais': receita_por_pais,
+        'variacao_sazonal': variacao_sazonal,
+        'tendencia_vendas': receita_mensal,
+    }
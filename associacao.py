@@ -0,0 +1,205 @@
+# Regras de associação entre produtos (análise de cesta)
+# Cada fatura é uma cesta com os produtos vendidos nela (linhas de devolução ficam de
+# fora). Os conjuntos frequentes são minerados com Eclat vertical: cada produto guarda as
+# suas faturas como um bitset (uma linha de palavras de 64 bits por produto) e o suporte
+# de um conjunto é a contagem de bits do AND dos bitsets. Produtos abaixo do suporte
+# mínimo são descartados antes de montar os bitsets e só prefixos frequentes são
+# estendidos. Cada produto inicial define uma classe independente, e as classes são
+# divididas entre processos.
+#
+# Uso: python associacao.py [--pais Germany] [--categoria "..."] [--suporte 0.01]
+#                           [--confianca 0.3] [--processos 4] [--saida regras.csv]
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from cache_resultados import chave_filtros, obter_cache_resultados
+from dados import versao_dados
+from filtros import obter_motor
+
+SUPORTE_MINIMO = 0.01
+CONFIANCA_MINIMA = 0.3
+FATURAS_MINIMAS = 5
+TAMANHO_MAXIMO = 3
+# Limite de palavras de 64 bits por interseção em bloco (~64 MB)
+PALAVRAS_POR_BLOCO = 8_000_000
+SEPARADOR = ' + '
+
+if hasattr(np, 'bitwise_count'):
+    def _contar_bits(palavras):
+        return np.bitwise_count(palavras).sum(axis=-1, dtype='int64')
+else:
+    _BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype='uint8')[:, None], axis=1).sum(axis=1)
+
+    def _contar_bits(palavras):
+        return _BITS_POR_BYTE[palavras.view('uint8')].sum(axis=-1, dtype='int64')
+
+
+# Itens vendidos (sem devoluções) do país e da categoria escolhidos
+def cestas(fatos, pais=None, categoria=None):
+    itens = obter_motor(fatos).filtrar(pais=pais, categoria=categoria)
+    return itens.loc[~itens['Devolucao'], ['NumeroFatura', 'CodigoProduto']]
+
+
+# Bitsets dos produtos frequentes, em ordem crescente de suporte
+def construir_bitsets(itens, faturas_minimas):
+    codigos_fatura, faturas = pd.factorize(itens['NumeroFatura'])
+    codigos_produto, produtos = pd.factorize(itens['CodigoProduto'].astype(str))
+    n_faturas = len(faturas)
+    # Um par (produto, fatura) por produto presente na fatura
+    pares = np.unique(codigos_produto.astype('int64') * n_faturas + codigos_fatura)
+    produto_par, fatura_par = np.divmod(pares, n_faturas)
+    suportes = np.bincount(produto_par, minlength=len(produtos))
+    frequentes = np.flatnonzero(suportes >= faturas_minimas)
+    frequentes = frequentes[np.argsort(suportes[frequentes], kind='stable')]
+    linha = np.full(len(produtos), -1, dtype='int64')
+    linha[frequentes] = np.arange(len(frequentes))
+    manter = linha[produto_par] >= 0
+    n_palavras = (n_faturas + 63) // 64
+    bitsets = np.zeros((len(frequentes), n_palavras), dtype='uint64')
+    fatura_par = fatura_par[manter]
+    np.bitwise_or.at(
+        bitsets,
+        (linha[produto_par[manter]], fatura_par >> 6),
+        np.left_shift(np.uint64(1), (fatura_par & 63).astype('uint64')),
+    )
+    return bitsets, pd.Index(produtos[frequentes]), suportes[frequentes], n_faturas
+
+
+# Estado de cada processo do pool: bitsets e parâmetros da mineração
+_contexto = None
+
+
+def _iniciar(bitsets, faturas_minimas, tamanho_maximo):
+    global _contexto
+    _contexto = (bitsets, faturas_minimas, tamanho_maximo)
+
+
+# Conjuntos frequentes (de 2 itens em diante) que começam pelo produto `primeiro`
+def minerar_classe(primeiro):
+    bitsets, faturas_minimas, tamanho_maximo = _contexto
+    bloco = max(1, PALAVRAS_POR_BLOCO // max(1, bitsets.shape[1]))
+    encontrados = []
+    pilha = [((primeiro,), bitsets[primeiro], np.arange(primeiro + 1, len(bitsets)))]
+    while pilha:
+        prefixo, bits, candidatos = pilha.pop()
+        extensoes, suportes, intersecoes = [], [], []
+        for inicio in range(0, len(candidatos), bloco):
+            parte = candidatos[inicio:inicio + bloco]
+            intersecao = bitsets[parte] & bits
+            contagens = _contar_bits(intersecao)
+            frequentes = contagens >= faturas_minimas
+            extensoes.append(parte[frequentes])
+            suportes.append(contagens[frequentes])
+            if len(prefixo) + 1 < tamanho_maximo:
+                intersecoes.append(intersecao[frequentes])
+        extensoes = np.concatenate(extensoes) if extensoes else np.empty(0, dtype='int64')
+        suportes = np.concatenate(suportes) if suportes else np.empty(0, dtype='int64')
+        for item, suporte in zip(extensoes.tolist(), suportes.tolist()):
+            encontrados.append((prefixo + (item,), suporte))
+        if len(prefixo) + 1 < tamanho_maximo and len(extensoes) > 1:
+            intersecoes = np.concatenate(intersecoes)
+            # Cada extensão só combina com as que vêm depois dela (classe de equivalência)
+            for posicao in range(len(extensoes) - 1):
+                pilha.append((prefixo + (int(extensoes[posicao]),), intersecoes[posicao], extensoes[posicao + 1:]))
+    return encontrados
+
+
+def conjuntos_frequentes(bitsets, suportes, faturas_minimas, tamanho_maximo=TAMANHO_MAXIMO, processos=None):
+    conjuntos = [((item,), int(suporte)) for item, suporte in enumerate(suportes.tolist())]
+    classes = range(len(bitsets))
+    processos = processos or os.cpu_count()
+    if processos == 1 or len(bitsets) < 2:
+        _iniciar(bitsets, faturas_minimas, tamanho_maximo)
+        for primeiro in classes:
+            conjuntos.extend(minerar_classe(primeiro))
+        return conjuntos
+    # Os primeiros produtos (menor suporte) têm mais candidatos; lotes pequenos equilibram o pool
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar,
+                             initargs=(bitsets, faturas_minimas, tamanho_maximo)) as executor:
+        for encontrados in executor.map(minerar_classe, classes, chunksize=max(1, len(bitsets) // (processos * 8))):
+            conjuntos.extend(encontrados)
+    return conjuntos
+
+
+def gerar_regras(conjuntos, produtos, n_faturas, confianca_minima=CONFIANCA_MINIMA):
+    suporte = dict(conjuntos)
+    linhas = []
+    for conjunto, contagem in conjuntos:
+        if len(conjunto) < 2:
+            continue
+        for tamanho in range(1, len(conjunto)):
+            for antecedente in combinations(conjunto, tamanho):
+                confianca = contagem / suporte[antecedente]
+                if confianca < confianca_minima:
+                    continue
+                consequente = tuple(item for item in conjunto if item not in antecedente)
+                linhas.append((
+                    SEPARADOR.join(produtos[list(antecedente)]),
+                    SEPARADOR.join(produtos[list(consequente)]),
+                    contagem,
+                    contagem / n_faturas,
+                    confianca,
+                    confianca * n_faturas / suporte[consequente],
+                ))
+    regras = pd.DataFrame(linhas, columns=['Antecedente', 'Consequente', 'Faturas', 'Suporte', 'Confianca', 'Lift'])
+    return regras.sort_values(['Lift', 'Confianca'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def minerar_regras(fatos, pais=None, categoria=None, suporte_minimo=SUPORTE_MINIMO,
+                   confianca_minima=CONFIANCA_MINIMA, tamanho_maximo=TAMANHO_MAXIMO, processos=None):
+    itens = cestas(fatos, pais, categoria)
+    n_faturas = itens['NumeroFatura'].nunique()
+    faturas_minimas = max(FATURAS_MINIMAS, math.ceil(suporte_minimo * n_faturas))
+    bitsets, produtos, suportes, n_faturas = construir_bitsets(itens, faturas_minimas)
+    conjuntos = conjuntos_frequentes(bitsets, suportes, faturas_minimas, tamanho_maximo, processos)
+    return gerar_regras(conjuntos, produtos, n_faturas, confianca_minima)
+
+
+# Regras em que o produto aparece no antecedente
+def regras_do_produto(regras, codigo):
+    antecedentes = regras['Antecedente'].str.split(SEPARADOR, regex=False)
+    return regras[antecedentes.map(lambda itens: str(codigo) in itens)]
+
+
+# Regras por país e categoria para o dashboard, pelo cache de resultados (limitado e por
+# versão dos dados). Os limites são arredondados, para que os valores dos sliders que
+# diferem só na representação em ponto flutuante usem a mesma entrada.
+def obter_regras(fatos, pais=None, categoria=None, suporte_minimo=SUPORTE_MINIMO, confianca_minima=CONFIANCA_MINIMA):
+    suporte_minimo, confianca_minima = round(float(suporte_minimo), 4), round(float(confianca_minima), 3)
+    chave = ('regras',) + chave_filtros(pais=pais, categoria=categoria) + (suporte_minimo, confianca_minima)
+    return obter_cache_resultados().obter(
+        versao_dados('clientes', 'itens_fatura', 'produtos'), chave,
+        lambda: minerar_regras(fatos, pais, categoria, suporte_minimo, confianca_minima, processos=1),
+    )
+
+
+if __name__ == '__main__':
+    from dados import carregar_fatos
+
+    parser = argparse.ArgumentParser(description='Regras de associação entre produtos comprados na mesma fatura.')
+    parser.add_argument('--pais')
+    parser.add_argument('--categoria')
+    parser.add_argument('--suporte', type=float, default=SUPORTE_MINIMO, help='fração mínima de faturas')
+    parser.add_argument('--confianca', type=float, default=CONFIANCA_MINIMA)
+    parser.add_argument('--tamanho-maximo', type=int, default=TAMANHO_MAXIMO, help='itens por conjunto')
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    parser.add_argument('--saida', help='gravar as regras (.csv ou .parquet)')
+    args = parser.parse_args()
+
+    fatos = carregar_fatos()
+    inicio = time.perf_counter()
+    regras = minerar_regras(fatos, args.pais, args.categoria, args.suporte, args.confianca, args.tamanho_maximo, args.processos)
+    print(regras.head(30).to_string(index=False))
+    print(f'{len(regras)} regras em {time.perf_counter() - inicio:.2f} s')
+    if args.saida:
+        if args.saida.endswith('.parquet'):
+            regras.to_parquet(args.saida, index=False)
+        else:
+            regras.to_csv(args.saida, index=False)
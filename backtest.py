@@ -0,0 +1,120 @@
+# Backtest com origem móvel da previsão de vendas
+# Para cada origem (a cada --passo dias, depois de um mínimo de histórico), cada modelo é
+# treinado só com os dias até a origem e avaliado nos 1 a 3 meses seguintes, como no
+# slider do dashboard. Um único ajuste por (modelo, origem) atende todos os horizontes.
+# A matriz de atributos da série inteira é montada uma vez por processo e cada dobra usa
+# fatias dela. As dobras rodam em paralelo em um pool de processos.
+#
+# Uso: python backtest.py [--modelos linear gradiente] [--horizontes 1 2 3] [--passo 30]
+#                         [--processos 4] [--saida resultado.csv]
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dados import carregar_fatos
+from previsao import DIAS_POR_MES, MODELOS, Previsor, erros, serie_diaria
+
+HISTORICO_MINIMO = 120
+
+# Estado de cada processo do pool: série, matriz de atributos e posições de cada dia
+_contexto = None
+
+
+def _iniciar(serie):
+    global _contexto
+    base = Previsor('linear').preparar(serie)
+    X = base.atributos(serie['Dia'], serie['Categoria'])
+    dias = serie['Dia'].to_numpy()
+    _contexto = {
+        'serie': serie,
+        'X': X,
+        'y': serie['ValorTotal'].to_numpy(),
+        'dias': dias,
+        'base': base,
+        'total_diario': serie.groupby('Dia')['ValorTotal'].sum(),
+    }
+
+
+def avaliar_dobra(modelo, origem, horizontes):
+    serie, X, y, dias = _contexto['serie'], _contexto['X'], _contexto['y'], _contexto['dias']
+    # A série está ordenada por dia: o treino é um prefixo da matriz
+    fim_treino = np.searchsorted(dias, np.datetime64(origem), side='right')
+    previsor = Previsor(modelo, n_jobs=1)
+    previsor.categorias, previsor.inicio = _contexto['base'].categorias, _contexto['base'].inicio
+    previsor.ajustar(X[:fim_treino], y[:fim_treino], origem)
+
+    maior = max(horizontes) * DIAS_POR_MES
+    fim_teste = np.searchsorted(dias, np.datetime64(origem + pd.Timedelta(days=maior)), side='right')
+    inicio = time.perf_counter()
+    previsto = previsor.modelo.predict(X[fim_treino:fim_teste])
+    segundos_previsao = time.perf_counter() - inicio
+    previsto_diario = pd.Series(previsto).groupby(serie['Dia'].iloc[fim_treino:fim_teste].to_numpy()).sum()
+    real_diario = _contexto['total_diario']
+
+    resultados = []
+    ultimo_dia = dias[-1]
+    for horizonte in horizontes:
+        limite = origem + pd.Timedelta(days=horizonte * DIAS_POR_MES)
+        if np.datetime64(limite) > ultimo_dia:
+            continue
+        previsto_h = previsto_diario[previsto_diario.index <= limite]
+        resultados.append({
+            'modelo': modelo,
+            'horizonte_meses': horizonte,
+            'origem': origem.date().isoformat(),
+            'segundos_treino': previsor.segundos_treino,
+            'segundos_previsao': segundos_previsao,
+            **erros(real_diario.reindex(previsto_h.index).to_numpy(), previsto_h.to_numpy()),
+        })
+    return resultados
+
+
+def origens(serie, passo=DIAS_POR_MES, historico_minimo=HISTORICO_MINIMO, horizonte_minimo=1):
+    primeiro, ultimo = serie['Dia'].min(), serie['Dia'].max()
+    return list(pd.date_range(
+        primeiro + pd.Timedelta(days=historico_minimo),
+        ultimo - pd.Timedelta(days=horizonte_minimo * DIAS_POR_MES),
+        freq=f'{passo}D',
+    ))
+
+
+def executar(serie, modelos, horizontes=(1, 2, 3), passo=DIAS_POR_MES, processos=None):
+    tarefas = [(modelo, origem) for modelo in modelos for origem in origens(serie, passo, horizonte_minimo=min(horizontes))]
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar, initargs=(serie,)) as executor:
+        futuros = [executor.submit(avaliar_dobra, modelo, origem, list(horizontes)) for modelo, origem in tarefas]
+        dobras = [linha for futuro in futuros for linha in futuro.result()]
+    return pd.DataFrame(dobras)
+
+
+# Tabela comparativa: média das dobras por modelo e horizonte
+def resumir(dobras):
+    return dobras.groupby(['modelo', 'horizonte_meses']).agg(
+        dobras=('origem', 'size'),
+        mae=('mae', 'mean'),
+        rmse=('rmse', 'mean'),
+        mape=('mape', 'mean'),
+        segundos_treino=('segundos_treino', 'mean'),
+        segundos_previsao=('segundos_previsao', 'mean'),
+    ).reset_index()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backtest com origem móvel dos modelos de previsão de vendas.')
+    parser.add_argument('--modelos', nargs='+', default=list(MODELOS), choices=list(MODELOS))
+    parser.add_argument('--horizontes', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--passo', type=int, default=DIAS_POR_MES, help='dias entre origens consecutivas')
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    parser.add_argument('--saida', help='CSV com o resultado de cada dobra')
+    args = parser.parse_args()
+
+    serie = serie_diaria(carregar_fatos())
+    inicio = time.perf_counter()
+    dobras = executar(serie, args.modelos, args.horizontes, args.passo, args.processos)
+    print(resumir(dobras).to_string(index=False))
+    print(f'{len(dobras)} avaliações em {time.perf_counter() - inicio:.2f} s')
+    if args.saida:
+        dobras.to_csv(args.saida, index=False)
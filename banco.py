@@ -0,0 +1,196 @@
+# Banco analítico embutido (SQLite)
+# Substituto local do PostgreSQL: as três tabelas (clientes, produtos, itens_fatura) são
+# gravadas em um arquivo SQLite versionado pelo conteúdo dos CSVs, sem servidor. As
+# consultas que geraram consultas_SQL_CSV/ ficam em consultas_sql/<nome>.sql e leem a
+# tabela "itens", definida em consultas_sql/_itens_filtrados.sql com os filtros da barra
+# lateral como parâmetros (:inicio, :fim, :pais, :categoria, :faixa_preco).
+#
+# Construção:              python banco.py
+# Regenerar os CSVs:       python banco.py --regenerar [consultas_SQL_CSV]
+# Executar uma consulta:   python banco.py --consulta receita_mensal --pais Germany
+import argparse
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+from cache_resultados import chave_filtros, obter_cache_resultados
+from dados import DIRETORIO_CACHE, carregar_tabela, versao_dados
+from filtros import FAIXAS_PRECO, codificar_faixa_preco
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_CONSULTAS = os.path.join(DIRETORIO, 'consultas_sql')
+DIRETORIO_RESULTADOS = os.path.join(DIRETORIO, 'consultas_SQL_CSV')
+CONSULTA_BASE = '_itens_filtrados'
+VERSAO_FORMATO_BANCO = 1
+
+ESQUEMA = """
+CREATE TABLE clientes (
+    IDCliente INTEGER PRIMARY KEY,
+    Pais TEXT
+);
+CREATE TABLE produtos (
+    CodigoProduto TEXT PRIMARY KEY,
+    Descricao TEXT,
+    Categoria TEXT,
+    PrecoUnitario REAL,
+    CategoriaPreco TEXT,
+    FaixaPreco INTEGER
+);
+CREATE TABLE itens_fatura (
+    NumeroFatura TEXT,
+    CodigoProduto TEXT,
+    IDCliente INTEGER,
+    DataFatura TEXT,
+    Quantidade INTEGER,
+    ValorTotal REAL,
+    Venda INTEGER,
+    Devolucao INTEGER
+);
+"""
+
+INDICES = """
+CREATE INDEX itens_data ON itens_fatura (DataFatura);
+CREATE INDEX itens_cliente ON itens_fatura (IDCliente);
+CREATE INDEX itens_produto ON itens_fatura (CodigoProduto);
+ANALYZE;
+"""
+
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+
+def _tabelas():
+    clientes = carregar_tabela('clientes').drop_duplicates(subset=['IDCliente'])
+    clientes = clientes[['IDCliente', 'Pais']].astype({'Pais': object})
+    produtos = carregar_tabela('produtos').drop_duplicates(subset=['CodigoProduto'])
+    produtos = produtos[['CodigoProduto', 'Descricao', 'Categoria', 'PrecoUnitario', 'CategoriaPreco']].astype(
+        {'Categoria': object, 'CategoriaPreco': object}
+    )
+    produtos['FaixaPreco'] = codificar_faixa_preco(produtos['PrecoUnitario'])
+    itens = carregar_tabela('itens_fatura')
+    itens = itens[['NumeroFatura', 'CodigoProduto', 'IDCliente', 'DataFatura', 'Quantidade', 'ValorTotal', 'Venda', 'Devolucao']].copy()
+    itens['DataFatura'] = itens['DataFatura'].dt.strftime(FORMATO_DATA)
+    return {'clientes': clientes, 'produtos': produtos, 'itens_fatura': itens}
+
+
+def construir_banco(caminho):
+    temporario = caminho + '.tmp'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    with closing(sqlite3.connect(temporario)) as conexao:
+        conexao.executescript(ESQUEMA)
+        for nome, tabela in _tabelas().items():
+            tabela.to_sql(nome, conexao, if_exists='append', index=False, chunksize=50_000)
+        conexao.executescript(INDICES)
+        conexao.commit()
+    os.replace(temporario, caminho)
+
+
+def _caminho(versao):
+    return os.path.join(DIRETORIO_CACHE, f'banco-v{VERSAO_FORMATO_BANCO}-{versao}.sqlite')
+
+
+_banco_atual = None
+_trava = threading.Lock()
+
+
+# Arquivo do banco da versão atual dos dados, construído na primeira chamada
+def obter_banco():
+    global _banco_atual
+    versao = versao_dados('clientes', 'itens_fatura', 'produtos')
+    with _trava:
+        if _banco_atual is not None and _banco_atual[0] == versao:
+            return _banco_atual[1]
+        caminho = _caminho(versao)
+        if not os.path.exists(caminho):
+            os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+            construir_banco(caminho)
+            for arquivo in os.listdir(DIRETORIO_CACHE):
+                if arquivo.startswith('banco-') and os.path.join(DIRETORIO_CACHE, arquivo) != caminho:
+                    os.remove(os.path.join(DIRETORIO_CACHE, arquivo))
+        _banco_atual = (versao, caminho)
+        return caminho
+
+
+# Conexão somente leitura; cada chamada abre a sua, então pode ser usada de qualquer thread
+def conectar():
+    return sqlite3.connect(f'file:{obter_banco()}?mode=ro', uri=True)
+
+
+def listar_consultas():
+    return sorted(
+        arquivo[:-len('.sql')] for arquivo in os.listdir(DIRETORIO_CONSULTAS)
+        if arquivo.endswith('.sql') and not arquivo.startswith('_')
+    )
+
+
+def _ler_arquivo(nome):
+    with open(os.path.join(DIRETORIO_CONSULTAS, nome + '.sql'), encoding='utf-8') as arquivo:
+        return arquivo.read().strip().rstrip(';')
+
+
+# Texto completo da consulta, com a tabela "itens" definida como CTE
+def ler_consulta(nome):
+    if nome not in listar_consultas():
+        raise KeyError(f'Consulta desconhecida: {nome}')
+    return f'WITH itens AS (\n{_ler_arquivo(CONSULTA_BASE)}\n)\n{_ler_arquivo(nome)}'
+
+
+def parametros(inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+    return {
+        'inicio': None if inicio is None else pd.Timestamp(inicio).normalize().strftime(FORMATO_DATA),
+        'fim': None if fim is None else (pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)).strftime(FORMATO_DATA),
+        'pais': pais,
+        'categoria': categoria,
+        'faixa_preco': None if faixa_preco is None else FAIXAS_PRECO.index(faixa_preco),
+    }
+
+
+def executar_consulta(nome, **filtros):
+    with closing(conectar()) as conexao:
+        return pd.read_sql_query(ler_consulta(nome), conexao, params=parametros(**filtros))
+
+
+# executar_consulta pelo cache de resultados, por versão dos dados, texto da consulta e
+# filtros: reruns do dashboard com a mesma seleção não abrem conexão com o banco
+def consulta_em_cache(nome, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+    chave = ('sql', nome, ler_consulta(nome)) + chave_filtros(inicio, fim, faixa_preco, pais, categoria)
+    return obter_cache_resultados().obter(
+        versao_dados('clientes', 'itens_fatura', 'produtos'), chave,
+        lambda: executar_consulta(nome, inicio=inicio, fim=fim, pais=pais, categoria=categoria, faixa_preco=faixa_preco),
+    )
+
+
+# Reexecuta todas as consultas e regrava os CSVs, um por consulta
+def regenerar_csvs(destino=DIRETORIO_RESULTADOS, **filtros):
+    os.makedirs(destino, exist_ok=True)
+    with closing(conectar()) as conexao:
+        for nome in listar_consultas():
+            resultado = pd.read_sql_query(ler_consulta(nome), conexao, params=parametros(**filtros))
+            resultado.to_csv(os.path.join(destino, nome + '.csv'), index=False)
+    return listar_consultas()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Banco SQLite local com as consultas de consultas_sql/.')
+    parser.add_argument('--regenerar', nargs='?', const=DIRETORIO_RESULTADOS, metavar='DIRETORIO',
+                        help='regravar os CSVs de todas as consultas')
+    parser.add_argument('--consulta', help='executar uma consulta e imprimir o resultado')
+    parser.add_argument('--inicio')
+    parser.add_argument('--fim')
+    parser.add_argument('--pais')
+    parser.add_argument('--categoria')
+    parser.add_argument('--faixa-preco', choices=FAIXAS_PRECO)
+    args = parser.parse_args()
+    filtros = {
+        'inicio': args.inicio, 'fim': args.fim, 'pais': args.pais,
+        'categoria': args.categoria, 'faixa_preco': args.faixa_preco,
+    }
+    print(f'Banco: {obter_banco()}')
+    if args.regenerar:
+        for nome in regenerar_csvs(args.regenerar, **filtros):
+            print(f'{nome}.csv')
+    if args.consulta:
+        print(executar_consulta(args.consulta, **filtros).to_string(index=False))
@@ -0,0 +1,212 @@
+# Benchmark dos caminhos de dados do dashboard
+# Para cada escala, gera as tabelas sintéticas (dados_sinteticos.gerar_tabelas) e executa,
+# sem Streamlit, as mesmas funções que streamlit_retail.py chama: carregamento, cada
+# calcular_* de analises.py, filtrar_clientes_por_intervalo, a consulta por cliente e
+# prever_vendas. Cada escala roda em um processo separado com o cache vazio; para cada
+# etapa são medidos o tempo da primeira chamada (fria), a mediana das repetições (com os
+# caches do processo já preenchidos), o pico de memória do processo e linhas por segundo.
+# O resultado em JSON pode ser comparado com o de outro commit (--comparar).
+#
+# Uso: python benchmark_dashboard.py [--escalas 10 100 1000] [--repeticoes 3]
+#                                    [--json resultado.json] [--comparar anterior.json]
+import argparse
+import inspect
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def _memoria_mb(campo):
+    # VmHWM/VmRSS do Linux; em outros sistemas, o RSS máximo do processo
+    try:
+        with open('/proc/self/status') as status:
+            for linha in status:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _reiniciar_pico():
+    # Zera o VmHWM para medir o pico de cada etapa (Linux)
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+    except OSError:
+        pass
+
+
+def medir(etapa, funcao, linhas, repeticoes):
+    _reiniciar_pico()
+    memoria_inicial = _memoria_mb('VmRSS')
+    inicio = time.perf_counter()
+    funcao()
+    segundos = time.perf_counter() - inicio
+    pico = _memoria_mb('VmHWM')
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    mediana = statistics.median(tempos) if tempos else None
+    return {
+        'etapa': etapa,
+        'linhas': linhas,
+        'segundos': round(segundos, 4),
+        'segundos_repeticao': None if mediana is None else round(mediana, 4),
+        'linhas_por_segundo': round(linhas / segundos) if segundos else None,
+        'memoria_inicial_mb': round(memoria_inicial, 1),
+        'pico_mb': round(pico, 1),
+    }
+
+
+# Argumentos de cada calcular_* pelo nome do parâmetro
+def _argumentos(funcao, fatos, produtos):
+    valores = {
+        'itens_fatura': fatos,
+        'produtos': produtos,
+        'start_date': fatos['DataFatura'].min(),
+        'end_date': fatos['DataFatura'].max(),
+    }
+    return {nome: valores[nome] for nome in inspect.signature(funcao).parameters if nome in valores}
+
+
+# Executado no processo filho, com KORE_DADOS_DIR e KORE_CACHE_DIR já definidos
+def _executar(repeticoes):
+    sys.path.insert(0, DIRETORIO)
+    import analises
+    from churn import filtrar_clientes_por_intervalo
+    from cliente360 import obter_cliente360
+    from dados import carregar_dados, carregar_fatos, limpar_cache
+    from filtros import obter_motor
+    from previsao import prever_vendas
+    from recomendacoes import produtos_recomendados
+
+    def carregar():
+        limpar_cache()
+        return carregar_dados(), carregar_fatos()
+
+    resultados = [medir('carregar_dados', carregar, 0, repeticoes)]
+    (clientes, itens_fatura, produtos, segmentacao), fatos = carregar()
+    linhas = len(fatos)
+    resultados[0]['linhas'] = linhas
+    resultados[0]['linhas_por_segundo'] = round(linhas / resultados[0]['segundos'])
+
+    for nome, funcao in inspect.getmembers(analises, inspect.isfunction):
+        if nome.startswith('calcular_') and funcao.__module__ == analises.__name__:
+            argumentos = _argumentos(funcao, fatos, produtos)
+            resultados.append(medir(nome, lambda: funcao(**argumentos), linhas, repeticoes))
+
+    pais = fatos['Pais'].value_counts().index[0]
+    resultados.append(medir('filtrar (barra lateral)', lambda: obter_motor(fatos).filtrar(pais=pais), linhas, repeticoes))
+    ultima_data = fatos['DataFatura'].max()
+    resultados.append(medir(
+        'filtrar_clientes_por_intervalo',
+        lambda: filtrar_clientes_por_intervalo(fatos, 30, 60, ultima_data), linhas, repeticoes,
+    ))
+    # Cliente com mais itens: o caso mais caro da página de consulta
+    id_cliente = int(fatos['IDCliente'].value_counts().index[0])
+
+    def consultar_cliente():
+        informacoes = obter_cliente360(fatos, clientes, segmentacao).consultar(id_cliente)
+        return informacoes, produtos_recomendados(id_cliente, fatos, segmentacao, produtos)
+
+    resultados.append(medir('consulta_cliente', consultar_cliente, linhas, repeticoes))
+    resultados.append(medir('prever_vendas', lambda: prever_vendas(3), linhas, repeticoes))
+    print(json.dumps(resultados))
+
+
+def medir_escala(diretorio_dados, repeticoes):
+    cache = tempfile.mkdtemp(prefix='bench_cache_')
+    try:
+        ambiente = {**os.environ, 'KORE_DADOS_DIR': diretorio_dados, 'KORE_CACHE_DIR': cache}
+        processo = subprocess.run(
+            [sys.executable, __file__, '--filho', str(repeticoes)],
+            check=True, capture_output=True, text=True, env=ambiente,
+        )
+        return json.loads(processo.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRETORIO, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(anterior, atual):
+    tempos = {(r['escala'], r['etapa']): r['segundos'] for r in anterior['resultados']}
+    print(f"{'escala':>7} {'etapa':<40} {'anterior':>10} {'atual':>10} {'razão':>7}")
+    for resultado in atual['resultados']:
+        antes = tempos.get((resultado['escala'], resultado['etapa']))
+        if antes:
+            print(f"{resultado['escala']:>7} {resultado['etapa']:<40} {antes:>10.4f} "
+                  f"{resultado['segundos']:>10.4f} {resultado['segundos'] / antes:>7.2f}")
+
+
+def main():
+    import numpy
+    import pandas
+
+    from dados_sinteticos import LINHAS_BASE, gerar_tabelas
+
+    parser = argparse.ArgumentParser(description='Mede os caminhos de dados do dashboard em dados sintéticos escalados.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--linhas-base', type=int, default=LINHAS_BASE, help='itens de fatura na escala 1')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--dados', help='diretório para manter as tabelas geradas (reaproveitadas entre execuções)')
+    parser.add_argument('--json', help='gravar os resultados neste arquivo')
+    parser.add_argument('--comparar', metavar='JSON', help='resultado anterior para comparar os tempos')
+    args = parser.parse_args()
+
+    relatorio = {
+        'commit': _commit(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'linhas_base': args.linhas_base,
+        'resultados': [],
+    }
+    base = args.dados or tempfile.mkdtemp(prefix='bench_dados_')
+    try:
+        for escala in args.escalas:
+            diretorio = os.path.join(base, f'escala_{escala}')
+            if not os.path.exists(os.path.join(diretorio, 'itens_fatura.csv')):
+                gerar_tabelas(diretorio, escala, args.semente, args.linhas_base)
+            for resultado in medir_escala(diretorio, args.repeticoes):
+                relatorio['resultados'].append({'escala': escala, **resultado})
+                print(f"{escala:>6}x {resultado['etapa']:<40} {resultado['segundos']:>9.4f} s "
+                      f"{resultado['pico_mb']:>9.1f} MB {resultado['linhas_por_segundo'] or 0:>12,} linhas/s")
+    finally:
+        if not args.dados:
+            shutil.rmtree(base, ignore_errors=True)
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            comparar(json.load(arquivo), relatorio)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--filho':
+        _executar(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,83 @@
+# Benchmark de memória da ingestão
+# Gera arquivos sintéticos de tamanhos crescentes e mede o pico de memória (RSS máximo)
+# de cada ingestão em um processo separado, comparando a leitura em blocos com a leitura
+# do arquivo inteiro. Com blocos, o pico deve ficar praticamente constante.
+#
+# Uso: python benchmark_memoria_etl.py [--linhas 100000 200000 400000] [--json resultado.json]
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def _pico_memoria_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em KB no Linux e em bytes no macOS
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+# Executado no processo filho: ingere a fonte e imprime o resumo com o pico de memória
+def _executar(modo, fonte, saida, tamanho_bloco):
+    sys.path.insert(0, DIRETORIO)
+    import etl
+
+    inicio = time.perf_counter()
+    if modo == 'blocos':
+        resumo = etl.processar_fonte(fonte, saida, tamanho_bloco)
+    else:
+        resumo = etl.processar_lote(etl.ler_fonte(fonte), saida)
+    resumo['segundos'] = round(time.perf_counter() - inicio, 2)
+    resumo['pico_mb'] = round(_pico_memoria_mb(), 1)
+    print(json.dumps(resumo))
+
+
+def medir(modo, fonte, tamanho_bloco):
+    saida = tempfile.mkdtemp(prefix='etl_bench_')
+    try:
+        processo = subprocess.run(
+            [sys.executable, __file__, '--filho', modo, fonte, saida, str(tamanho_bloco)],
+            check=True, capture_output=True, text=True,
+        )
+        return json.loads(processo.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(saida, ignore_errors=True)
+
+
+def main():
+    from dados_sinteticos import gerar_csv
+
+    parser = argparse.ArgumentParser(description='Mede o pico de memória da ingestão por tamanho de entrada.')
+    parser.add_argument('--linhas', type=int, nargs='+', default=[100_000, 200_000, 400_000, 800_000])
+    parser.add_argument('--tamanho-bloco', type=int, default=50_000)
+    parser.add_argument('--sem-completo', action='store_true', help='não medir a leitura do arquivo inteiro')
+    parser.add_argument('--json', help='gravar os resultados neste arquivo')
+    args = parser.parse_args()
+
+    modos = ['blocos'] if args.sem_completo else ['blocos', 'completo']
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='etl_fonte_') as temporario:
+        for linhas in args.linhas:
+            fonte = os.path.join(temporario, f'online_retail_{linhas}.csv')
+            gerar_csv(fonte, linhas)
+            for modo in modos:
+                resultado = medir(modo, fonte, args.tamanho_bloco)
+                resultados.append({'linhas': linhas, 'modo': modo, **resultado})
+                print(f"{linhas:>10} {modo:>9} {resultado['pico_mb']:>9.1f} MB {resultado['segundos']:>8.2f} s")
+            os.remove(fonte)
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 6 and sys.argv[1] == '--filho':
+        _executar(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+    else:
+        main()
@@ -0,0 +1,177 @@
+# Benchmark de sessões concorrentes do dashboard
+# Simula N sessões simultâneas distribuídas entre alguns processos (cada processo é um
+# servidor Streamlit e cada sessão é uma thread, como no Streamlit). Cada sessão executa
+# reruns do Relatório de Vendas ou da Análise de Churn com filtros sorteados, usando as
+# mesmas funções do dashboard (relatorios.py). O cenário roda com a memória compartilhada
+# (tabelas Arrow mapeadas) e com cópias por processo (KORE_MEMORIA_COMPARTILHADA=0); para
+# cada um são medidas a latência dos reruns e a memória dos processos: RSS e PSS, em que
+# as páginas compartilhadas são divididas entre os processos que as mapeiam.
+#
+# Uso: python benchmark_sessoes.py [--sessoes 50] [--processos 4] [--reruns 5]
+#                                  [--json resultado.json]
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+MODOS = {'compartilhada': '1', 'copia': '0'}
+
+
+def _memoria_processo(pid):
+    # Rss e Pss (kB) de /proc/<pid>/smaps_rollup, em MB
+    memoria = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as arquivo:
+            for linha in arquivo:
+                campo, _, valor = linha.partition(':')
+                if campo in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    memoria[campo] = int(valor.split()[0]) / 1024
+    except OSError:
+        pass
+    return memoria
+
+
+def _percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+# Executado em cada processo filho: carrega os dados, avisa o pai e espera o sinal de
+# início; ao fim, imprime as latências e espera o pai medir a memória antes de sair
+def _executar(sessoes, reruns, semente):
+    sys.path.insert(0, DIRETORIO)
+    from churn import FAIXAS_CHURN
+    from dados import carregar_dados
+    from filtros import FAIXAS_PRECO
+    from relatorios import calcular_churn, calcular_vendas, carregar_motor
+
+    # As quatro tabelas do dashboard, a tabela fato, o motor de filtros e o cubo
+    carregar_dados()
+    fatos, produtos = carregar_motor()
+    paises = [None] + fatos['Pais'].value_counts().index[:5].tolist()
+    categorias = [None] + [str(categoria) for categoria in fatos['Categoria'].cat.categories]
+    faixas = [None] + FAIXAS_PRECO
+    print('pronto', flush=True)
+    sys.stdin.readline()
+
+    latencias = []
+    trava = threading.Lock()
+    barreira = threading.Barrier(sessoes)
+
+    def sessao(numero):
+        rng = random.Random(semente * 1000 + numero)
+        barreira.wait()
+        for _ in range(reruns):
+            inicio = time.perf_counter()
+            if rng.random() < 0.7:
+                calcular_vendas(fatos, produtos, pais=rng.choice(paises), categoria=rng.choice(categorias),
+                                faixa_preco=rng.choice(faixas))
+            else:
+                intervalo = rng.choice(list(FAIXAS_CHURN))
+                calcular_churn(fatos, *FAIXAS_CHURN[intervalo], intervalo)
+            with trava:
+                latencias.append(time.perf_counter() - inicio)
+
+    threads = [threading.Thread(target=sessao, args=(numero,)) for numero in range(sessoes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps(latencias), flush=True)
+    sys.stdin.readline()
+
+
+def _somar_memoria(processos):
+    total = {}
+    for processo in processos:
+        for campo, valor in _memoria_processo(processo.pid).items():
+            total[campo] = total.get(campo, 0) + valor
+    return {campo: round(valor, 1) for campo, valor in total.items()}
+
+
+def medir_modo(modo, sessoes, n_processos, reruns):
+    ambiente = {**os.environ, 'KORE_MEMORIA_COMPARTILHADA': MODOS[modo]}
+    # Sessões divididas entre os processos
+    divisao = [sessoes // n_processos + (indice < sessoes % n_processos) for indice in range(n_processos)]
+    processos = [
+        subprocess.Popen(
+            [sys.executable, __file__, '--filho', str(quantidade), str(reruns), str(indice)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=ambiente,
+        )
+        for indice, quantidade in enumerate(divisao) if quantidade
+    ]
+    try:
+        for processo in processos:
+            if processo.stdout.readline().strip() != 'pronto':
+                raise RuntimeError(f'processo {processo.pid} falhou ao carregar os dados')
+        memoria_carregada = _somar_memoria(processos)
+        inicio = time.perf_counter()
+        for processo in processos:
+            processo.stdin.write('\n')
+            processo.stdin.flush()
+        latencias = []
+        for processo in processos:
+            latencias.extend(json.loads(processo.stdout.readline()))
+        segundos = time.perf_counter() - inicio
+        memoria_final = _somar_memoria(processos)
+        for processo in processos:
+            processo.stdin.write('\n')
+            processo.stdin.flush()
+    finally:
+        for processo in processos:
+            processo.stdin.close()
+            processo.wait()
+    return {
+        'modo': modo,
+        'sessoes': sessoes,
+        'processos': len(processos),
+        'reruns': len(latencias),
+        'segundos': round(segundos, 2),
+        'reruns_por_segundo': round(len(latencias) / segundos, 1),
+        'latencia_p50_ms': round(statistics.median(latencias) * 1000, 1),
+        'latencia_p95_ms': round(_percentil(latencias, 0.95) * 1000, 1),
+        'latencia_max_ms': round(max(latencias) * 1000, 1),
+        'memoria_carregada_mb': memoria_carregada,
+        'memoria_final_mb': memoria_final,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede memória e latência com várias sessões simultâneas do dashboard.')
+    parser.add_argument('--sessoes', type=int, default=50)
+    parser.add_argument('--processos', type=int, default=4, help='servidores entre os quais as sessões são divididas')
+    parser.add_argument('--reruns', type=int, default=5, help='reruns por sessão')
+    parser.add_argument('--modos', nargs='+', default=list(MODOS), choices=list(MODOS))
+    parser.add_argument('--json', help='gravar os resultados neste arquivo')
+    args = parser.parse_args()
+
+    # Caches em disco (Parquet, Arrow, cubo) prontos antes de medir
+    sys.path.insert(0, DIRETORIO)
+    from relatorios import carregar_motor
+    carregar_motor()
+
+    resultados = []
+    for modo in args.modos:
+        resultado = medir_modo(modo, args.sessoes, args.processos, args.reruns)
+        resultados.append(resultado)
+        print(f"{modo:<14} {resultado['reruns']} reruns em {resultado['segundos']:.2f} s | "
+              f"latência p50 {resultado['latencia_p50_ms']:.1f} ms, p95 {resultado['latencia_p95_ms']:.1f} ms | "
+              f"PSS carregado {resultado['memoria_carregada_mb'].get('Pss', 0):,.1f} MB, "
+              f"final {resultado['memoria_final_mb'].get('Pss', 0):,.1f} MB | "
+              f"RSS final {resultado['memoria_final_mb'].get('Rss', 0):,.1f} MB")
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == '--filho':
+        _executar(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,240 @@
+# Cache de resultados das visões filtradas do dashboard
+# Os indicadores de uma combinação de filtros (datas, faixa de preço, país e categoria)
+# são guardados sob a chave normalizada dos filtros e a versão dos dados. A memória é
+# limitada por número de entradas e por tamanho estimado, com descarte do resultado usado
+# há mais tempo (LRU), e cada resultado expira após um TTL. Opcionalmente os resultados
+# são gravados em disco (um pickle por chave, em um diretório por versão dos dados), de
+# modo que o aquecimento feito no deploy sobrevive a reinícios do servidor.
+#
+# Uso: python cache_resultados.py --aquecer [--paises 5]   (pré-calcula as combinações comuns)
+#      python cache_resultados.py --estatisticas | --limpar
+import argparse
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dados import DIRETORIO_CACHE
+from filtros import FAIXAS_PRECO
+
+MAX_ENTRADAS = int(os.environ.get('KORE_CACHE_RESULTADOS_ENTRADAS', 128))
+MAX_MB = float(os.environ.get('KORE_CACHE_RESULTADOS_MB', 256))
+TTL_SEGUNDOS = float(os.environ.get('KORE_CACHE_RESULTADOS_TTL', 24 * 3600))
+# KORE_CACHE_RESULTADOS_DISCO=0 mantém o cache apenas na memória do processo
+DIRETORIO_RESULTADOS = (
+    os.path.join(DIRETORIO_CACHE, 'resultados') if os.environ.get('KORE_CACHE_RESULTADOS_DISCO', '1') != '0' else None
+)
+
+
+# Chave dos filtros da barra lateral: datas como texto ISO, filtros vazios como None
+def chave_filtros(inicio=None, fim=None, faixa_preco=None, pais=None, categoria=None):
+    def data(valor):
+        return None if valor is None else pd.Timestamp(valor).date().isoformat()
+
+    return (data(inicio), data(fim), faixa_preco, None if pais is None else str(pais),
+            None if categoria is None else str(categoria))
+
+
+# Tamanho aproximado de um resultado (dicionários de DataFrames, Series e escalares)
+def tamanho_bytes(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sum(tamanho_bytes(item) for item in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho_bytes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_mb=MAX_MB, ttl=TTL_SEGUNDOS, diretorio=DIRETORIO_RESULTADOS):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_mb * 1024 * 1024
+        self.ttl = ttl
+        self.diretorio = diretorio
+        self.versao = None
+        # chave -> (criado em, tamanho, resultado), da menos para a mais recentemente usada
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.contadores = {'acertos': 0, 'acertos_disco': 0, 'falhas': 0, 'expirados': 0, 'descartados': 0}
+
+    def _trocar_versao(self, versao):
+        # Outra versão dos dados: os resultados anteriores não servem mais
+        self._entradas.clear()
+        self._bytes = 0
+        self.versao = versao
+        if self.diretorio is not None and os.path.isdir(self.diretorio):
+            for nome in os.listdir(self.diretorio):
+                if nome != versao:
+                    shutil.rmtree(os.path.join(self.diretorio, nome), ignore_errors=True)
+
+    def _caminho(self, versao, chave):
+        nome = hashlib.sha256(repr(chave).encode()).hexdigest()[:32]
+        return os.path.join(self.diretorio, versao, f'{nome}.pkl')
+
+    def _ler_disco(self, versao, chave):
+        if self.diretorio is None:
+            return None
+        try:
+            with open(self._caminho(versao, chave), 'rb') as arquivo:
+                chave_gravada, criado, resultado = pickle.load(arquivo)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if chave_gravada != chave or time.time() - criado > self.ttl:
+            return None
+        return criado, resultado
+
+    def _gravar_disco(self, versao, chave, criado, resultado):
+        if self.diretorio is None:
+            return
+        caminho = self._caminho(versao, chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            pickle.dump((chave, criado, resultado), arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+
+    def _guardar(self, chave, criado, resultado):
+        tamanho = tamanho_bytes(resultado)
+        # Um resultado maior que o limite inteiro não é guardado, em vez de esvaziar o cache
+        if tamanho > self.max_bytes:
+            return
+        if chave in self._entradas:
+            self._bytes -= self._entradas.pop(chave)[1]
+        self._entradas[chave] = (criado, tamanho, resultado)
+        self._bytes += tamanho
+        while self._entradas and (len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes):
+            self._bytes -= self._entradas.popitem(last=False)[1][1]
+            self.contadores['descartados'] += 1
+
+    def obter(self, versao, chave, calcular):
+        with self._trava:
+            if versao != self.versao:
+                self._trocar_versao(versao)
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                if time.time() - entrada[0] <= self.ttl:
+                    self._entradas.move_to_end(chave)
+                    self.contadores['acertos'] += 1
+                    return entrada[2]
+                self._bytes -= self._entradas.pop(chave)[1]
+                self.contadores['expirados'] += 1
+        # Disco e cálculo fora da trava: outras sessões continuam sendo atendidas
+        gravado = self._ler_disco(versao, chave)
+        if gravado is not None:
+            criado, resultado = gravado
+            situacao = 'acertos_disco'
+        else:
+            criado, resultado = time.time(), calcular()
+            situacao = 'falhas'
+            self._gravar_disco(versao, chave, criado, resultado)
+        with self._trava:
+            self.contadores[situacao] += 1
+            if versao == self.versao:
+                self._guardar(chave, criado, resultado)
+        return resultado
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.contadores['acertos'] + self.contadores['acertos_disco'] + self.contadores['falhas']
+            return {
+                **self.contadores,
+                'entradas': len(self._entradas),
+                'mb': round(self._bytes / (1024 * 1024), 2),
+                'taxa_acerto': round((consultas - self.contadores['falhas']) / consultas, 3) if consultas else None,
+            }
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+            if self.diretorio is not None:
+                shutil.rmtree(self.diretorio, ignore_errors=True)
+
+
+_cache_atual = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache_resultados():
+    global _cache_atual
+    with _trava_cache:
+        if _cache_atual is None:
+            _cache_atual = CacheResultados()
+        return _cache_atual
+
+
+# Combinações que os usuários mais alternam: Global e os maiores países, cada um sem
+# filtro, com cada faixa de preço e com cada categoria, no período completo
+def combinacoes_comuns(fatos, n_paises=5):
+    receita = fatos.groupby('Pais', observed=True)['ValorTotal'].sum().sort_values(ascending=False)
+    paises = [None] + [str(pais) for pais in receita.index[:n_paises]]
+    categorias = [str(categoria) for categoria in fatos['Categoria'].dropna().unique()]
+    inicio = pd.to_datetime(fatos['DataFatura'].min()).date()
+    fim = pd.to_datetime(fatos['DataFatura'].max()).date()
+    combinacoes = []
+    for pais in paises:
+        combinacoes.append({'inicio': inicio, 'fim': fim, 'pais': pais, 'categoria': None, 'faixa_preco': None})
+        combinacoes.extend({'inicio': inicio, 'fim': fim, 'pais': pais, 'categoria': None, 'faixa_preco': faixa}
+                           for faixa in FAIXAS_PRECO)
+        combinacoes.extend({'inicio': inicio, 'fim': fim, 'pais': pais, 'categoria': categoria, 'faixa_preco': None}
+                           for categoria in categorias)
+    return combinacoes
+
+
+def aquecer(n_paises=5):
+    from associacao import obter_regras
+    from relatorios import carregar_motor, vendas_em_cache
+
+    fatos, produtos = carregar_motor()
+    combinacoes = combinacoes_comuns(fatos, n_paises)
+    for filtros in combinacoes:
+        vendas_em_cache(fatos, produtos, **filtros)
+    # Regras de associação com os limites padrão dos sliders (não dependem da faixa de preço)
+    for pais, categoria in dict.fromkeys((filtros['pais'], filtros['categoria']) for filtros in combinacoes):
+        obter_regras(fatos, pais, categoria)
+    return len(combinacoes)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cache de resultados das visões filtradas do dashboard.')
+    parser.add_argument('--aquecer', action='store_true', help='pré-calcular as combinações de filtros mais comuns')
+    parser.add_argument('--paises', type=int, default=5, help='maiores países incluídos no aquecimento')
+    parser.add_argument('--estatisticas', action='store_true', help='resultados gravados em disco por versão dos dados')
+    parser.add_argument('--limpar', action='store_true', help='apagar os resultados gravados em disco')
+    args = parser.parse_args()
+    # O cache usado por relatorios.py é o do módulo importado, não o deste script
+    from cache_resultados import aquecer, obter_cache_resultados
+
+    if args.limpar:
+        obter_cache_resultados().limpar()
+        print('Cache de resultados apagado')
+    if args.aquecer:
+        if DIRETORIO_RESULTADOS is None:
+            print('Aviso: KORE_CACHE_RESULTADOS_DISCO=0, o aquecimento vale apenas para este processo')
+        inicio = time.perf_counter()
+        quantidade = aquecer(args.paises)
+        print(f'{quantidade} combinações aquecidas em {time.perf_counter() - inicio:.2f} s')
+        print(obter_cache_resultados().estatisticas())
+    if args.estatisticas:
+        if DIRETORIO_RESULTADOS is None or not os.path.isdir(DIRETORIO_RESULTADOS):
+            print('Nenhum resultado gravado em disco')
+        else:
+            for versao in sorted(os.listdir(DIRETORIO_RESULTADOS)):
+                arquivos = [os.path.join(DIRETORIO_RESULTADOS, versao, nome)
+                            for nome in os.listdir(os.path.join(DIRETORIO_RESULTADOS, versao))]
+                tamanho = sum(os.path.getsize(caminho) for caminho in arquivos)
+                print(f'{versao}: {len(arquivos)} resultados, {tamanho / (1024 * 1024):.1f} MB')
+    if not (args.aquecer or args.estatisticas or args.limpar):
+        parser.print_help()
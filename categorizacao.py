@@ -0,0 +1,180 @@
+# Categorização de produtos (TF-IDF + K-means)
+# O vetorizador e o agrupamento são ajustados apenas sobre as descrições distintas,
+# ponderadas pela frequência com que aparecem, usando MiniBatchKMeans. A varredura de k
+# do método do cotovelo roda em paralelo entre os núcleos. O modelo ajustado (vetorizador,
+# centróides e nomes_clusters) é salvo em disco, de modo que produtos novos recebem a
+# Categoria com um predict, sem reajuste.
+#
+# Os ids dos clusters de um novo ajuste são arbitrários: os nomes vêm de uma referência
+# (produtos que já têm Categoria, por padrão produtos.csv), atribuindo a cada cluster a
+# categoria com que mais coincide, ou são informados explicitamente.
+#
+# Recategorizar o catálogo: python categorizacao.py produtos.csv --saida categorizados.csv [--treinar]
+# Varredura de k:           python categorizacao.py produtos.csv --varrer 1 20
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from transformacoes import limpar_descricoes
+
+# Número de clusters definido pelo método do cotovelo
+NUM_CLUSTERS = 8
+TAMANHO_LOTE = 1024
+SEMENTE = 42
+# Catálogo com as categorias nomeadas no notebook, usado para nomear os clusters de um novo ajuste
+CAMINHO_REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'produtos.csv')
+
+
+def _distintas(descricoes_limpas):
+    codigos, distintas = pd.factorize(pd.Series(descricoes_limpas))
+    frequencias = np.bincount(codigos[codigos >= 0], minlength=len(distintas))
+    return codigos, np.asarray(distintas, dtype=object), frequencias
+
+
+def _agrupamento(num_clusters):
+    return MiniBatchKMeans(n_clusters=num_clusters, batch_size=TAMANHO_LOTE, n_init=3, random_state=SEMENTE)
+
+
+class Categorizador:
+    def __init__(self, vectorizer, kmeans, nomes_clusters):
+        self.vectorizer = vectorizer
+        self.kmeans = kmeans
+        self.nomes_clusters = nomes_clusters
+
+    # referencia: (descrições limpas, Categoria) de produtos já categorizados, usada para
+    # nomear os clusters quando nomes_clusters não é informado
+    @classmethod
+    def treinar(cls, descricoes_limpas, num_clusters=NUM_CLUSTERS, nomes_clusters=None, referencia=None):
+        if nomes_clusters is None and referencia is None:
+            raise ValueError('os ids de um novo ajuste são arbitrários: informe nomes_clusters ou referencia')
+        _, distintas, frequencias = _distintas(descricoes_limpas)
+        vectorizer = TfidfVectorizer(stop_words='english')
+        X = vectorizer.fit_transform(distintas)
+        kmeans = _agrupamento(num_clusters).fit(X, sample_weight=frequencias)
+        categorizador = cls(vectorizer, kmeans, nomes_clusters)
+        if nomes_clusters is None:
+            descricoes_referencia, categorias_referencia = referencia
+            categorizador.nomes_clusters = nomear_clusters(
+                categorizador.prever_clusters(descricoes_referencia), categorias_referencia,
+                categorizador.termos_por_cluster(3),
+            )
+        return categorizador
+
+    def prever_clusters(self, descricoes_limpas):
+        codigos, distintas, _ = _distintas(descricoes_limpas)
+        if not len(distintas):
+            return np.full(len(codigos), -1)
+        clusters = self.kmeans.predict(self.vectorizer.transform(distintas))
+        return np.where(codigos >= 0, clusters[codigos], -1)
+
+    def prever(self, descricoes_limpas):
+        return pd.Series(self.prever_clusters(descricoes_limpas)).map(self.nomes_clusters).to_numpy()
+
+    # Termos de maior peso em cada centróide, para nomear os clusters de um novo ajuste
+    def termos_por_cluster(self, n=8):
+        termos = self.vectorizer.get_feature_names_out()
+        ordem = np.argsort(-self.kmeans.cluster_centers_, axis=1)[:, :n]
+        return {cluster: list(termos[indices]) for cluster, indices in enumerate(ordem)}
+
+
+# Cada cluster recebe a categoria de referência com que mais coincide, em uma atribuição
+# um-para-um que maximiza os produtos concordantes; clusters sem par são nomeados pelos
+# termos de maior peso
+def nomear_clusters(clusters, categorias, termos):
+    categorias = pd.Series(categorias).to_numpy(dtype=object)
+    validos = (np.asarray(clusters) >= 0) & pd.notna(categorias)
+    tabela = pd.crosstab(np.asarray(clusters)[validos], categorias[validos])
+    linhas, colunas = linear_sum_assignment(-tabela.to_numpy())
+    nomes = {int(tabela.index[linha]): tabela.columns[coluna] for linha, coluna in zip(linhas, colunas)}
+    for cluster, palavras in termos.items():
+        nomes.setdefault(cluster, f"Cluster {cluster} ({', '.join(palavras)})")
+    return nomes
+
+
+def carregar_referencia(caminho=CAMINHO_REFERENCIA):
+    if not os.path.exists(caminho):
+        return None
+    referencia = pd.read_csv(caminho, dtype={'CodigoProduto': str})
+    if 'Categoria' not in referencia or referencia['Categoria'].isna().all():
+        return None
+    return limpar_descricoes(referencia['Descricao'].fillna('')), referencia['Categoria']
+
+
+def salvar_modelo(categorizador, caminho):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(categorizador, arquivo)
+    os.replace(temporario, caminho)
+
+
+def carregar_modelo(caminho):
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'rb') as arquivo:
+        return pickle.load(arquivo)
+
+
+def _inercia(X, pesos, k):
+    return k, _agrupamento(k).fit(X, sample_weight=pesos).inertia_
+
+
+# Inércia para cada k (método do cotovelo), com um ajuste por núcleo
+def varrer_k(descricoes_limpas, ks=range(1, 21), n_jobs=-1):
+    _, distintas, frequencias = _distintas(descricoes_limpas)
+    X = TfidfVectorizer(stop_words='english').fit_transform(distintas)
+    resultados = Parallel(n_jobs=n_jobs)(delayed(_inercia)(X, frequencias, k) for k in ks)
+    return pd.DataFrame(resultados, columns=['k', 'Inercia'])
+
+
+# k do cotovelo: ponto da curva mais distante da reta entre o primeiro e o último k
+def escolher_k(varredura):
+    k = varredura['k'].to_numpy(dtype='float64')
+    inercia = varredura['Inercia'].to_numpy(dtype='float64')
+    if len(k) < 3:
+        return int(k[-1])
+    x = (k - k[0]) / (k[-1] - k[0])
+    y = (inercia - inercia[-1]) / max(inercia[0] - inercia[-1], 1e-12)
+    return int(k[np.argmax(np.abs(1 - x - y))])
+
+
+if __name__ == '__main__':
+    # Importa pelo nome do módulo para que o modelo salvo não dependa de __main__
+    from categorizacao import Categorizador
+
+    parser = argparse.ArgumentParser(description='Categoriza o catálogo de produtos pela descrição.')
+    parser.add_argument('produtos', help='CSV com as colunas CodigoProduto e Descricao')
+    parser.add_argument('--modelo', default='categorizador.pkl')
+    parser.add_argument('--treinar', action='store_true', help='reajustar o modelo antes de categorizar')
+    parser.add_argument('--referencia', default=CAMINHO_REFERENCIA,
+                        help='CSV com Descricao e Categoria para nomear os clusters de um novo ajuste')
+    parser.add_argument('--clusters', type=int, default=NUM_CLUSTERS)
+    parser.add_argument('--varrer', type=int, nargs=2, metavar=('K_MIN', 'K_MAX'), help='só imprimir a inércia por k')
+    parser.add_argument('--saida', help='CSV de saída (obrigatório ao categorizar; a entrada não é sobrescrita)')
+    args = parser.parse_args()
+    if not args.varrer and not args.saida:
+        parser.error('informe --saida')
+
+    produtos = pd.read_csv(args.produtos, dtype={'CodigoProduto': str})
+    descricoes = limpar_descricoes(produtos['Descricao'].fillna(''))
+    if args.varrer:
+        varredura = varrer_k(descricoes, range(args.varrer[0], args.varrer[1] + 1))
+        print(varredura.to_string(index=False))
+        print(f'k sugerido: {escolher_k(varredura)}')
+    else:
+        categorizador = None if args.treinar else carregar_modelo(args.modelo)
+        if categorizador is None:
+            referencia = carregar_referencia(args.referencia)
+            if referencia is None:
+                parser.error(f'{args.referencia} não tem a coluna Categoria para nomear os clusters')
+            categorizador = Categorizador.treinar(descricoes, args.clusters, referencia=referencia)
+            salvar_modelo(categorizador, args.modelo)
+        produtos['Categoria'] = categorizador.prever(descricoes)
+        produtos.to_csv(args.saida, index=False)
+        print(produtos['Categoria'].value_counts(dropna=False).to_string())
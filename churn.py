@@ -0,0 +1,129 @@
+# Análise de Churn
+# A tabela de recência (uma linha por cliente, ordenada pela data da última compra) é
+# calculada uma única vez; qualquer intervalo de inatividade é respondido por busca
+# binária nessa tabela, e várias faixas podem ser consultadas na mesma chamada.
+import numpy as np
+import pandas as pd
+
+from instrumentacao import instrumentar
+
+FAIXAS_CHURN = {
+    '30-60 dias': (30, 60),
+    '61-90 dias': (61, 90),
+    '91-120 dias': (91, 120),
+    '121-360 dias': (121, 360),
+}
+
+
+@instrumentar
+def construir_recencia(itens_fatura):
+    recencia = itens_fatura.groupby('IDCliente').agg(
+        PrimeiraCompra=('DataFatura', 'min'),
+        UltimaCompra=('DataFatura', 'max'),
+        NumeroFaturas=('NumeroFatura', 'nunique'),
+        Receita=('ValorTotal', 'sum'),
+    )
+    return recencia.sort_values('UltimaCompra', kind='stable').reset_index()
+
+
+_recencia_atual = None
+
+
+def obter_recencia(itens_fatura):
+    global _recencia_atual
+    if _recencia_atual is None or _recencia_atual[0] is not itens_fatura:
+        _recencia_atual = (itens_fatura, construir_recencia(itens_fatura))
+    return _recencia_atual[1]
+
+
+def _limites(recencia, dias_inicio, dias_fim, ultima_data):
+    # Clientes cuja última compra está em (ultima_data - dias_fim, ultima_data - dias_inicio]
+    ultimas = recencia['UltimaCompra'].to_numpy()
+    ultima_data = np.datetime64(pd.Timestamp(ultima_data))
+    data_inicio = ultima_data - np.asarray(dias_inicio, dtype='timedelta64[D]')
+    data_fim = ultima_data - np.asarray(dias_fim, dtype='timedelta64[D]')
+    lo = np.searchsorted(ultimas, data_fim, side='right')
+    hi = np.searchsorted(ultimas, data_inicio, side='right')
+    return lo, np.maximum(hi, lo)
+
+
+@instrumentar
+def clientes_por_intervalo(recencia, dias_inicio, dias_fim, ultima_data):
+    lo, hi = _limites(recencia, dias_inicio, dias_fim, ultima_data)
+    return recencia['IDCliente'].to_numpy()[lo:hi]
+
+
+# Quantidade e porcentagem de clientes inativos para várias faixas de uma só vez
+@instrumentar
+def calcular_churn_por_faixa(recencia, ultima_data, faixas=None):
+    faixas = faixas or FAIXAS_CHURN
+    inicios = np.array([inicio for inicio, _ in faixas.values()])
+    fins = np.array([fim for _, fim in faixas.values()])
+    lo, hi = _limites(recencia, inicios, fins, ultima_data)
+    total = len(recencia)
+    quantidades = hi - lo
+    return pd.DataFrame({
+        'Faixa': list(faixas),
+        'DiasInicio': inicios,
+        'DiasFim': fins,
+        'Clientes': quantidades,
+        'PorcentagemChurn': quantidades / total * 100 if total else np.zeros(len(faixas)),
+    })
+
+
+@instrumentar
+def calcular_tempo_desde_ultima_compra(recencia, data_referencia):
+    ultima_compra = recencia[['IDCliente', 'UltimaCompra']].copy()
+    ultima_compra['DiasDesdeUltimaCompra'] = (data_referencia - ultima_compra['UltimaCompra']).dt.days
+    return ultima_compra[['IDCliente', 'DiasDesdeUltimaCompra']]
+
+
+@instrumentar
+def filtrar_clientes_por_intervalo(df, dias_inicio, dias_fim, ultima_data):
+    return clientes_por_intervalo(obter_recencia(df), dias_inicio, dias_fim, ultima_data)
+
+
+# Faixa de cada cliente da tabela de recência (-1 quando fora de todas as faixas).
+# As faixas devem ser disjuntas; em caso de sobreposição vale a primeira.
+def mapear_faixas(recencia, ultima_data, faixas=None):
+    faixas = faixas or FAIXAS_CHURN
+    inicios = np.array([inicio for inicio, _ in faixas.values()])
+    fins = np.array([fim for _, fim in faixas.values()])
+    lo, hi = _limites(recencia, inicios, fins, ultima_data)
+    codigos = np.full(len(recencia), -1, dtype='int64')
+    for codigo in range(len(faixas) - 1, -1, -1):
+        codigos[lo[codigo]:hi[codigo]] = codigo
+    return pd.Series(codigos, index=recencia['IDCliente'].to_numpy())
+
+
+# Produtos mais comprados e devolvidos por todas as faixas de churn de uma só vez
+@instrumentar
+def analisar_produtos_por_faixa(itens_fatura, recencia, ultima_data, faixas=None, n=10):
+    faixas = faixas or FAIXAS_CHURN
+    mapa = mapear_faixas(recencia, ultima_data, faixas)
+    faixa_linha = mapa.reindex(itens_fatura['IDCliente'].to_numpy()).fillna(-1).to_numpy(dtype='int64')
+    selecionadas = faixa_linha >= 0
+    quantidade = itens_fatura['Quantidade'].to_numpy()[selecionadas]
+    devolucao = itens_fatura['Devolucao'].to_numpy()[selecionadas]
+    resumo = pd.DataFrame({
+        'Faixa': faixa_linha[selecionadas],
+        'CodigoProduto': itens_fatura['CodigoProduto'].to_numpy()[selecionadas],
+        'Quantidade_Comprada': quantidade,
+        'Quantidade_Devolvida': np.where(devolucao, quantidade, 0),
+    }).groupby(['Faixa', 'CodigoProduto'], observed=True).sum().reset_index()
+    resumo = resumo.sort_values(['Faixa', 'Quantidade_Comprada'], ascending=[True, False], kind='stable')
+    resumo = resumo.groupby('Faixa').head(n).reset_index(drop=True)
+    resumo['Proporcao_Devolucao'] = resumo['Quantidade_Devolvida'] / resumo['Quantidade_Comprada']
+    resumo['Faixa'] = pd.Categorical.from_codes(resumo['Faixa'], list(faixas))
+    return resumo
+
+
+_analise_atual = None
+
+
+def obter_analise_faixas(itens_fatura, ultima_data):
+    global _analise_atual
+    recencia = obter_recencia(itens_fatura)
+    if _analise_atual is None or _analise_atual[0] is not recencia or _analise_atual[1] != ultima_data:
+        _analise_atual = (recencia, ultima_data, analisar_produtos_por_faixa(itens_fatura, recencia, ultima_data))
+    return _analise_atual[2]
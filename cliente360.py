@@ -0,0 +1,105 @@
+# Visão 360 do cliente
+# Os itens ficam ordenados por (IDCliente, DataFatura) e cada cliente aponta para o seu
+# intervalo de linhas, junto com valor total, país e segmento pré-calculados. Consultar
+# um cliente é um acesso de dicionário seguido de uma fatia; consultas em lote usam
+# o mesmo índice de forma vetorizada.
+#
+# Exportação em lote: python cliente360.py 17850 13047 ... --saida clientes_crm.csv
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_ITENS = ['NumeroFatura', 'CodigoProduto', 'DataFatura', 'Quantidade', 'ValorTotal']
+
+
+class Cliente360:
+    def __init__(self, itens_fatura, clientes, segmentacao):
+        # Itens sem IDCliente não pertencem a nenhum cliente
+        if itens_fatura['IDCliente'].hasnans:
+            itens_fatura = itens_fatura[itens_fatura['IDCliente'].notna()]
+        ids_itens = itens_fatura['IDCliente'].to_numpy(dtype='int64')
+        ordem = np.lexsort((itens_fatura['DataFatura'].to_numpy(), ids_itens))
+        ids_itens = ids_itens[ordem]
+        self.itens = itens_fatura[COLUNAS_ITENS].take(ordem).reset_index(drop=True)
+
+        ids = np.unique(np.concatenate([
+            ids_itens, clientes['IDCliente'].to_numpy(), segmentacao['IDCliente'].to_numpy(),
+        ]).astype('int64'))
+        inicio = np.searchsorted(ids_itens, ids, side='left')
+        fim = np.searchsorted(ids_itens, ids, side='right')
+        datas = self.itens['DataFatura'].to_numpy()
+        tem_itens = fim > inicio
+        # Os intervalos não vazios são contíguos e cobrem todos os itens
+        valor_total = np.zeros(len(ids))
+        if tem_itens.any():
+            valor_total[tem_itens] = np.add.reduceat(self.itens['ValorTotal'].to_numpy(), inicio[tem_itens])
+
+        primeira = np.full(len(ids), np.datetime64('NaT'), dtype=datas.dtype)
+        ultima = np.full(len(ids), np.datetime64('NaT'), dtype=datas.dtype)
+        primeira[tem_itens] = datas[inicio[tem_itens]]
+        ultima[tem_itens] = datas[fim[tem_itens] - 1]
+
+        resumo = pd.DataFrame({
+            'IDCliente': ids,
+            'Inicio': inicio,
+            'Fim': fim,
+            'NumeroItens': fim - inicio,
+            'ValorTotal': valor_total,
+            'PrimeiraCompra': primeira,
+            'UltimaCompra': ultima,
+        })
+        paises = clientes.drop_duplicates(subset=['IDCliente']).set_index('IDCliente')['Pais']
+        resumo['Pais'] = paises.reindex(ids).to_numpy()
+        segmentos = segmentacao.drop_duplicates(subset=['IDCliente']).set_index('IDCliente')['segmento']
+        resumo['Segmento'] = segmentos.reindex(ids).astype('Int64').to_numpy()
+        self.resumo = resumo
+        self._posicao = dict(zip(ids.tolist(), range(len(ids))))
+
+    def consultar(self, id_cliente, n_ultimos=5):
+        posicao = self._posicao.get(id_cliente)
+        if posicao is None:
+            return None
+        linha = self.resumo.iloc[posicao]
+        historico = self.itens.iloc[linha['Inicio']:linha['Fim']]
+        return {
+            'IDCliente': id_cliente,
+            'Pais': None if pd.isna(linha['Pais']) else linha['Pais'],
+            'Segmento': None if pd.isna(linha['Segmento']) else int(linha['Segmento']),
+            'ValorTotal': linha['ValorTotal'],
+            'NumeroItens': int(linha['NumeroItens']),
+            'PrimeiraCompra': linha['PrimeiraCompra'],
+            'UltimaCompra': linha['UltimaCompra'],
+            'UltimosProdutos': historico.iloc[::-1].head(n_ultimos),
+        }
+
+    def consultar_lote(self, ids):
+        ids = pd.Index(np.asarray(ids, dtype='int64'))
+        posicoes = pd.Index(self.resumo['IDCliente']).get_indexer(ids)
+        encontrados = posicoes >= 0
+        resultado = self.resumo.iloc[posicoes[encontrados]].drop(columns=['Inicio', 'Fim'])
+        return resultado.reset_index(drop=True)
+
+
+_loja_atual = None
+
+
+def obter_cliente360(itens_fatura, clientes, segmentacao):
+    global _loja_atual
+    chave = (itens_fatura, clientes, segmentacao)
+    if _loja_atual is None or any(a is not b for a, b in zip(_loja_atual[0], chave)):
+        _loja_atual = (chave, Cliente360(itens_fatura, clientes, segmentacao))
+    return _loja_atual[1]
+
+
+if __name__ == '__main__':
+    from dados import carregar_fatos, carregar_tabela
+
+    parser = argparse.ArgumentParser(description='Exporta a visão 360 de vários clientes de uma só vez.')
+    parser.add_argument('ids', nargs='*', type=int, help='IDs dos clientes (ou um por linha na entrada padrão)')
+    parser.add_argument('--saida', default='-', help='arquivo CSV de saída (padrão: saída padrão)')
+    args = parser.parse_args()
+    ids = args.ids or [int(float(linha)) for linha in sys.stdin if linha.strip()]
+    loja = Cliente360(carregar_fatos(), carregar_tabela('clientes'), carregar_tabela('segmentacao'))
+    loja.consultar_lote(ids).to_csv(sys.stdout if args.saida == '-' else args.saida, index=False)
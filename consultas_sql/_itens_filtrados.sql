@@ -0,0 +1,12 @@
+-- Base de todas as consultas, disponível como a tabela "itens": itens de fatura com o país
+-- do cliente e os atributos do produto, restritos aos filtros da barra lateral.
+-- Parâmetros nulos não filtram; :fim é exclusivo (dia seguinte à data final).
+SELECT i.*, c.Pais, p.Categoria, p.PrecoUnitario, p.FaixaPreco
+FROM itens_fatura i
+LEFT JOIN clientes c ON c.IDCliente = i.IDCliente
+LEFT JOIN produtos p ON p.CodigoProduto = i.CodigoProduto
+WHERE (:inicio IS NULL OR i.DataFatura >= :inicio)
+  AND (:fim IS NULL OR i.DataFatura < :fim)
+  AND (:pais IS NULL OR c.Pais = :pais)
+  AND (:categoria IS NULL OR p.Categoria = :categoria)
+  AND (:faixa_preco IS NULL OR p.FaixaPreco = :faixa_preco)
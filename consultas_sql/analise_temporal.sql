@@ -0,0 +1,5 @@
+-- Receita por ano
+SELECT strftime('%Y-01-01', DataFatura) AS ano, SUM(ValorTotal) AS vendasano
+FROM itens
+GROUP BY ano
+ORDER BY ano
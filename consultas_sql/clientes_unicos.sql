@@ -0,0 +1,2 @@
+SELECT COUNT(DISTINCT IDCliente) AS clientesunicos
+FROM itens
@@ -0,0 +1,4 @@
+-- Faturas com pelo menos uma devolução
+SELECT COUNT(DISTINCT NumeroFatura) AS transacoesdevolucao
+FROM itens
+WHERE Devolucao
@@ -0,0 +1,6 @@
+-- Itens comprados por cliente (itens sem IDCliente não pertencem a nenhum cliente)
+SELECT IDCliente AS idcliente, COUNT(*) AS frequenciacompras
+FROM itens
+WHERE IDCliente IS NOT NULL
+GROUP BY IDCliente
+ORDER BY frequenciacompras DESC, idcliente
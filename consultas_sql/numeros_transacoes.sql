@@ -0,0 +1,2 @@
+SELECT COUNT(DISTINCT NumeroFatura) AS numerotransacoes
+FROM itens
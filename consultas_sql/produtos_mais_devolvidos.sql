@@ -0,0 +1,7 @@
+-- Mesma ordenação do dashboard (quantidades devolvidas são negativas)
+SELECT CodigoProduto AS codigoproduto, SUM(Quantidade) AS totaldevolvido
+FROM itens
+WHERE Devolucao
+GROUP BY CodigoProduto
+ORDER BY totaldevolvido DESC, codigoproduto
+LIMIT 10
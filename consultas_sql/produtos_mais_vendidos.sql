@@ -0,0 +1,5 @@
+SELECT CodigoProduto AS codigoproduto, SUM(Quantidade) AS totalvendido
+FROM itens
+GROUP BY CodigoProduto
+ORDER BY totalvendido DESC, codigoproduto
+LIMIT 10
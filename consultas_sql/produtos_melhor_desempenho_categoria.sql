@@ -0,0 +1,5 @@
+-- Quantidade vendida por produto dentro de cada categoria
+SELECT Categoria AS categoria, CodigoProduto AS codigoproduto, SUM(Quantidade) AS totalvendido
+FROM itens
+GROUP BY Categoria, CodigoProduto
+ORDER BY categoria, totalvendido DESC, codigoproduto
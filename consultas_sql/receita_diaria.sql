@@ -0,0 +1,4 @@
+SELECT date(DataFatura) AS dia, SUM(ValorTotal) AS receitadiaria
+FROM itens
+GROUP BY dia
+ORDER BY dia
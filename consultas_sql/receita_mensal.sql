@@ -0,0 +1,4 @@
+SELECT strftime('%Y-%m-01', DataFatura) AS mes, SUM(ValorTotal) AS receitamensal
+FROM itens
+GROUP BY mes
+ORDER BY mes
@@ -0,0 +1,6 @@
+-- Itens sem país (cliente ausente ou desconhecido) ficam fora, como no cubo e no dashboard
+SELECT Pais AS pais, SUM(ValorTotal) AS receita
+FROM itens
+WHERE Pais IS NOT NULL
+GROUP BY Pais
+ORDER BY receita DESC
@@ -0,0 +1,2 @@
+SELECT SUM(ValorTotal) AS receitatotal
+FROM itens
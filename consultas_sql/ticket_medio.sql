@@ -0,0 +1,3 @@
+-- Valor médio por item de fatura
+SELECT AVG(ValorTotal) AS ticketmedio
+FROM itens
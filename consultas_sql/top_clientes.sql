@@ -0,0 +1,7 @@
+-- Itens sem IDCliente não pertencem a nenhum cliente
+SELECT IDCliente AS idcliente, SUM(ValorTotal) AS totalgasto
+FROM itens
+WHERE IDCliente IS NOT NULL
+GROUP BY IDCliente
+ORDER BY totalgasto DESC, idcliente
+LIMIT 10
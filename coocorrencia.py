@@ -0,0 +1,175 @@
+# Recomendação "comprados juntos" a partir das cestas das faturas
+# As vendas viram uma matriz esparsa fatura x produto (binária). A similaridade de
+# cosseno entre produtos é calculada com produtos de matrizes esparsas em blocos de
+# colunas, guardando só os k vizinhos mais próximos de cada produto, de modo que a
+# memória fica limitada a n_produtos x k. Recomendar para um produto é ler uma linha da
+# matriz de vizinhos; para uma cesta (p.ex. as últimas faturas de um cliente), é um
+# produto vetor x matriz esparsa.
+#
+# Lote para todos os clientes: python coocorrencia.py --lote recomendacoes.parquet [--n 10]
+# Um produto:                  python coocorrencia.py --produto 85123A
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+K_VIZINHOS = 20
+FATURAS_RECENTES = 3
+TAMANHO_BLOCO = 2048
+
+
+# Mantém as k maiores entradas de cada linha de uma matriz CSR
+def _maiores_por_linha(matriz, k):
+    matriz = matriz.tocsr()
+    matriz.eliminate_zeros()
+    linhas = np.repeat(np.arange(matriz.shape[0]), np.diff(matriz.indptr))
+    ordem = np.lexsort((-matriz.data, linhas))
+    posicao = np.arange(len(ordem)) - matriz.indptr[linhas[ordem]]
+    manter = ordem[posicao < k]
+    return linhas[manter], matriz.indices[manter], matriz.data[manter]
+
+
+class RecomendadorCompras:
+    def __init__(self, itens_fatura, k=K_VIZINHOS, faturas_recentes=FATURAS_RECENTES, tamanho_bloco=TAMANHO_BLOCO):
+        vendas = itens_fatura.loc[itens_fatura['Venda'], ['NumeroFatura', 'CodigoProduto', 'IDCliente', 'DataFatura']]
+        codigos_fatura, _ = pd.factorize(vendas['NumeroFatura'])
+        codigos_produto, produtos = pd.factorize(vendas['CodigoProduto'].astype(str))
+        self.produtos = pd.Index(produtos)
+        n_produtos = len(produtos)
+        cestas = sparse.csr_matrix(
+            (np.ones(len(vendas), dtype='float32'), (codigos_fatura, codigos_produto)),
+            shape=(int(codigos_fatura.max()) + 1 if len(vendas) else 0, n_produtos),
+        )
+        cestas.data[:] = 1
+        self.similaridade = self._vizinhos(cestas, k, tamanho_bloco)
+        self.clientes, self.cestas_clientes = self._cestas_recentes(vendas, codigos_produto, n_produtos, faturas_recentes)
+
+    @staticmethod
+    def _vizinhos(cestas, k, tamanho_bloco):
+        n_produtos = cestas.shape[1]
+        normas = np.sqrt(np.asarray(cestas.sum(axis=0)).ravel())
+        inversas = np.divide(1, normas, out=np.zeros_like(normas), where=normas > 0).astype('float32')
+        normalizar_colunas = sparse.diags(inversas)
+        colunas = cestas.tocsc()
+        linhas_k, colunas_k, valores_k = [np.empty(0, dtype='int64')], [np.empty(0, dtype='int64')], [np.empty(0, dtype='float32')]
+        for inicio in range(0, n_produtos, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, n_produtos)
+            # Coocorrência do bloco de produtos com todos os produtos, normalizada (cosseno)
+            bloco = sparse.diags(inversas[inicio:fim]) @ (colunas[:, inicio:fim].T @ cestas) @ normalizar_colunas
+            # k + 1 por linha porque o próprio produto é descartado
+            linhas, indices, valores = _maiores_por_linha(bloco, k + 1)
+            linhas = linhas + inicio
+            outros = indices != linhas
+            linhas_k.append(linhas[outros])
+            colunas_k.append(indices[outros])
+            valores_k.append(valores[outros])
+        forma = (n_produtos, n_produtos)
+        similaridade = sparse.csr_matrix(
+            (np.concatenate(valores_k), (np.concatenate(linhas_k), np.concatenate(colunas_k))), shape=forma, dtype='float32',
+        )
+        linhas, indices, valores = _maiores_por_linha(similaridade, k)
+        return sparse.csr_matrix((valores, (linhas, indices)), shape=forma, dtype='float32')
+
+    # Cesta de cada cliente: produtos das suas últimas faturas
+    @staticmethod
+    def _cestas_recentes(vendas, codigos_produto, n_produtos, faturas_recentes):
+        faturas = vendas.groupby(['IDCliente', 'NumeroFatura'], sort=False)['DataFatura'].max().reset_index()
+        faturas = faturas.sort_values(['IDCliente', 'DataFatura'], ascending=[True, False], kind='stable')
+        recentes = faturas[faturas.groupby('IDCliente').cumcount() < faturas_recentes]
+        # Itens sem IDCliente entram na similaridade, mas não na cesta de nenhum cliente
+        selecionadas = (vendas['NumeroFatura'].isin(recentes['NumeroFatura']) & vendas['IDCliente'].notna()).to_numpy()
+        codigos_cliente, clientes = pd.factorize(vendas['IDCliente'].to_numpy(dtype='int64', na_value=-1)[selecionadas])
+        cestas = sparse.csr_matrix(
+            (np.ones(len(codigos_cliente), dtype='float32'), (codigos_cliente, codigos_produto[selecionadas])),
+            shape=(len(clientes), n_produtos),
+        )
+        cestas.data[:] = 1
+        return pd.Index(clientes), cestas
+
+    def _resultado(self, pontuacoes, n):
+        pontuacoes = np.asarray(pontuacoes).ravel()
+        candidatos = np.flatnonzero(pontuacoes > 0)
+        melhores = candidatos[np.argsort(-pontuacoes[candidatos], kind='stable')[:n]]
+        return list(zip(self.produtos[melhores], pontuacoes[melhores].tolist()))
+
+    def recomendar_produto(self, codigo, n=5):
+        posicao = self.produtos.get_indexer([str(codigo)])[0]
+        if posicao < 0:
+            return []
+        return self._resultado(self.similaridade[posicao].toarray(), n)
+
+    def recomendar_cesta(self, codigos, n=5):
+        posicoes = self.produtos.get_indexer([str(codigo) for codigo in codigos])
+        posicoes = np.unique(posicoes[posicoes >= 0])
+        if not len(posicoes):
+            return []
+        pontuacoes = np.asarray(self.similaridade[posicoes].sum(axis=0)).ravel()
+        pontuacoes[posicoes] = 0
+        return self._resultado(pontuacoes, n)
+
+    def recomendar_cliente(self, id_cliente, n=5):
+        posicao = self.clientes.get_indexer([id_cliente])[0]
+        if posicao < 0:
+            return []
+        cesta = self.cestas_clientes[posicao]
+        pontuacoes = (cesta @ self.similaridade).toarray().ravel()
+        pontuacoes[cesta.indices] = 0
+        return self._resultado(pontuacoes, n)
+
+    # Top-n de todos os clientes, em blocos de clientes para limitar a memória
+    def recomendar_lote(self, n=10, tamanho_bloco=50_000):
+        partes = []
+        for inicio in range(0, len(self.clientes), tamanho_bloco):
+            cestas = self.cestas_clientes[inicio:inicio + tamanho_bloco]
+            pontuacoes = (cestas @ self.similaridade).tocsr()
+            # Remove os produtos que já estão na cesta
+            pontuacoes = pontuacoes - pontuacoes.multiply(cestas)
+            linhas, colunas, valores = _maiores_por_linha(pontuacoes, n)
+            partes.append(pd.DataFrame({
+                'IDCliente': self.clientes[linhas + inicio],
+                'CodigoProduto': self.produtos[colunas],
+                'Pontuacao': valores,
+            }))
+        if not partes:
+            return pd.DataFrame(columns=['IDCliente', 'Posicao', 'CodigoProduto', 'Pontuacao'])
+        lote = pd.concat(partes, ignore_index=True)
+        lote.insert(1, 'Posicao', lote.groupby('IDCliente').cumcount() + 1)
+        return lote
+
+
+_recomendador_atual = None
+
+
+def obter_recomendador(itens_fatura):
+    global _recomendador_atual
+    if _recomendador_atual is None or _recomendador_atual[0] is not itens_fatura:
+        _recomendador_atual = (itens_fatura, RecomendadorCompras(itens_fatura))
+    return _recomendador_atual[1]
+
+
+if __name__ == '__main__':
+    from dados import carregar_fatos
+
+    parser = argparse.ArgumentParser(description='Recomendações de produtos comprados juntos.')
+    parser.add_argument('--produto', help='mostrar os produtos comprados junto com este código')
+    parser.add_argument('--lote', metavar='ARQUIVO', help='gravar o top-n de todos os clientes (.parquet ou .csv)')
+    parser.add_argument('--n', type=int, default=10)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    recomendador = RecomendadorCompras(carregar_fatos())
+    print(f'Matriz de vizinhos: {recomendador.similaridade.shape[0]} produtos, '
+          f'{recomendador.similaridade.nnz} pares em {time.perf_counter() - inicio:.2f} s')
+    if args.produto:
+        for codigo, pontuacao in recomendador.recomendar_produto(args.produto, args.n):
+            print(f'{codigo}\t{pontuacao:.3f}')
+    if args.lote:
+        inicio = time.perf_counter()
+        lote = recomendador.recomendar_lote(args.n)
+        if args.lote.endswith('.csv'):
+            lote.to_csv(args.lote, index=False)
+        else:
+            lote.to_parquet(args.lote, index=False)
+        print(f'{lote["IDCliente"].nunique()} clientes, {len(lote)} recomendações em {time.perf_counter() - inicio:.2f} s')
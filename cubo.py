@@ -0,0 +1,200 @@
+# Cubo de vendas pré-agregado (dia x país x categoria x faixa de preço)
+# Cada célula guarda a soma de ValorTotal e Quantidade, o número de linhas e esboços
+# HyperLogLog das faturas e clientes distintos, que podem ser combinados entre células.
+# As séries de receita do Relatório de Vendas são respondidas a partir do cubo, sem
+# varrer a tabela de itens.
+#
+# Construção offline: python cubo.py
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dados import DIRETORIO_CACHE, carregar_fatos, versao_dados
+from filtros import FAIXAS_PRECO, codificar_faixa_preco
+from instrumentacao import instrumentar
+
+DIMENSOES = ['Dia', 'Pais', 'Categoria', 'FaixaPreco']
+# 2^8 registradores por esboço: erro padrão de aproximadamente 6,5%
+PRECISAO_HLL = 8
+VERSAO_FORMATO_CUBO = 1
+
+
+# Esboços HyperLogLog
+def _posicoes_hll(valores, precisao):
+    hashes = pd.util.hash_array(np.asarray(valores))
+    registrador = (hashes >> np.uint64(64 - precisao)).astype('int64')
+    restante = hashes & np.uint64((1 << (64 - precisao)) - 1)
+    # Posição do primeiro bit 1 nos 64 - precisao bits restantes
+    bits = np.zeros(len(restante), dtype='int64')
+    nao_nulos = restante > 0
+    bits[nao_nulos] = np.floor(np.log2(restante[nao_nulos].astype('float64'))).astype('int64') + 1
+    rho = (64 - precisao) - bits + 1
+    return registrador, rho.astype('uint8')
+
+
+def _esbocos_por_celula(celula, n_celulas, valores, precisao):
+    registradores = np.zeros((n_celulas, 1 << precisao), dtype='uint8')
+    registrador, rho = _posicoes_hll(valores, precisao)
+    np.maximum.at(registradores, (celula, registrador), rho)
+    return registradores
+
+
+def estimar_distintos(registradores):
+    m = registradores.shape[-1]
+    alfa = 0.7213 / (1 + 1.079 / m)
+    estimativa = alfa * m * m / np.sum(np.power(2.0, -registradores.astype('float64')))
+    zeros = np.count_nonzero(registradores == 0)
+    if estimativa <= 2.5 * m and zeros:
+        estimativa = m * np.log(m / zeros)
+    return int(round(estimativa))
+
+
+class Cubo:
+    def __init__(self, celulas, esbocos):
+        self.celulas = celulas
+        self.esbocos = esbocos
+        self._dias = celulas['Dia'].to_numpy()
+
+    def _mascara(self, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+        mascara = np.ones(len(self.celulas), dtype=bool)
+        if inicio is not None:
+            mascara &= self._dias >= np.datetime64(pd.Timestamp(inicio).normalize())
+        if fim is not None:
+            mascara &= self._dias <= np.datetime64(pd.Timestamp(fim).normalize())
+        for coluna, valor in (('Pais', pais), ('Categoria', categoria), ('FaixaPreco', faixa_preco)):
+            if valor is not None:
+                mascara &= (self.celulas[coluna] == valor).to_numpy()
+        return mascara
+
+    def selecionar(self, **filtros):
+        return self.celulas[self._mascara(**filtros)]
+
+    def receita_total(self, **filtros):
+        return self.selecionar(**filtros)['ValorTotal'].sum()
+
+    @instrumentar
+    def receita_diaria(self, **filtros):
+        celulas = self.selecionar(**filtros)
+        receita = celulas.groupby('Dia')['ValorTotal'].sum()
+        receita.index = receita.index.date
+        receita.index.name = 'DataFatura'
+        return receita
+
+    @instrumentar
+    def receita_mensal(self, **filtros):
+        celulas = self.selecionar(**filtros)
+        receita = celulas.groupby(celulas['Dia'].dt.to_period('M'))['ValorTotal'].sum()
+        receita.index.name = 'DataFatura'
+        return receita
+
+    def tendencia_vendas(self, **filtros):
+        return self.receita_mensal(**filtros)
+
+    @instrumentar
+    def variacao_sazonal(self, **filtros):
+        celulas = self.selecionar(**filtros)
+        receita = celulas.groupby(celulas['Dia'].dt.month)['ValorTotal'].sum()
+        receita.index.name = 'DataFatura'
+        return receita
+
+    @instrumentar
+    def receita_por_pais(self, **filtros):
+        return self.selecionar(**filtros).groupby('Pais', observed=True)['ValorTotal'].sum()
+
+    @instrumentar
+    def contar_distintos(self, esboco, **filtros):
+        mascara = self._mascara(**filtros)
+        if not mascara.any():
+            return 0
+        return estimar_distintos(self.esbocos[esboco][mascara].max(axis=0))
+
+    def faturas_distintas(self, **filtros):
+        return self.contar_distintos('faturas', **filtros)
+
+    def clientes_distintos(self, **filtros):
+        return self.contar_distintos('clientes', **filtros)
+
+
+@instrumentar
+def construir_cubo(fatos, precisao=PRECISAO_HLL):
+    chaves = pd.DataFrame({
+        'Dia': fatos['DataFatura'].dt.normalize(),
+        'Pais': fatos['Pais'],
+        'Categoria': fatos['Categoria'],
+        'FaixaPreco': pd.Categorical.from_codes(codificar_faixa_preco(fatos['PrecoUnitario']), FAIXAS_PRECO),
+    })
+    celula = chaves.groupby(DIMENSOES, observed=True, dropna=False, sort=True).ngroup().to_numpy()
+    n_celulas = int(celula.max()) + 1 if len(celula) else 0
+    _, primeiras = np.unique(celula, return_index=True)
+    celulas = chaves.iloc[primeiras].reset_index(drop=True)
+    celulas['ValorTotal'] = np.bincount(celula, weights=fatos['ValorTotal'].to_numpy(), minlength=n_celulas)
+    celulas['Quantidade'] = np.bincount(celula, weights=fatos['Quantidade'].to_numpy(), minlength=n_celulas).astype('int64')
+    celulas['Linhas'] = np.bincount(celula, minlength=n_celulas).astype('int64')
+    # Itens sem IDCliente contam para as faturas, mas não para os clientes distintos
+    com_cliente = fatos['IDCliente'].notna().to_numpy()
+    esbocos = {
+        'faturas': _esbocos_por_celula(celula, n_celulas, fatos['NumeroFatura'].to_numpy(dtype=object), precisao),
+        'clientes': _esbocos_por_celula(
+            celula[com_cliente], n_celulas, fatos['IDCliente'].to_numpy(dtype='int64', na_value=-1)[com_cliente], precisao,
+        ),
+    }
+    return Cubo(celulas, esbocos)
+
+
+def _caminhos(versao):
+    base = os.path.join(DIRETORIO_CACHE, f'cubo-v{VERSAO_FORMATO_CUBO}-{versao}')
+    return base + '.parquet', base + '.npz'
+
+
+def salvar_cubo(cubo, versao):
+    caminho_celulas, caminho_esbocos = _caminhos(versao)
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    # Arquivos temporários por processo e substituição atômica, esboços antes das células:
+    # quem lê o cubo ao mesmo tempo nunca encontra um arquivo pela metade
+    sufixo = f'.{os.getpid()}.tmp'
+    with open(caminho_esbocos + sufixo, 'wb') as arquivo:
+        np.savez_compressed(arquivo, **cubo.esbocos)
+    os.replace(caminho_esbocos + sufixo, caminho_esbocos)
+    cubo.celulas.to_parquet(caminho_celulas + sufixo, index=False)
+    os.replace(caminho_celulas + sufixo, caminho_celulas)
+    for arquivo in os.listdir(DIRETORIO_CACHE):
+        caminho = os.path.join(DIRETORIO_CACHE, arquivo)
+        if arquivo.startswith('cubo-') and not arquivo.endswith('.tmp') and caminho not in (caminho_celulas, caminho_esbocos):
+            os.remove(caminho)
+
+
+def ler_cubo(versao):
+    caminho_celulas, caminho_esbocos = _caminhos(versao)
+    if not (os.path.exists(caminho_celulas) and os.path.exists(caminho_esbocos)):
+        return None
+    with np.load(caminho_esbocos) as arquivo:
+        esbocos = {nome: arquivo[nome] for nome in arquivo.files}
+    return Cubo(pd.read_parquet(caminho_celulas), esbocos)
+
+
+_cubo_atual = None
+_trava = threading.Lock()
+
+
+# Cubo da versão atual dos dados: lido do disco ou construído (e salvo) se ainda não existir
+def obter_cubo():
+    global _cubo_atual
+    versao = versao_dados('clientes', 'itens_fatura', 'produtos')
+    with _trava:
+        if _cubo_atual is not None and _cubo_atual[0] == versao:
+            return _cubo_atual[1]
+        cubo = ler_cubo(versao)
+        if cubo is None:
+            cubo = construir_cubo(carregar_fatos())
+            salvar_cubo(cubo, versao)
+        _cubo_atual = (versao, cubo)
+        return cubo
+
+
+if __name__ == '__main__':
+    versao = versao_dados('clientes', 'itens_fatura', 'produtos')
+    cubo = construir_cubo(carregar_fatos())
+    salvar_cubo(cubo, versao)
+    print(f"Cubo construído: {len(cubo.celulas)} células, versão {versao}")
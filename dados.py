@@ -0,0 +1,266 @@
+# Camada de carregamento de dados
+# Cada tabela é lida uma única vez, convertida para Parquet tipado e servida a partir
+# de um cache compartilhado pelo processo, invalidado quando o CSV de origem muda.
+# Com a memória compartilhada ativa (padrão), cada versão também é publicada como arquivo
+# Arrow e mapeada em memória (memoria_compartilhada.py): sessões e processos leem as
+# mesmas páginas, sem uma cópia das tabelas por processo.
+import hashlib
+import os
+import threading
+import urllib.request
+
+import pandas as pd
+
+from instrumentacao import etapa, instrumentar
+from memoria_compartilhada import gravar_arrow, mapear_arrow
+
+DIRETORIO_DADOS = os.environ.get('KORE_DADOS_DIR', os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_CACHE = os.environ.get('KORE_CACHE_DIR', os.path.join(DIRETORIO_DADOS, '.cache_dados'))
+# KORE_MEMORIA_COMPARTILHADA=0 volta a ler o Parquet para a memória de cada processo
+MEMORIA_COMPARTILHADA = os.environ.get('KORE_MEMORIA_COMPARTILHADA', '1') != '0'
+
+# URL usada apenas quando o CSV ainda não existe localmente
+BASE_URL = 'https://raw.githubusercontent.com/GiovanoMP/projeto_kore_data/main/'
+
+ARQUIVOS = {
+    'clientes': 'clientes.csv',
+    'itens_fatura': 'itens_fatura.csv',
+    'produtos': 'produtos.csv',
+    'segmentacao': 'df_treinamento_reduzido.csv',
+}
+
+# Tabelas geradas pelo projeto em Parquet tipado; quando o arquivo existe, é lido no lugar do CSV
+ARQUIVOS_PARQUET = {
+    'segmentacao': 'segmentacao.parquet',
+}
+
+# Incrementar quando a tipagem das tabelas mudar: invalida o Parquet de cada tabela e,
+# por fazer parte de versao_dados, a tabela fato, o cubo, o banco e os resultados em cache
+VERSAO_FORMATO_TABELAS = 2
+
+# nome da tabela -> (assinatura do arquivo, hash do conteúdo, DataFrame)
+_cache = {}
+_trava = threading.Lock()
+
+
+def caminho_origem(nome):
+    if nome in ARQUIVOS_PARQUET:
+        caminho = os.path.join(DIRETORIO_DADOS, ARQUIVOS_PARQUET[nome])
+        if os.path.exists(caminho):
+            return caminho
+    return os.path.join(DIRETORIO_DADOS, ARQUIVOS[nome])
+
+
+def _baixar_se_ausente(nome):
+    caminho = caminho_origem(nome)
+    if not os.path.exists(caminho):
+        os.makedirs(DIRETORIO_DADOS, exist_ok=True)
+        temporario = caminho + '.download'
+        with etapa(f'baixar {ARQUIVOS[nome]}'):
+            urllib.request.urlretrieve(BASE_URL + ARQUIVOS[nome], temporario)
+        os.replace(temporario, caminho)
+    return caminho
+
+
+def _hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+# Conversão de tipos por tabela
+def _tipar_clientes(df):
+    df = df.dropna(subset=['IDCliente'])
+    df['IDCliente'] = df['IDCliente'].astype('int64')
+    df['Pais'] = df['Pais'].astype('category')
+    return df
+
+
+def _tipar_itens_fatura(df):
+    df['DataFatura'] = pd.to_datetime(df['DataFatura'], errors='coerce')
+    df = df.dropna(subset=['DataFatura'])
+    df['NumeroFatura'] = df['NumeroFatura'].astype(str)
+    df['CodigoProduto'] = df['CodigoProduto'].astype(str)
+    # Itens sem cliente continuam nas vendas e receitas; IDCliente nulo (Int64) fica de fora
+    # das métricas por cliente, que agrupam ou contam clientes distintos
+    df['IDCliente'] = df['IDCliente'].astype('Int64')
+    df['Quantidade'] = df['Quantidade'].astype('int64')
+    df['ValorTotal'] = df['ValorTotal'].astype('float64')
+    df['Venda'] = df['Venda'].astype(bool)
+    df['Devolucao'] = df['Devolucao'].astype(bool)
+    return df
+
+
+def _tipar_produtos(df):
+    df['CodigoProduto'] = df['CodigoProduto'].astype(str)
+    df['Categoria'] = df['Categoria'].astype('category')
+    df['PrecoUnitario'] = df['PrecoUnitario'].astype('float64')
+    df['CategoriaPreco'] = df['CategoriaPreco'].astype('category')
+    return df
+
+
+def _tipar_segmentacao(df):
+    df = df.dropna(subset=['IDCliente'])
+    df['IDCliente'] = df['IDCliente'].astype('int64')
+    df['segmento'] = df['segmento'].astype('int64')
+    return df
+
+
+_TIPAGEM = {
+    'clientes': _tipar_clientes,
+    'itens_fatura': _tipar_itens_fatura,
+    'produtos': _tipar_produtos,
+    'segmentacao': _tipar_segmentacao,
+}
+
+
+def _converter_origem(nome, caminho, caminho_parquet):
+    with etapa(f'ler {os.path.basename(caminho)}') as registro:
+        if caminho.endswith('.parquet'):
+            df = pd.read_parquet(caminho)
+        else:
+            df = pd.read_csv(caminho)
+        registro.linhas_saida = len(df)
+    df.rename(columns=lambda x: x.strip(), inplace=True)
+    df = _TIPAGEM[nome](df).reset_index(drop=True)
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    temporario = caminho_parquet + '.tmp'
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho_parquet)
+    _remover_versoes_antigas(nome, caminho_parquet)
+    return df
+
+
+def _remover_versoes_antigas(nome, caminho_atual):
+    extensao = os.path.splitext(caminho_atual)[1]
+    for arquivo in os.listdir(DIRETORIO_CACHE):
+        caminho = os.path.join(DIRETORIO_CACHE, arquivo)
+        if arquivo.startswith(nome + '-') and arquivo.endswith(extensao) and caminho != caminho_atual:
+            # Processos que ainda mapeiam um arquivo Arrow removido continuam lendo a versão antiga
+            os.remove(caminho)
+
+
+# Publica o DataFrame como arquivo Arrow (uma vez por versão) e devolve a visão mapeada
+def _compartilhar(nome, df, caminho_parquet):
+    if not MEMORIA_COMPARTILHADA:
+        return df
+    caminho_arrow = os.path.splitext(caminho_parquet)[0] + '.arrow'
+    if not os.path.exists(caminho_arrow):
+        with etapa('publicar Arrow'):
+            gravar_arrow(df, caminho_arrow)
+        _remover_versoes_antigas(nome, caminho_arrow)
+    with etapa('mapear Arrow'):
+        return mapear_arrow(caminho_arrow)
+
+
+def _ler_cache(caminho_parquet):
+    caminho_arrow = os.path.splitext(caminho_parquet)[0] + '.arrow'
+    if MEMORIA_COMPARTILHADA and os.path.exists(caminho_arrow):
+        with etapa('mapear Arrow'):
+            return mapear_arrow(caminho_arrow)
+    with etapa('ler Parquet'):
+        return pd.read_parquet(caminho_parquet)
+
+
+def carregar_tabela(nome):
+    with etapa(f'carregar_tabela {nome}') as registro:
+        df = _carregar_tabela(nome)
+        registro.linhas_saida = len(df)
+    return df
+
+
+def _carregar_tabela(nome):
+    caminho = _baixar_se_ausente(nome)
+    assinatura = _assinatura(caminho)
+    with _trava:
+        em_cache = _cache.get(nome)
+        if em_cache is not None and em_cache[0] == assinatura:
+            return em_cache[2]
+        with etapa('hash da origem'):
+            hash_origem = _hash_arquivo(caminho)
+        if em_cache is not None and em_cache[1] == hash_origem:
+            # Arquivo tocado mas com o mesmo conteúdo
+            _cache[nome] = (assinatura, hash_origem, em_cache[2])
+            return em_cache[2]
+        caminho_parquet = os.path.join(DIRETORIO_CACHE, f'{nome}-v{VERSAO_FORMATO_TABELAS}-{hash_origem[:16]}.parquet')
+        if os.path.exists(caminho_parquet):
+            df = _ler_cache(caminho_parquet)
+        else:
+            with etapa('converter para Parquet'):
+                df = _converter_origem(nome, caminho, caminho_parquet)
+        df = _compartilhar(nome, df, caminho_parquet)
+        _cache[nome] = (assinatura, hash_origem, df)
+        return df
+
+
+# Tabela fato desnormalizada: itens de fatura + atributos do produto e país do cliente,
+# materializada uma única vez por versão das tabelas de origem
+COLUNAS_PRODUTO_FATOS = ['Categoria', 'PrecoUnitario', 'CategoriaPreco']
+COLUNAS_CATEGORICAS_FATOS = ['CodigoProduto', 'Categoria', 'CategoriaPreco', 'Pais']
+# Incrementar quando o layout da tabela fato mudar, para invalidar o Parquet em cache
+VERSAO_FORMATO_FATOS = 2
+
+
+def _construir_fatos(itens_fatura, produtos, clientes):
+    fatos = itens_fatura.copy()
+    produtos_indexados = produtos.drop_duplicates(subset=['CodigoProduto']).set_index('CodigoProduto')
+    for coluna in COLUNAS_PRODUTO_FATOS:
+        fatos[coluna] = produtos_indexados[coluna].reindex(fatos['CodigoProduto']).to_numpy()
+    paises = clientes.drop_duplicates(subset=['IDCliente']).set_index('IDCliente')['Pais']
+    fatos['Pais'] = paises.reindex(fatos['IDCliente']).to_numpy()
+    for coluna in COLUNAS_CATEGORICAS_FATOS:
+        fatos[coluna] = fatos[coluna].astype('category')
+    # Ordenada por DataFatura para permitir recortes de período por busca binária
+    return fatos.sort_values('DataFatura', kind='stable').reset_index(drop=True)
+
+
+@instrumentar
+def carregar_fatos():
+    clientes = carregar_tabela('clientes')
+    itens_fatura = carregar_tabela('itens_fatura')
+    produtos = carregar_tabela('produtos')
+    versao = versao_dados('clientes', 'itens_fatura', 'produtos')
+    with _trava:
+        em_cache = _cache.get('fatos')
+        if em_cache is not None and em_cache[1] == versao:
+            return em_cache[2]
+        caminho_parquet = os.path.join(DIRETORIO_CACHE, f'fatos-v{VERSAO_FORMATO_FATOS}-{versao}.parquet')
+        if os.path.exists(caminho_parquet):
+            fatos = _ler_cache(caminho_parquet)
+        else:
+            with etapa('construir fatos', len(itens_fatura)):
+                fatos = _construir_fatos(itens_fatura, produtos, clientes)
+            os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+            temporario = caminho_parquet + '.tmp'
+            fatos.to_parquet(temporario, index=False)
+            os.replace(temporario, caminho_parquet)
+            _remover_versoes_antigas('fatos', caminho_parquet)
+        fatos = _compartilhar('fatos', fatos, caminho_parquet)
+        _cache['fatos'] = (None, versao, fatos)
+        return fatos
+
+
+def carregar_dados():
+    return tuple(carregar_tabela(nome) for nome in ('clientes', 'itens_fatura', 'produtos', 'segmentacao'))
+
+
+# Versão dos dados carregados, usada como chave por caches derivados
+def versao_dados(*nomes):
+    nomes = nomes or tuple(ARQUIVOS)
+    partes = [f'v{VERSAO_FORMATO_TABELAS}']
+    for nome in nomes:
+        _carregar_tabela(nome)
+        partes.append(_cache[nome][1][:16])
+    return '-'.join(partes)
+
+
+def limpar_cache():
+    with _trava:
+        _cache.clear()
@@ -0,0 +1,190 @@
+# Gerador de dados sintéticos
+# Formato bruto do online_retail (InvoiceNo, StockCode, ...), para a ingestão: os produtos e
+# clientes são sorteados de produtos.csv e clientes.csv, com popularidade concentrada
+# (Zipf), devoluções, clientes ausentes e preços zerados, como na fonte real. As linhas
+# são geradas e gravadas em blocos, então arquivos grandes não passam pela memória.
+#
+# Tabelas já limpas (clientes, produtos, itens_fatura e segmentação) no esquema lido pelo
+# dashboard, em escala: `escala` vezes LINHAS_BASE itens e `escala` vezes os clientes de
+# clientes.csv, no mesmo período da fonte real. Compras concentradas em poucos clientes e
+# produtos (pesos de cauda longa), faturas de devolução e sazonalidade mensal e semanal.
+#
+# Uso: python dados_sinteticos.py 1000000 online_retail_sintetico.csv [--semente 0]
+#      python dados_sinteticos.py --tabelas dados_10x --escala 10 [--semente 0]
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+TAMANHO_BLOCO = 100_000
+PRIMEIRA_FATURA = 536000
+FATURAS_POR_ANO = 45000
+INICIO = pd.Timestamp('2010-12-01 08:00')
+FIM = pd.Timestamp('2011-12-09 18:00')
+
+# Itens de fatura do itens_fatura.csv original (escala 1)
+LINHAS_BASE = 400_000
+ITENS_POR_FATURA = 20
+TAXA_DEVOLUCAO = 0.02
+PRIMEIRO_CLIENTE_SINTETICO = 20000
+# Peso de cada mês (jan..dez) e dia da semana (seg..dom): pico no fim do ano, sem sábados
+PESOS_MES = np.array([0.7, 0.65, 0.8, 0.75, 0.8, 0.8, 0.8, 0.8, 1.1, 1.2, 1.6, 1.0])
+PESOS_DIA_SEMANA = np.array([1.0, 1.0, 1.0, 1.1, 0.8, 0.0, 0.7])
+# Expoente dos pesos por posição (1 / posição ** expoente) de produtos e clientes
+CONCENTRACAO_PRODUTOS = 0.6
+CONCENTRACAO_CLIENTES = 0.5
+NUM_SEGMENTOS = 5
+
+
+def gerar_bloco(rng, produtos, clientes, n, primeira_linha=0, linhas_totais=None):
+    linhas_totais = linhas_totais or n
+    # As faturas crescem com a posição da linha, mantendo o arquivo em ordem cronológica
+    posicao = (primeira_linha + np.arange(n)) / linhas_totais
+    anos = max(1, linhas_totais // 500_000)
+    fatura = PRIMEIRA_FATURA + (posicao * FATURAS_POR_ANO * anos).astype('int64') + rng.integers(0, 3, n)
+    cliente = (fatura * 7919) % len(clientes)
+    produto = rng.zipf(1.3, n) % len(produtos)
+    devolucao = rng.random(n) < 0.02
+    quantidade = rng.integers(1, 24, n)
+    segundos = (posicao * 373 * 86400 * anos).astype('int64')
+    df = pd.DataFrame({
+        'InvoiceNo': np.where(devolucao, 'C' + fatura.astype(str), fatura.astype(str)),
+        'StockCode': produtos['CodigoProduto'].to_numpy()[produto],
+        'Description': produtos['Descricao'].to_numpy()[produto],
+        'Quantity': np.where(devolucao, -quantidade, quantidade),
+        'InvoiceDate': INICIO + pd.to_timedelta(segundos, unit='s'),
+        'UnitPrice': produtos['PrecoUnitario'].to_numpy()[produto],
+        'CustomerID': clientes['IDCliente'].to_numpy()[cliente].astype('float64'),
+        'Country': clientes['Pais'].to_numpy()[cliente],
+    })
+    df.loc[rng.random(n) < 0.01, 'CustomerID'] = np.nan
+    df.loc[rng.random(n) < 0.005, 'UnitPrice'] = 0
+    return df
+
+
+def gerar_csv(caminho, linhas, semente=0, tamanho_bloco=TAMANHO_BLOCO):
+    rng = np.random.default_rng(semente)
+    produtos = pd.read_csv(os.path.join(DIRETORIO, 'produtos.csv'), dtype={'CodigoProduto': str})
+    clientes = pd.read_csv(os.path.join(DIRETORIO, 'clientes.csv'))
+    for inicio in range(0, linhas, tamanho_bloco):
+        n = min(tamanho_bloco, linhas - inicio)
+        bloco = gerar_bloco(rng, produtos, clientes, n, inicio, linhas)
+        bloco.to_csv(caminho, mode='w' if inicio == 0 else 'a', header=inicio == 0, index=False)
+
+
+# Probabilidades de cauda longa, com a ordem de popularidade embaralhada
+def _pesos_cauda_longa(rng, n, expoente):
+    pesos = 1 / np.arange(1, n + 1) ** expoente
+    return rng.permutation(pesos / pesos.sum())
+
+
+def gerar_clientes(rng, escala):
+    base = pd.read_csv(os.path.join(DIRETORIO, 'clientes.csv')).drop_duplicates(subset=['IDCliente'])
+    n_extras = len(base) * (escala - 1)
+    extras = pd.DataFrame({
+        'IDCliente': PRIMEIRO_CLIENTE_SINTETICO + np.arange(n_extras, dtype='float64'),
+        'Pais': rng.choice(base['Pais'].to_numpy(), n_extras),
+    })
+    return pd.concat([base, extras], ignore_index=True)
+
+
+# Itens das faturas de um grupo de dias consecutivos, já no esquema de itens_fatura.csv
+def gerar_itens(rng, dias, faturas_por_dia, primeira_fatura, produtos, pesos_produtos, clientes, pesos_clientes):
+    n_faturas = int(faturas_por_dia.sum())
+    numero = primeira_fatura + np.arange(n_faturas)
+    dia_fatura = dias.repeat(faturas_por_dia)
+    # Minutos desde as 8h, em ordem dentro de cada dia
+    minutos = rng.integers(0, 10 * 60, n_faturas)
+    minutos = minutos[np.lexsort((minutos, dia_fatura.asi8))]
+    data_fatura = dia_fatura + pd.Timedelta(hours=8) + pd.to_timedelta(minutos, unit='m')
+    cliente_fatura = rng.choice(len(clientes), n_faturas, p=pesos_clientes)
+    devolucao_fatura = rng.random(n_faturas) < TAXA_DEVOLUCAO
+
+    itens_por_fatura = rng.geometric(1 / ITENS_POR_FATURA, n_faturas)
+    fatura_linha = np.repeat(np.arange(n_faturas), itens_por_fatura)
+    n = len(fatura_linha)
+    produto = rng.choice(len(produtos), n, p=pesos_produtos)
+    devolucao = devolucao_fatura[fatura_linha]
+    quantidade = rng.geometric(0.12, n)
+    quantidade = np.where(devolucao, -quantidade, quantidade)
+    numero_texto = numero.astype(str)[fatura_linha]
+    return pd.DataFrame({
+        'NumeroFatura': np.where(devolucao, np.char.add('C', numero_texto), numero_texto),
+        'CodigoProduto': produtos['CodigoProduto'].to_numpy()[produto],
+        'IDCliente': clientes['IDCliente'].to_numpy()[cliente_fatura][fatura_linha],
+        'DataFatura': data_fatura[fatura_linha],
+        'Quantidade': quantidade,
+        'ValorTotal': np.round(quantidade * produtos['PrecoUnitario'].to_numpy()[produto], 2),
+        'Venda': ~devolucao,
+        'Devolucao': devolucao,
+    })
+
+
+# Segmento sorteado por cliente, com os produtos mais populares de cada segmento
+def gerar_segmentacao(rng, clientes, produtos, pesos_produtos):
+    populares = produtos['CodigoProduto'].to_numpy()[np.argsort(-pesos_produtos)[:NUM_SEGMENTOS * 20]]
+    recomendados = {
+        segmento: str([str(codigo) for codigo in rng.choice(populares, 5, replace=False)])
+        for segmento in range(1, NUM_SEGMENTOS + 1)
+    }
+    segmento = rng.integers(1, NUM_SEGMENTOS + 1, len(clientes))
+    return pd.DataFrame({
+        'IDCliente': clientes['IDCliente'].to_numpy(),
+        'segmento': segmento,
+        'ProdutosRecomendados': pd.Series(segmento).map(recomendados).to_numpy(),
+    })
+
+
+def gerar_tabelas(diretorio, escala=1, semente=0, linhas_base=LINHAS_BASE, tamanho_bloco=TAMANHO_BLOCO):
+    rng = np.random.default_rng(semente)
+    os.makedirs(diretorio, exist_ok=True)
+    produtos = pd.read_csv(os.path.join(DIRETORIO, 'produtos.csv'), dtype={'CodigoProduto': str})
+    produtos = produtos.drop_duplicates(subset=['CodigoProduto']).reset_index(drop=True)
+    clientes = gerar_clientes(rng, escala)
+    pesos_produtos = _pesos_cauda_longa(rng, len(produtos), CONCENTRACAO_PRODUTOS)
+    pesos_clientes = _pesos_cauda_longa(rng, len(clientes), CONCENTRACAO_CLIENTES)
+
+    dias = pd.date_range(INICIO.normalize(), FIM.normalize(), freq='D')
+    pesos_dias = PESOS_MES[dias.month - 1] * PESOS_DIA_SEMANA[dias.dayofweek]
+    n_faturas = max(1, linhas_base * escala // ITENS_POR_FATURA)
+    faturas_por_dia = rng.multinomial(n_faturas, pesos_dias / pesos_dias.sum())
+
+    # Grupos de dias com aproximadamente tamanho_bloco linhas, gravados em ordem cronológica
+    caminho_itens = os.path.join(diretorio, 'itens_fatura.csv')
+    faturas_por_bloco = max(1, tamanho_bloco // ITENS_POR_FATURA)
+    grupo = np.cumsum(faturas_por_dia) // faturas_por_bloco
+    primeira_fatura, linhas = PRIMEIRA_FATURA, 0
+    for numero_grupo in np.unique(grupo):
+        selecionados = grupo == numero_grupo
+        itens = gerar_itens(
+            rng, dias[selecionados], faturas_por_dia[selecionados], primeira_fatura,
+            produtos, pesos_produtos, clientes, pesos_clientes,
+        )
+        itens.to_csv(caminho_itens, mode='w' if linhas == 0 else 'a', header=linhas == 0, index=False)
+        primeira_fatura += int(faturas_por_dia[selecionados].sum())
+        linhas += len(itens)
+
+    clientes.to_csv(os.path.join(diretorio, 'clientes.csv'), index=False)
+    produtos.to_csv(os.path.join(diretorio, 'produtos.csv'), index=False)
+    gerar_segmentacao(rng, clientes, produtos, pesos_produtos).to_csv(
+        os.path.join(diretorio, 'df_treinamento_reduzido.csv'), index=False,
+    )
+    return {'escala': escala, 'linhas': linhas, 'faturas': n_faturas, 'clientes': len(clientes), 'produtos': len(produtos)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos no formato bruto do online_retail ou nas tabelas do projeto.')
+    parser.add_argument('linhas', type=int, nargs='?')
+    parser.add_argument('saida', nargs='?')
+    parser.add_argument('--tabelas', metavar='DIRETORIO', help='gerar clientes, produtos, itens_fatura e segmentação')
+    parser.add_argument('--escala', type=int, default=1, help='múltiplo do tamanho original (com --tabelas)')
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    if args.tabelas:
+        print(gerar_tabelas(args.tabelas, args.escala, args.semente))
+    elif args.linhas and args.saida:
+        gerar_csv(args.saida, args.linhas, args.semente)
+    else:
+        parser.error('informe linhas e saida, ou --tabelas DIRETORIO')
@@ -0,0 +1,325 @@
+# Pipeline de ETL: online_retail.xlsx -> clientes / produtos / itens_fatura
+# Extraído dos notebooks retail.ipynb2/3. Cada execução processa apenas um novo lote de
+# faturas: os itens cujo (NumeroFatura, CodigoProduto) já foi carregado por uma execução
+# anterior são descartados por um índice de hashes particionado por mês, os itens novos
+# são anexados em partições mensais e só produtos nunca vistos passam pela categorização.
+# Dentro da fonte, linhas com o mesmo par e quantidade ou preço diferentes são mantidas,
+# como no notebook (limpar remove apenas linhas inteiramente duplicadas).
+#
+# A fonte é lida em blocos (CSV com chunksize, xlsx por iteração de linhas em modo somente
+# leitura) e cada bloco é limpo e gravado antes de ler o próximo, de modo que o pico de
+# memória depende do tamanho do bloco e não do tamanho do arquivo.
+#
+# Uso: python etl.py online_retail.xlsx --saida dados_etl [--tamanho-bloco 100000] [--exportar-csv .]
+import argparse
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from categorizacao import Categorizador, carregar_modelo, carregar_referencia, salvar_modelo
+from transformacoes import categorizar_precos, limpar_descricoes, marcar_devolucoes
+
+DIRETORIO_SAIDA = 'dados_etl'
+TAMANHO_BLOCO = 100_000
+
+# Renomear as colunas para o português
+COLUNAS = {
+    'InvoiceNo': 'NumeroFatura',
+    'StockCode': 'CodigoProduto',
+    'Description': 'Descricao',
+    'Quantity': 'Quantidade',
+    'InvoiceDate': 'DataFatura',
+    'UnitPrice': 'PrecoUnitario',
+    'CustomerID': 'IDCliente',
+    'Country': 'Pais',
+}
+
+COLUNAS_CLIENTES = ['IDCliente', 'Pais']
+COLUNAS_PRODUTOS = ['CodigoProduto', 'Descricao', 'Categoria', 'PrecoUnitario', 'CategoriaPreco']
+COLUNAS_ITENS = ['NumeroFatura', 'CodigoProduto', 'IDCliente', 'DataFatura', 'Quantidade', 'ValorTotal', 'Venda', 'Devolucao']
+
+
+def _eh_planilha(caminho):
+    return caminho.lower().endswith(('.xlsx', '.xlsm'))
+
+
+def ler_fonte(caminho):
+    if _eh_planilha(caminho) or caminho.lower().endswith('.xls'):
+        return pd.read_excel(caminho)
+    return pd.read_csv(caminho)
+
+
+def _blocos_planilha(caminho, tamanho_bloco):
+    # openpyxl só é necessário para planilhas
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho, read_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        bloco = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) == tamanho_bloco:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        livro.close()
+
+
+# Lê a fonte em DataFrames de até tamanho_bloco linhas
+def ler_fonte_em_blocos(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    if _eh_planilha(caminho):
+        yield from _blocos_planilha(caminho, tamanho_bloco)
+    else:
+        with pd.read_csv(caminho, chunksize=tamanho_bloco) as leitor:
+            yield from leitor
+
+
+def limpar(df):
+    df = df.rename(columns=COLUNAS)
+    # Excluindo valores ausentes e linhas duplicadas
+    df = df.dropna().drop_duplicates()
+    # Excluindo linhas com PrecoUnitario igual a zero
+    df = df[df['PrecoUnitario'] != 0].copy()
+    df['NumeroFatura'] = df['NumeroFatura'].astype(str)
+    df['CodigoProduto'] = df['CodigoProduto'].astype(str)
+    df['IDCliente'] = df['IDCliente'].astype('int64')
+    df['DataFatura'] = pd.to_datetime(df['DataFatura'])
+    df['DescricaoLimpa'] = limpar_descricoes(df['Descricao'])
+    # Colunas Devolucao e Venda
+    df['Devolucao'], df['Venda'] = marcar_devolucoes(df['Quantidade'])
+    # Valor total e categoria de preço
+    df['ValorTotal'] = df['Quantidade'] * df['PrecoUnitario']
+    df['CategoriaPreco'] = categorizar_precos(df['PrecoUnitario'])
+    return df
+
+
+# Estado incremental no diretório de saída
+class EstadoETL:
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.diretorio_itens = os.path.join(diretorio, 'itens_fatura')
+        self.caminho_clientes = os.path.join(diretorio, 'clientes.parquet')
+        self.caminho_produtos = os.path.join(diretorio, 'produtos.parquet')
+        self.caminho_categorizador = os.path.join(diretorio, 'categorizador.pkl')
+        os.makedirs(self.diretorio_itens, exist_ok=True)
+
+    def _ler(self, caminho, colunas):
+        if os.path.exists(caminho):
+            return pd.read_parquet(caminho)
+        return pd.DataFrame(columns=colunas)
+
+    def clientes(self):
+        return self._ler(self.caminho_clientes, COLUNAS_CLIENTES)
+
+    def produtos(self):
+        return self._ler(self.caminho_produtos, COLUNAS_PRODUTOS)
+
+    def salvar_tabela(self, df, caminho):
+        temporario = caminho + '.tmp'
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+
+    def categorizador(self):
+        return carregar_modelo(self.caminho_categorizador)
+
+    def salvar_categorizador(self, categorizador):
+        salvar_modelo(categorizador, self.caminho_categorizador)
+
+    def diretorio_mes(self, mes):
+        return os.path.join(self.diretorio_itens, f'mes={mes}')
+
+    def partes_mes(self, mes):
+        diretorio = self.diretorio_mes(mes)
+        if not os.path.isdir(diretorio):
+            return []
+        return sorted(arquivo for arquivo in os.listdir(diretorio) if arquivo.endswith('.parquet'))
+
+    # Hashes (ordenados) de (NumeroFatura, CodigoProduto) já carregados em um mês e as
+    # partes que o índice cobre. Uma parte gravada sem o índice atualizado (queda entre as
+    # duas gravações) tem as chaves lidas do próprio Parquet e incorporadas ao índice.
+    def chaves_mes(self, mes):
+        caminho = os.path.join(self.diretorio_mes(mes), '_chaves.npz')
+        chaves, cobertas = np.empty(0, dtype='uint64'), set()
+        if os.path.exists(caminho):
+            with np.load(caminho) as indice:
+                chaves, cobertas = indice['chaves'], set(indice['partes'].tolist())
+        partes = self.partes_mes(mes)
+        faltantes = [parte for parte in partes if parte not in cobertas]
+        for parte in faltantes:
+            itens = pd.read_parquet(os.path.join(self.diretorio_mes(mes), parte), columns=['NumeroFatura', 'CodigoProduto'])
+            chaves = np.union1d(chaves, hash_chaves(itens))
+        if faltantes:
+            self.salvar_chaves_mes(mes, chaves, partes)
+        return chaves, partes
+
+    def salvar_chaves_mes(self, mes, chaves, partes):
+        caminho = os.path.join(self.diretorio_mes(mes), '_chaves.npz')
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as arquivo:
+            np.savez(arquivo, chaves=chaves, partes=np.array(partes, dtype=str))
+        os.replace(temporario, caminho)
+
+
+def hash_chaves(itens):
+    return pd.util.hash_pandas_object(itens[['NumeroFatura', 'CodigoProduto']], index=False).to_numpy()
+
+
+def _contidos(chaves, existentes):
+    if not len(existentes):
+        return np.zeros(len(chaves), dtype=bool)
+    posicoes = np.searchsorted(existentes, chaves).clip(max=len(existentes) - 1)
+    return existentes[posicoes] == chaves
+
+
+# Anexa os itens ainda não carregados às partições mensais; devolve os itens novos.
+# carregadas (mês -> chaves) acumula as chaves anexadas pelos blocos anteriores da mesma
+# execução, que não contam como estado existente: um par repetido em dois blocos da
+# mesma fonte é mantido, enquanto reprocessar a fonte em outra execução não anexa nada.
+def anexar_itens(estado, itens, lote, carregadas=None):
+    carregadas = {} if carregadas is None else carregadas
+    chaves = hash_chaves(itens)
+    meses = itens['DataFatura'].dt.strftime('%Y-%m').to_numpy()
+    novos = []
+    for mes in np.unique(meses):
+        do_mes = np.flatnonzero(meses == mes)
+        existentes, partes = estado.chaves_mes(mes)
+        desta_execucao = carregadas.get(mes, np.empty(0, dtype='uint64'))
+        anteriores = _contidos(chaves[do_mes], existentes) & ~_contidos(chaves[do_mes], desta_execucao)
+        inserir = do_mes[~anteriores]
+        if not len(inserir):
+            continue
+        os.makedirs(estado.diretorio_mes(mes), exist_ok=True)
+        parte = itens.iloc[inserir][COLUNAS_ITENS]
+        # Parte e índice gravados por substituição atômica; o índice só depois da parte
+        nome_parte = f'parte-{lote}.parquet'
+        caminho_parte = os.path.join(estado.diretorio_mes(mes), nome_parte)
+        parte.to_parquet(caminho_parte + '.tmp', index=False)
+        os.replace(caminho_parte + '.tmp', caminho_parte)
+        estado.salvar_chaves_mes(mes, np.union1d(existentes, chaves[inserir]), partes + [nome_parte])
+        carregadas[mes] = np.union1d(desta_execucao, chaves[inserir])
+        novos.append(parte)
+    if not novos:
+        return pd.DataFrame(columns=COLUNAS_ITENS)
+    return pd.concat(novos, ignore_index=True)
+
+
+# Anexa produtos nunca vistos, categorizando apenas esses
+def anexar_produtos(estado, df):
+    produtos = estado.produtos()
+    novos = df.drop_duplicates(subset=['CodigoProduto'])
+    novos = novos[~novos['CodigoProduto'].isin(produtos['CodigoProduto'])]
+    if novos.empty:
+        return 0
+    categorizador = estado.categorizador()
+    if categorizador is None:
+        # Os clusters do novo ajuste são nomeados pelas categorias já conhecidas: as dos
+        # produtos carregados em execuções anteriores ou, sem eles, as de produtos.csv
+        if produtos['Categoria'].notna().any():
+            referencia = (limpar_descricoes(produtos['Descricao'].fillna('')), produtos['Categoria'])
+        else:
+            referencia = carregar_referencia()
+        if referencia is None:
+            raise ValueError('sem categorizador salvo nem produtos categorizados para nomear os clusters de um novo ajuste')
+        categorizador = Categorizador.treinar(df['DescricaoLimpa'], referencia=referencia)
+        estado.salvar_categorizador(categorizador)
+    novos = novos.assign(Categoria=categorizador.prever(novos['DescricaoLimpa']))
+    produtos = pd.concat([produtos, novos[COLUNAS_PRODUTOS]], ignore_index=True) if len(produtos) else novos[COLUNAS_PRODUTOS]
+    estado.salvar_tabela(produtos.reset_index(drop=True), estado.caminho_produtos)
+    return len(novos)
+
+
+def anexar_clientes(estado, df):
+    clientes = estado.clientes()
+    novos = df[COLUNAS_CLIENTES].drop_duplicates(subset=['IDCliente'])
+    novos = novos[~novos['IDCliente'].isin(clientes['IDCliente'])]
+    if novos.empty:
+        return 0
+    clientes = pd.concat([clientes, novos], ignore_index=True) if len(clientes) else novos
+    estado.salvar_tabela(clientes.reset_index(drop=True), estado.caminho_clientes)
+    return len(novos)
+
+
+def _novo_lote():
+    return datetime.now().strftime('%Y%m%d%H%M%S') + '-' + uuid.uuid4().hex[:8]
+
+
+def processar_lote(df_bruto, diretorio=DIRETORIO_SAIDA, lote=None, carregadas=None):
+    estado = EstadoETL(diretorio)
+    lote = lote or _novo_lote()
+    df = limpar(df_bruto)
+    itens_novos = anexar_itens(estado, df[COLUNAS_ITENS], lote, carregadas)
+    return {
+        'linhas_lidas': len(df_bruto),
+        'itens_novos': len(itens_novos),
+        'produtos_novos': anexar_produtos(estado, df),
+        'clientes_novos': anexar_clientes(estado, df),
+    }
+
+
+# Processa a fonte bloco a bloco. Sem categorizador salvo, o modelo é treinado com as
+# descrições do primeiro bloco que trouxer produtos novos e os clusters são nomeados
+# pelas categorias de produtos.csv.
+def processar_fonte(caminho, diretorio=DIRETORIO_SAIDA, tamanho_bloco=TAMANHO_BLOCO):
+    lote = _novo_lote()
+    carregadas = {}
+    resumo = {'blocos': 0, 'linhas_lidas': 0, 'itens_novos': 0, 'produtos_novos': 0, 'clientes_novos': 0}
+    for numero, bloco in enumerate(ler_fonte_em_blocos(caminho, tamanho_bloco)):
+        resultado = processar_lote(bloco, diretorio, f'{lote}-{numero:05d}', carregadas)
+        resumo['blocos'] += 1
+        for chave, valor in resultado.items():
+            resumo[chave] += valor
+    return resumo
+
+
+# Itens de cada partição mensal, em ordem cronológica
+def ler_itens_por_mes(diretorio=DIRETORIO_SAIDA):
+    caminho = os.path.join(diretorio, 'itens_fatura')
+    if not os.path.isdir(caminho):
+        return
+    for particao in sorted(os.listdir(caminho)):
+        diretorio_mes = os.path.join(caminho, particao)
+        partes = sorted(arquivo for arquivo in os.listdir(diretorio_mes) if arquivo.endswith('.parquet'))
+        if partes:
+            itens = pd.concat([pd.read_parquet(os.path.join(diretorio_mes, parte)) for parte in partes], ignore_index=True)
+            yield itens.sort_values('DataFatura', kind='stable')
+
+
+def ler_itens(diretorio=DIRETORIO_SAIDA):
+    meses = list(ler_itens_por_mes(diretorio))
+    if not meses:
+        return pd.DataFrame(columns=COLUNAS_ITENS)
+    return pd.concat(meses, ignore_index=True)
+
+
+# Regrava clientes.csv, produtos.csv e itens_fatura.csv no formato lido pelo dashboard,
+# escrevendo os itens um mês por vez
+def exportar_csv(diretorio=DIRETORIO_SAIDA, destino='.'):
+    estado = EstadoETL(diretorio)
+    estado.clientes().to_csv(os.path.join(destino, 'clientes.csv'), index=False)
+    estado.produtos().to_csv(os.path.join(destino, 'produtos.csv'), index=False)
+    caminho_itens = os.path.join(destino, 'itens_fatura.csv')
+    pd.DataFrame(columns=COLUNAS_ITENS).to_csv(caminho_itens, index=False)
+    for itens in ler_itens_por_mes(diretorio):
+        itens.to_csv(caminho_itens, mode='a', header=False, index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Carrega um lote de faturas de forma incremental.')
+    parser.add_argument('fonte', help='arquivo .xlsx ou .csv com as faturas no formato original')
+    parser.add_argument('--saida', default=DIRETORIO_SAIDA, help='diretório com o estado e as partições')
+    parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO, help='linhas lidas por bloco')
+    parser.add_argument('--exportar-csv', metavar='DIRETORIO', help='regravar os três CSVs do dashboard neste diretório')
+    args = parser.parse_args()
+    resumo = processar_fonte(args.fonte, args.saida, args.tamanho_bloco)
+    print(', '.join(f'{chave}: {valor}' for chave, valor in resumo.items()))
+    if args.exportar_csv:
+        exportar_csv(args.saida, args.exportar_csv)
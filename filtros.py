@@ -0,0 +1,128 @@
+# Motor de filtros da barra lateral
+# Pré-calcula, para Pais, Categoria e faixa de preço, as posições (ordenadas) das linhas
+# de cada valor, e usa a tabela fato ordenada por DataFatura para recortar o período por
+# busca binária. Os filtros são combinados por interseção das posições, de modo que o
+# custo acompanha o tamanho do recorte e não o histórico inteiro.
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa
+
+# Limites do filtro de preço do dashboard
+LIMITE_BARATO = 5
+LIMITE_CARO = 20
+FAIXAS_PRECO = ['Barato (abaixo de 5,00)', 'Moderado (5,00 a 20,00)', 'Caro (acima de 20,00)']
+
+
+def codificar_faixa_preco(precos):
+    precos = np.asarray(precos, dtype='float64')
+    return np.select(
+        [precos < LIMITE_BARATO, precos <= LIMITE_CARO, precos > LIMITE_CARO],
+        [0, 1, 2],
+        default=-1,
+    )
+
+
+def _intervalo_datas(datas, inicio, fim):
+    # Posições [lo, hi) das linhas entre os dias inicio e fim (inclusive) em um array ordenado
+    lo = 0 if inicio is None else np.searchsorted(datas, np.datetime64(pd.Timestamp(inicio).normalize()), side='left')
+    if fim is None:
+        hi = len(datas)
+    else:
+        limite = np.datetime64(pd.Timestamp(fim).normalize() + pd.Timedelta(days=1))
+        hi = np.searchsorted(datas, limite, side='left')
+    return int(lo), int(max(hi, lo))
+
+
+def fatiar_periodo(df, inicio, fim):
+    datas = df['DataFatura']
+    if datas.is_monotonic_increasing:
+        lo, hi = _intervalo_datas(datas.to_numpy(), inicio, fim)
+        return df.iloc[lo:hi]
+    dias = datas.dt.normalize()
+    filtro = pd.Series(True, index=df.index)
+    if inicio is not None:
+        filtro &= dias >= pd.Timestamp(inicio)
+    if fim is not None:
+        filtro &= dias <= pd.Timestamp(fim)
+    return df[filtro]
+
+
+def _indexar_codigos(codigos, valores):
+    # valor -> posições ordenadas das linhas com aquele código
+    ordem = np.argsort(codigos, kind='stable')
+    codigos_ordenados = codigos[ordem]
+    indice = {}
+    for codigo, valor in enumerate(valores):
+        lo = np.searchsorted(codigos_ordenados, codigo, side='left')
+        hi = np.searchsorted(codigos_ordenados, codigo, side='right')
+        indice[valor] = ordem[lo:hi]
+    return indice
+
+
+class MotorFiltros:
+    def __init__(self, fatos):
+        if not fatos['DataFatura'].is_monotonic_increasing:
+            fatos = fatos.sort_values('DataFatura', kind='stable').reset_index(drop=True)
+        self.fatos = fatos
+        self._datas = fatos['DataFatura'].to_numpy()
+        self._indices = {}
+        for coluna in ('Pais', 'Categoria'):
+            categorias = fatos[coluna].astype('category')
+            self._indices[coluna] = _indexar_codigos(
+                categorias.cat.codes.to_numpy(), list(categorias.cat.categories)
+            )
+        self._indices['FaixaPreco'] = _indexar_codigos(
+            codificar_faixa_preco(fatos['PrecoUnitario']), FAIXAS_PRECO
+        )
+
+    def posicoes(self, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+        lo, hi = _intervalo_datas(self._datas, inicio, fim)
+        selecionados = []
+        for coluna, valor in (('Pais', pais), ('Categoria', categoria), ('FaixaPreco', faixa_preco)):
+            if valor is None:
+                continue
+            posicoes = self._indices[coluna].get(valor)
+            if posicoes is None:
+                return np.empty(0, dtype='int64'), (lo, hi)
+            # Restringir ao período antes de cruzar com os demais filtros
+            selecionados.append(posicoes[np.searchsorted(posicoes, lo):np.searchsorted(posicoes, hi)])
+        if not selecionados:
+            return None, (lo, hi)
+        selecionados.sort(key=len)
+        resultado = selecionados[0]
+        for posicoes in selecionados[1:]:
+            if not len(resultado):
+                break
+            resultado = np.intersect1d(resultado, posicoes, assume_unique=True)
+        return resultado, (lo, hi)
+
+    def filtrar(self, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+        with etapa('MotorFiltros.filtrar', len(self.fatos)) as registro:
+            posicoes, (lo, hi) = self.posicoes(inicio, fim, pais, categoria, faixa_preco)
+            if posicoes is None:
+                # Só o período foi filtrado: fatia contígua, sem cópia
+                filtrado = self.fatos.iloc[lo:hi]
+            else:
+                filtrado = self.fatos.take(posicoes)
+            registro.linhas_saida = len(filtrado)
+        return filtrado
+
+
+# Filtros vindos da barra lateral ('Global'/'Nenhum' significam sem filtro)
+def normalizar_filtros(categoria_preco='Nenhum', pais='Global', categoria='Nenhum'):
+    return {
+        'faixa_preco': None if categoria_preco == 'Nenhum' else categoria_preco,
+        'pais': None if pais == 'Global' else pais,
+        'categoria': None if categoria == 'Nenhum' else categoria,
+    }
+
+
+_motor_atual = None
+
+
+def obter_motor(fatos):
+    global _motor_atual
+    if _motor_atual is None or _motor_atual[0] is not fatos:
+        _motor_atual = (fatos, MotorFiltros(fatos))
+    return _motor_atual[1]
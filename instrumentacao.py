@@ -0,0 +1,227 @@
+# Instrumentação por execução do dashboard
+# Cada execução (rerun) do Streamlit pode abrir um rastro; as etapas medidas com `etapa`
+# ou com funções decoradas por `instrumentar` registram início, duração, linhas de entrada
+# e saída e variação de memória (RSS). O rastro é por thread, como as sessões do
+# Streamlit. Sem rastro ativo, `etapa` devolve um contexto vazio e as funções decoradas
+# chamam a original diretamente: o custo é uma leitura de atributo por chamada.
+#
+# O rastro pode ser exibido no painel de depuração (mostrar_painel_depuracao) e exportado
+# no formato Chrome trace (chrome://tracing, Perfetto).
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Rastro ativo de cada thread (None por padrão, sem exceção de atributo ausente)
+class _Local(threading.local):
+    rastro = None
+
+
+_local = _Local()
+
+try:
+    _TAMANHO_PAGINA = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _TAMANHO_PAGINA = None
+
+
+# Memória residente do processo (Linux); None quando indisponível
+def _memoria_mb():
+    if _TAMANHO_PAGINA is None:
+        return None
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _TAMANHO_PAGINA / (1024 * 1024)
+    except OSError:
+        return None
+
+
+def _linhas(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series, pd.Index, np.ndarray)):
+        return len(valor)
+    return None
+
+
+class Registro:
+    __slots__ = ('nome', 'profundidade', 'inicio', 'segundos', 'linhas_entrada', 'linhas_saida', 'memoria_mb')
+
+    def __init__(self, nome, profundidade, linhas_entrada):
+        self.nome = nome
+        self.profundidade = profundidade
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.inicio = None
+        self.segundos = None
+        self.memoria_mb = None
+
+
+class _Etapa:
+    def __init__(self, rastro, registro):
+        self.rastro = rastro
+        self.registro = registro
+
+    def __enter__(self):
+        self.rastro._profundidade += 1
+        self._memoria = _memoria_mb()
+        self.registro.inicio = time.perf_counter()
+        return self.registro
+
+    def __exit__(self, *excecao):
+        registro = self.registro
+        registro.segundos = time.perf_counter() - registro.inicio
+        self.rastro._profundidade -= 1
+        memoria = _memoria_mb()
+        if memoria is not None and self._memoria is not None:
+            registro.memoria_mb = memoria - self._memoria
+        return False
+
+
+# Contexto usado quando não há rastro ativo
+class _EtapaNula:
+    linhas_saida = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class Rastro:
+    def __init__(self, nome):
+        self.nome = nome
+        self.registros = []
+        self.inicio = time.perf_counter()
+        self.segundos = None
+        self._profundidade = 0
+
+    def etapa(self, nome, linhas_entrada=None):
+        registro = Registro(nome, self._profundidade, linhas_entrada)
+        self.registros.append(registro)
+        return _Etapa(self, registro)
+
+
+# Abre o rastro desta execução; com ativo=False, descarta um rastro que tenha ficado na thread
+def iniciar_rastro(nome='execucao', ativo=True):
+    _local.rastro = Rastro(nome) if ativo else None
+    return _local.rastro
+
+
+def encerrar_rastro():
+    rastro = _local.rastro
+    _local.rastro = None
+    if rastro is not None:
+        rastro.segundos = time.perf_counter() - rastro.inicio
+    return rastro
+
+
+def rastro_atual():
+    return _local.rastro
+
+
+def etapa(nome, linhas_entrada=None):
+    rastro = _local.rastro
+    if rastro is None:
+        return _ETAPA_NULA
+    return rastro.etapa(nome, linhas_entrada)
+
+
+# Decorador: registra a chamada como etapa, com as linhas do primeiro argumento tabular
+# e do resultado
+def instrumentar(funcao=None, nome=None):
+    def decorar(funcao):
+        rotulo = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def instrumentada(*args, **kwargs):
+            rastro = _local.rastro
+            if rastro is None:
+                return funcao(*args, **kwargs)
+            entrada = None
+            for valor in (*args, *kwargs.values()):
+                entrada = _linhas(valor)
+                if entrada is not None:
+                    break
+            with rastro.etapa(rotulo, entrada) as registro:
+                resultado = funcao(*args, **kwargs)
+                registro.linhas_saida = _linhas(resultado)
+            return resultado
+
+        return instrumentada
+
+    return decorar(funcao) if funcao is not None else decorar
+
+
+# Etapas internas recuadas sob a etapa que as chamou
+def _rotulo(registro):
+    if not registro.profundidade:
+        return registro.nome
+    return '\u2003' * (registro.profundidade - 1) + '\u21b3 ' + registro.nome
+
+
+def resumo(rastro):
+    return pd.DataFrame({
+        'Etapa': [_rotulo(registro) for registro in rastro.registros],
+        'Milissegundos': [None if registro.segundos is None else round(registro.segundos * 1000, 2) for registro in rastro.registros],
+        'LinhasEntrada': pd.array([registro.linhas_entrada for registro in rastro.registros], dtype='Int64'),
+        'LinhasSaida': pd.array([registro.linhas_saida for registro in rastro.registros], dtype='Int64'),
+        'MemoriaMB': [None if registro.memoria_mb is None else round(registro.memoria_mb, 1) for registro in rastro.registros],
+    })
+
+
+# Eventos completos ('X') do formato Chrome trace, em microssegundos desde o início da execução
+def para_chrome(rastro):
+    fim = rastro.segundos if rastro.segundos is not None else time.perf_counter() - rastro.inicio
+    eventos = [{'name': rastro.nome, 'ph': 'X', 'ts': 0, 'dur': round(fim * 1e6, 1), 'pid': os.getpid(), 'tid': 0}]
+    for registro in rastro.registros:
+        if registro.segundos is None:
+            continue
+        eventos.append({
+            'name': registro.nome,
+            'ph': 'X',
+            'ts': round((registro.inicio - rastro.inicio) * 1e6, 1),
+            'dur': round(registro.segundos * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': 0,
+            'args': {
+                'linhas_entrada': registro.linhas_entrada,
+                'linhas_saida': registro.linhas_saida,
+                'memoria_mb': None if registro.memoria_mb is None else round(registro.memoria_mb, 2),
+            },
+        })
+    return {'traceEvents': eventos, 'displayTimeUnit': 'ms'}
+
+
+def salvar_chrome(rastro, caminho):
+    with open(caminho, 'w') as arquivo:
+        json.dump(para_chrome(rastro), arquivo)
+
+
+# Painel da barra lateral com as etapas desta execução e o download do rastro; contadores
+# é um dicionário opcional nome -> {contador: valor} exibido abaixo da tabela
+def mostrar_painel_depuracao(rastro, contadores=None):
+    import streamlit as st
+
+    medido = sum(registro.segundos or 0 for registro in rastro.registros if registro.profundidade == 0)
+    with st.sidebar.expander('Depuração', expanded=True):
+        st.write(f'Execução: {rastro.segundos * 1000:,.0f} ms em {len(rastro.registros)} etapas')
+        # O que não está em nenhuma etapa é, em geral, a montagem da página e dos gráficos
+        st.write(f'Fora das etapas (página e gráficos): {(rastro.segundos - medido) * 1000:,.0f} ms')
+        st.dataframe(resumo(rastro), hide_index=True)
+        for nome, valores in (contadores or {}).items():
+            st.write(f'{nome}: ' + ', '.join(f'{chave} {valor}' for chave, valor in valores.items()))
+        st.download_button(
+            'Baixar rastro (Chrome trace)', json.dumps(para_chrome(rastro)),
+            file_name=f'rastro-{rastro.nome}-{time.strftime("%Y%m%d-%H%M%S")}.json', mime='application/json',
+        )
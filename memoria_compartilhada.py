@@ -0,0 +1,80 @@
+# Tabelas somente leitura em arquivos Arrow mapeados em memória
+# Cada versão de uma tabela é gravada uma vez como arquivo Arrow IPC sem compressão, e os
+# processos abrem o arquivo com mmap: as colunas do DataFrame são visões diretas do
+# arquivo, sem cópia, e as páginas ficam no cache do sistema operacional, compartilhadas
+# por todos os processos (e sessões) que leem a mesma versão. Números, datas e textos
+# são convertidos sem cópia pelo pyarrow; categorias, booleanos e inteiros com nulos
+# (Int64) são montados aqui a partir dos buffers, já que a conversão padrão os copiaria.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# Metadados do arquivo: colunas booleanas gravadas como uint8 (o Arrow guarda bool em bits)
+_CHAVE_BOOLEANOS = b'kore_booleanos'
+
+
+def gravar_arrow(df, caminho):
+    booleanos = [coluna for coluna, tipo in df.dtypes.items() if tipo == bool]
+    tabela = pa.Table.from_pandas(df.astype({coluna: 'uint8' for coluna in booleanos}), preserve_index=False)
+    # Um único bloco por coluna, para que cada coluna seja um buffer contíguo
+    tabela = tabela.combine_chunks().replace_schema_metadata({
+        **(tabela.schema.metadata or {}), _CHAVE_BOOLEANOS: json.dumps(booleanos).encode(),
+    })
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    # Temporário por processo: vários processos podem publicar a mesma versão ao mesmo tempo
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with pa.OSFile(temporario, 'wb') as arquivo, ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela, max_chunksize=max(1, len(df)))
+    os.replace(temporario, caminho)
+
+
+def _categorias(bloco):
+    categorias = bloco.dictionary.to_pandas()
+    return pd.CategoricalDtype(categorias, ordered=bloco.type.ordered)
+
+
+def _inteiro_nulavel(bloco):
+    # Valores lidos direto do arquivo; só a máscara de nulos (1 byte por linha) é alocada
+    tipo = np.dtype(bloco.type.to_pandas_dtype())
+    valores = np.frombuffer(bloco.buffers()[1], dtype=tipo, count=len(bloco), offset=bloco.offset * tipo.itemsize)
+    return pd.arrays.IntegerArray(valores, bloco.is_null().to_numpy(zero_copy_only=False))
+
+
+def mapear_arrow(caminho):
+    tabela = ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+    booleanos = set(json.loads((tabela.schema.metadata or {}).get(_CHAVE_BOOLEANOS, b'[]')))
+    nulaveis = {
+        coluna['name'] for coluna in (tabela.schema.pandas_metadata or {}).get('columns', [])
+        if coluna['numpy_type'] in ('Int8', 'Int16', 'Int32', 'Int64', 'UInt8', 'UInt16', 'UInt32', 'UInt64')
+    }
+    especiais = {}
+    for nome, coluna in zip(tabela.column_names, tabela.columns):
+        if coluna.num_chunks != 1:
+            continue
+        bloco = coluna.chunk(0)
+        if nome in nulaveis and pa.types.is_integer(bloco.type):
+            especiais[nome] = _inteiro_nulavel(bloco)
+            continue
+        if coluna.null_count:
+            continue
+        if nome in booleanos:
+            especiais[nome] = bloco.to_numpy(zero_copy_only=True).view(bool)
+        elif pa.types.is_dictionary(bloco.type) and not bloco.indices.null_count:
+            especiais[nome] = pd.Categorical.from_codes(
+                bloco.indices.to_numpy(zero_copy_only=True), dtype=_categorias(bloco),
+            )
+    restantes = tabela.drop_columns(list(especiais))
+    df = restantes.to_pandas(split_blocks=True)
+    for nome, valores in especiais.items():
+        df[nome] = pd.Series(valores, index=df.index, name=nome, copy=False)
+    # Colunas booleanas que não puderam ser mapeadas (com nulos) voltam ao tipo original
+    for nome in booleanos - set(especiais):
+        df[nome] = df[nome].astype(bool)
+    return df[tabela.column_names]
+
@@ -0,0 +1,245 @@
+# Previsão de vendas
+# O modelo é treinado sobre a receita diária por categoria (alguns milhares de linhas em
+# vez de um item de fatura por linha), com atributos de calendário e categoria em matriz
+# esparsa. O modelo ajustado fica em cache por versão dos dados e modelo, em memória e em
+# disco, e todas as datas e categorias do horizonte são previstas em um único predict.
+#
+# Benchmark (treino até N meses antes do fim, erro nesses N meses):
+#     python previsao.py --benchmark [--meses 3] [--json resultado.json]
+import argparse
+import json
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression
+from threadpoolctl import threadpool_limits
+
+from dados import DIRETORIO_CACHE, carregar_fatos, versao_dados
+
+try:
+    from xgboost import XGBRegressor
+except ImportError:
+    XGBRegressor = None
+
+SEM_CATEGORIA = 'Sem categoria'
+DIAS_POR_MES = 30
+# Incrementar quando os atributos ou as classes do Previsor mudarem, para não carregar um
+# modelo salvo incompatível
+VERSAO_FORMATO_PREVISOR = 2
+
+
+def _linear(n_jobs):
+    return LinearRegression(n_jobs=n_jobs)
+
+
+# O HistGradientBoosting não aceita matriz esparsa; a matriz agregada é pequena o bastante
+# para ser densificada. Ele paraleliza com OpenMP, sem parâmetro n_jobs: o limite de
+# threads é aplicado ao OpenMP durante o fit e o predict (n_jobs <= 0 usa todos os núcleos).
+class _GradienteDenso:
+    def __init__(self, n_jobs):
+        self.n_jobs = n_jobs
+        self.modelo = HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, random_state=42)
+
+    def _threads(self):
+        return threadpool_limits(limits=self.n_jobs if self.n_jobs > 0 else None, user_api='openmp')
+
+    def fit(self, X, y):
+        with self._threads():
+            self.modelo.fit(X.toarray(), y)
+        return self
+
+    def predict(self, X):
+        with self._threads():
+            return self.modelo.predict(X.toarray())
+
+
+def _xgboost(n_jobs):
+    return XGBRegressor(
+        n_estimators=300, max_depth=4, learning_rate=0.05, tree_method='hist', n_jobs=n_jobs, random_state=42,
+    )
+
+
+MODELOS = {'linear': _linear, 'gradiente': _GradienteDenso}
+if XGBRegressor is not None:
+    MODELOS['xgboost'] = _xgboost
+
+
+# Receita diária por categoria, com todos os dias do período (dias sem venda valem zero)
+def serie_diaria(fatos):
+    dias = fatos['DataFatura'].dt.normalize()
+    categorias = fatos['Categoria'].astype(object).fillna(SEM_CATEGORIA)
+    receita = fatos['ValorTotal'].groupby([dias.rename('Dia'), categorias.rename('Categoria')]).sum()
+    if receita.empty:
+        return pd.DataFrame(columns=['Dia', 'Categoria', 'ValorTotal'])
+    calendario = pd.date_range(receita.index.get_level_values('Dia').min(), receita.index.get_level_values('Dia').max(), freq='D')
+    grade = pd.MultiIndex.from_product([calendario, sorted(categorias.unique())], names=['Dia', 'Categoria'])
+    return receita.reindex(grade, fill_value=0.0).rename('ValorTotal').reset_index()
+
+
+class Previsor:
+    def __init__(self, modelo='linear', n_jobs=-1):
+        if modelo not in MODELOS:
+            raise ValueError(f'Modelo indisponível: {modelo} (disponíveis: {", ".join(MODELOS)})')
+        self.nome_modelo = modelo
+        self.modelo = MODELOS[modelo](n_jobs)
+
+    # Tendência (anos desde o início), mês, dia da semana e categoria em one-hot esparso
+    def atributos(self, dias, categorias):
+        dias = pd.DatetimeIndex(dias)
+        n = len(dias)
+        linhas = np.arange(n)
+        codigos = pd.Categorical(categorias, categories=self.categorias).codes
+
+        # Categorias desconhecidas (código -1) ficam sem nenhuma coluna ativa
+        def one_hot(colunas, largura):
+            validas = colunas >= 0
+            return sparse.csr_matrix((np.ones(validas.sum()), (linhas[validas], colunas[validas])), shape=(n, largura))
+
+        tendencia = ((dias - self.inicio).days.to_numpy() / 365.0).reshape(-1, 1)
+        return sparse.hstack([
+            sparse.csr_matrix(tendencia),
+            one_hot(dias.month.to_numpy() - 1, 12),
+            one_hot(dias.dayofweek.to_numpy(), 7),
+            one_hot(codigos, len(self.categorias)),
+        ], format='csr')
+
+    # Fixa as categorias e a origem da tendência, que definem as colunas da matriz
+    def preparar(self, serie):
+        self.categorias = sorted(serie['Categoria'].unique())
+        self.inicio = serie['Dia'].min()
+        return self
+
+    def ajustar(self, X, y, ultimo_dia):
+        inicio = time.perf_counter()
+        self.modelo.fit(X, y)
+        self.segundos_treino = time.perf_counter() - inicio
+        self.linhas_treino = X.shape[0]
+        self.ultimo_dia = ultimo_dia
+        return self
+
+    def treinar(self, serie):
+        self.preparar(serie)
+        X = self.atributos(serie['Dia'], serie['Categoria'])
+        return self.ajustar(X, serie['ValorTotal'].to_numpy(), serie['Dia'].max())
+
+    # Previsão para todas as combinações de dia e categoria em um único predict
+    def prever(self, dias):
+        dias = pd.DatetimeIndex(dias)
+        grade = pd.MultiIndex.from_product([dias, self.categorias], names=['Dia', 'Categoria']).to_frame(index=False)
+        grade['ValorPrevisto'] = self.modelo.predict(self.atributos(grade['Dia'], grade['Categoria']))
+        return grade
+
+    def dias_futuros(self, meses):
+        return pd.date_range(self.ultimo_dia + pd.Timedelta(days=1), periods=meses * DIAS_POR_MES, freq='D')
+
+    # Receita total prevista por dia nos próximos meses (30 dias por mês, como no dashboard)
+    def prever_meses(self, meses):
+        previsto = self.prever(self.dias_futuros(meses))
+        return previsto.groupby('Dia')['ValorPrevisto'].sum()
+
+
+_previsores = {}
+_trava = threading.Lock()
+
+
+def _caminho(modelo, versao):
+    return os.path.join(DIRETORIO_CACHE, f'previsor-{modelo}-v{VERSAO_FORMATO_PREVISOR}-{versao}.pkl')
+
+
+# Modelo treinado para a versão atual dos dados, lido do disco ou treinado e salvo
+def obter_previsor(modelo='linear', n_jobs=-1):
+    versao = versao_dados('clientes', 'itens_fatura', 'produtos')
+    with _trava:
+        previsor = _previsores.get((modelo, versao))
+        if previsor is not None:
+            return previsor
+        caminho = _caminho(modelo, versao)
+        if os.path.exists(caminho):
+            with open(caminho, 'rb') as arquivo:
+                previsor = pickle.load(arquivo)
+        else:
+            previsor = Previsor(modelo, n_jobs).treinar(serie_diaria(carregar_fatos()))
+            os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+            with open(caminho + '.tmp', 'wb') as arquivo:
+                pickle.dump(previsor, arquivo)
+            os.replace(caminho + '.tmp', caminho)
+            for arquivo in os.listdir(DIRETORIO_CACHE):
+                antigo = os.path.join(DIRETORIO_CACHE, arquivo)
+                if arquivo.startswith(f'previsor-{modelo}-') and antigo != caminho:
+                    os.remove(antigo)
+        _previsores[(modelo, versao)] = previsor
+        return previsor
+
+
+# Previsão exibida no dashboard: receita diária prevista e a tabela com as datas formatadas
+def prever_vendas(meses, modelo='linear'):
+    previsor = obter_previsor(modelo)
+    previsao = previsor.prever_meses(meses)
+    tabela = pd.DataFrame({
+        'Data': previsao.index.strftime('%d/%m/%Y'),
+        'Valor Previsto': previsao.to_numpy(),
+    })
+    return previsor, previsao, tabela
+
+
+def erros(real, previsto):
+    real = np.asarray(real, dtype='float64')
+    previsto = np.asarray(previsto, dtype='float64')
+    com_venda = real > 0
+    return {
+        'mae': float(np.mean(np.abs(real - previsto))),
+        'rmse': float(np.sqrt(np.mean((real - previsto) ** 2))),
+        'mape': float(np.mean(np.abs(real[com_venda] - previsto[com_venda]) / real[com_venda]) * 100) if com_venda.any() else None,
+    }
+
+
+# Treina com tudo até `meses` antes do último dia e mede o erro da receita diária total
+def benchmark(serie, meses=3, modelos=None, n_jobs=-1):
+    corte = serie['Dia'].max() - pd.Timedelta(days=meses * DIAS_POR_MES)
+    treino = serie[serie['Dia'] <= corte]
+    real = serie[serie['Dia'] > corte].groupby('Dia')['ValorTotal'].sum()
+    resultados = []
+    for nome in modelos or list(MODELOS):
+        previsor = Previsor(nome, n_jobs).treinar(treino)
+        inicio = time.perf_counter()
+        previsto = previsor.prever(real.index).groupby('Dia')['ValorPrevisto'].sum()
+        segundos_previsao = time.perf_counter() - inicio
+        resultados.append({
+            'modelo': nome,
+            'linhas_treino': previsor.linhas_treino,
+            'segundos_treino': round(previsor.segundos_treino, 4),
+            'segundos_previsao': round(segundos_previsao, 4),
+            **erros(real.to_numpy(), previsto.reindex(real.index).to_numpy()),
+        })
+    return pd.DataFrame(resultados)
+
+
+if __name__ == '__main__':
+    # Importa pelo nome do módulo para que o modelo salvo não dependa de __main__
+    from previsao import obter_previsor
+
+    parser = argparse.ArgumentParser(description='Previsão de vendas sobre a receita diária por categoria.')
+    parser.add_argument('--benchmark', action='store_true', help='comparar os modelos em um período de teste')
+    parser.add_argument('--meses', type=int, default=3)
+    parser.add_argument('--modelo', default='linear', choices=list(MODELOS))
+    parser.add_argument('--n-jobs', type=int, default=-1, help='threads do gradiente (OpenMP) e do xgboost; -1 usa todos os núcleos')
+    parser.add_argument('--json', help='gravar o resultado do benchmark neste arquivo')
+    args = parser.parse_args()
+    if args.benchmark:
+        fatos = carregar_fatos()
+        inicio = time.perf_counter()
+        serie = serie_diaria(fatos)
+        print(f'{len(fatos)} itens agregados em {len(serie)} linhas em {time.perf_counter() - inicio:.3f} s')
+        resultado = benchmark(serie, args.meses, n_jobs=args.n_jobs)
+        print(resultado.to_string(index=False))
+        if args.json:
+            with open(args.json, 'w') as arquivo:
+                json.dump(resultado.to_dict(orient='records'), arquivo, indent=2)
+    else:
+        print(obter_previsor(args.modelo, args.n_jobs).prever_meses(args.meses).to_string())
@@ -0,0 +1,76 @@
+# Índice de recomendações
+# A tabela de segmentação é interpretada uma única vez (segmento -> produtos,
+# IDCliente -> produtos) e os atributos dos produtos ficam em um dicionário por
+# CodigoProduto, de modo que exibir k recomendações custa k consultas de dicionário.
+from coocorrencia import obter_recomendador
+
+CATEGORIA_NAO_ENCONTRADA = 'Não encontrada'
+
+
+# Interpreta listas salvas como texto, p.ex. "['85123A', '22423']" ou "[85123, 22423]",
+# sem eval. Os códigos são sempre devolvidos como str.
+def interpretar_lista(texto):
+    if not isinstance(texto, str):
+        return []
+    conteudo = texto.strip().lstrip('[(').rstrip('])')
+    itens = []
+    for item in conteudo.split(','):
+        item = item.strip().strip('\'"').strip()
+        if item:
+            itens.append(item)
+    return itens
+
+
+class IndiceRecomendacoes:
+    def __init__(self, segmentacao, produtos):
+        listas = segmentacao['ProdutosRecomendados']
+        # Cada lista distinta é interpretada uma única vez
+        interpretadas = {texto: interpretar_lista(texto) for texto in listas.unique()}
+        self.por_cliente = dict(zip(segmentacao['IDCliente'].tolist(), listas.map(interpretadas).tolist()))
+        primeiras = segmentacao.drop_duplicates(subset=['segmento'])
+        self.por_segmento = {
+            int(segmento): interpretadas[texto]
+            for segmento, texto in zip(primeiras['segmento'], primeiras['ProdutosRecomendados'])
+        }
+        self.segmento_do_cliente = dict(zip(segmentacao['IDCliente'].tolist(), segmentacao['segmento'].astype(int).tolist()))
+        self.clientes_por_segmento = {
+            int(segmento): grupo.unique() for segmento, grupo in segmentacao.groupby('segmento')['IDCliente']
+        }
+        atributos = produtos.drop_duplicates(subset=['CodigoProduto'])
+        self.produtos = {
+            str(codigo): {'Descricao': descricao, 'Categoria': categoria}
+            for codigo, descricao, categoria in zip(atributos['CodigoProduto'], atributos['Descricao'], atributos['Categoria'])
+        }
+
+    def categoria(self, produto):
+        atributos = self.produtos.get(str(produto))
+        return atributos['Categoria'] if atributos is not None else CATEGORIA_NAO_ENCONTRADA
+
+    def com_categorias(self, lista):
+        return [(produto, self.categoria(produto)) for produto in lista]
+
+    def recomendados_segmento(self, segmento):
+        return self.com_categorias(self.por_segmento.get(segmento, []))
+
+    def recomendados_cliente(self, id_cliente):
+        return self.com_categorias(self.por_cliente.get(id_cliente, []))
+
+
+_indice_atual = None
+
+
+def obter_indice(segmentacao, produtos):
+    global _indice_atual
+    if _indice_atual is None or _indice_atual[0] is not segmentacao or _indice_atual[1] is not produtos:
+        _indice_atual = (segmentacao, produtos, IndiceRecomendacoes(segmentacao, produtos))
+    return _indice_atual[2]
+
+
+# Produtos recomendados na consulta por cliente: comprados junto com os das últimas
+# faturas; sem histórico, vale a lista do segmento
+def produtos_recomendados(id_cliente, itens_fatura, segmentacao, produtos, n=5):
+    indice = obter_indice(segmentacao, produtos)
+    comprados_juntos = obter_recomendador(itens_fatura).recomendar_cliente(id_cliente, n)
+    if comprados_juntos:
+        return indice.com_categorias([produto for produto, _ in comprados_juntos])
+    return indice.recomendados_cliente(id_cliente)
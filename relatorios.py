@@ -0,0 +1,285 @@
+# Motor de relatórios sem interface
+# Os cálculos das seções "Relatório de Vendas" e "Análise de Churn" do dashboard ficam
+# aqui, e streamlit_retail.py apenas exibe o resultado. A linha de comando gera os mesmos
+# relatórios em HTML, CSV ou Parquet para várias combinações de filtros em paralelo: os
+# dados (tabela fato, produtos e cubo) são carregados uma vez no processo principal e os
+# processos do pool são criados por fork, herdando essa memória por cópia sob escrita.
+#
+# Uso: python relatorios.py --paises todos [--categorias todos] [--formatos html csv]
+#                           [--saida relatorios] [--processos 4] [--intervalo-churn "30-60 dias"]
+import argparse
+import gc
+import html
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from analises import calcular_indicadores
+from cache_resultados import chave_filtros, obter_cache_resultados
+from churn import (
+    FAIXAS_CHURN, analisar_produtos_por_faixa, calcular_churn_por_faixa, clientes_por_intervalo,
+    construir_recencia, obter_analise_faixas, obter_recencia,
+)
+from cubo import obter_cubo
+from dados import versao_dados
+from filtros import FAIXAS_PRECO, obter_motor
+
+FORMATOS = ('html', 'csv', 'parquet')
+INTERVALO_CHURN = '30-60 dias'
+
+
+# Indicadores do Relatório de Vendas: os da tabela filtrada e as séries de receita do cubo.
+# Como no dashboard, inicio e fim recortam apenas a receita diária.
+def calcular_vendas(fatos, produtos, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+    filtros = {'pais': pais, 'categoria': categoria, 'faixa_preco': faixa_preco}
+    filtrado = obter_motor(fatos).filtrar(**filtros)
+    indicadores = calcular_indicadores(filtrado, produtos, incluir_series=False)
+    cubo = obter_cubo()
+    indicadores['receita_diaria'] = cubo.receita_diaria(inicio=inicio, fim=fim, **filtros)
+    indicadores['receita_mensal'] = cubo.receita_mensal(**filtros)
+    indicadores['receita_por_pais'] = cubo.receita_por_pais(**filtros)
+    indicadores['variacao_sazonal'] = cubo.variacao_sazonal(**filtros)
+    indicadores['tendencia_vendas'] = cubo.tendencia_vendas(**filtros)
+    return indicadores
+
+
+# calcular_vendas pelo cache de resultados, para a tabela fato da versão atual dos dados.
+# O resultado é compartilhado entre sessões e não deve ser alterado.
+def vendas_em_cache(fatos, produtos, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+    chave = ('vendas',) + chave_filtros(inicio, fim, faixa_preco, pais, categoria)
+    return obter_cache_resultados().obter(
+        versao_dados('clientes', 'itens_fatura', 'produtos'), chave,
+        lambda: calcular_vendas(fatos, produtos, inicio, fim, pais, categoria, faixa_preco),
+    )
+
+
+# Análise de Churn para um intervalo de inatividade (rotulo é o nome da faixa, quando é uma
+# das FAIXAS_CHURN). Sem filtros, a recência e a análise por faixa vêm dos caches do processo.
+def calcular_churn(fatos, dias_inicio, dias_fim, rotulo=None, pais=None, categoria=None, faixa_preco=None):
+    ultima_data = pd.to_datetime(fatos['DataFatura'].max())
+    sem_filtros = pais is None and categoria is None and faixa_preco is None
+    if sem_filtros:
+        itens, recencia = fatos, obter_recencia(fatos)
+    else:
+        itens = obter_motor(fatos).filtrar(pais=pais, categoria=categoria, faixa_preco=faixa_preco)
+        recencia = construir_recencia(itens)
+    clientes = clientes_por_intervalo(recencia, dias_inicio, dias_fim, ultima_data)
+    total = len(recencia)
+
+    produtos_por_faixa = None
+    if rotulo in FAIXAS_CHURN:
+        if sem_filtros:
+            produtos_por_faixa = obter_analise_faixas(fatos, ultima_data)
+        else:
+            produtos_por_faixa = analisar_produtos_por_faixa(itens, recencia, ultima_data)
+        produtos_intervalo = produtos_por_faixa[produtos_por_faixa['Faixa'] == rotulo]
+    else:
+        rotulo = rotulo or f'{dias_inicio}-{dias_fim} dias'
+        produtos_intervalo = analisar_produtos_por_faixa(itens, recencia, ultima_data, {rotulo: (dias_inicio, dias_fim)})
+    return {
+        'ultima_data': ultima_data,
+        'recencia': recencia,
+        'clientes': clientes,
+        'total_clientes': total,
+        'clientes_no_intervalo': len(clientes),
+        'porcentagem_churn': len(clientes) / total * 100 if total else 0.0,
+        'curva_churn': calcular_churn_por_faixa(recencia, ultima_data),
+        'produtos_intervalo': produtos_intervalo,
+        'produtos_por_faixa': produtos_por_faixa,
+    }
+
+
+# Tabelas de um relatório: nome -> DataFrame, na ordem das seções do dashboard
+def tabelas_relatorio(vendas, churn):
+    resumo_vendas = pd.DataFrame({
+        'Indicador': ['Receita Total', 'Clientes Únicos', 'Número de Transações', 'Transações com Devoluções', 'Ticket Médio'],
+        'Valor': [vendas['receita_total'], vendas['clientes_unicos'], vendas['numero_transacoes'],
+                  vendas['transacoes_com_devolucoes'], vendas['ticket_medio']],
+    })
+
+    def serie(nome, coluna):
+        return vendas[nome].rename(coluna).rename_axis(vendas[nome].index.name or 'Chave').reset_index()
+
+    tabelas = {
+        'vendas_resumo': resumo_vendas,
+        'vendas_receita_diaria': serie('receita_diaria', 'ValorTotal'),
+        'vendas_receita_mensal': serie('receita_mensal', 'ValorTotal'),
+        'vendas_receita_por_pais': serie('receita_por_pais', 'ValorTotal'),
+        'vendas_top_clientes': vendas['top_clientes'],
+        'vendas_frequencia_compras': serie('frequencia_compras', 'Itens'),
+        'vendas_produtos_mais_vendidos': vendas['produtos_mais_vendidos'],
+        'vendas_produtos_melhor_desempenho': vendas['produtos_melhor_desempenho'],
+        'vendas_produtos_mais_devolvidos': vendas['produtos_mais_devolvidos'],
+        'vendas_variacao_sazonal': serie('variacao_sazonal', 'ValorTotal'),
+        'vendas_tendencia_vendas': serie('tendencia_vendas', 'ValorTotal'),
+    }
+    if churn is not None:
+        tabelas['churn_resumo'] = pd.DataFrame({
+            'Indicador': ['Quantidade total de clientes', 'Clientes no intervalo', 'Porcentagem de churn'],
+            'Valor': [churn['total_clientes'], churn['clientes_no_intervalo'], churn['porcentagem_churn']],
+        })
+        tabelas['churn_curva'] = churn['curva_churn']
+        tabelas['churn_produtos_intervalo'] = churn['produtos_intervalo']
+        tabelas['churn_clientes'] = pd.DataFrame({'IDCliente': churn['clientes']})
+    # Períodos e categorias viram texto para que todos os formatos aceitem as tabelas
+    for nome, tabela in tabelas.items():
+        tabelas[nome] = tabela.astype({
+            coluna: str for coluna, tipo in tabela.dtypes.items() if isinstance(tipo, (pd.PeriodDtype, pd.CategoricalDtype))
+        })
+    return tabelas
+
+
+def descrever_filtros(filtros):
+    return ', '.join(f'{nome}: {valor}' for nome, valor in filtros.items() if valor is not None) or 'sem filtros'
+
+
+def renderizar_html(tabelas, titulo, filtros):
+    partes = [
+        '<!DOCTYPE html>', '<html><head><meta charset="utf-8">', f'<title>{html.escape(titulo)}</title>',
+        '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}'
+        'td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}</style>',
+        '</head><body>', f'<h1>{html.escape(titulo)}</h1>', f'<p>{html.escape(descrever_filtros(filtros))}</p>',
+    ]
+    for nome, tabela in tabelas.items():
+        partes.append(f'<h2>{html.escape(nome.replace("_", " ").capitalize())}</h2>')
+        partes.append(tabela.to_html(index=False, max_rows=200, float_format=lambda valor: f'{valor:,.2f}'))
+    partes.append('</body></html>')
+    return '\n'.join(partes)
+
+
+def nome_pasta(filtros):
+    partes = [filtros.get('pais') or 'Global', filtros.get('categoria') or 'Todas']
+    if filtros.get('faixa_preco') is not None:
+        partes.append(str(FAIXAS_PRECO.index(filtros['faixa_preco'])))
+    return '__'.join(re.sub(r'[^\w-]+', '_', parte).strip('_') for parte in partes)
+
+
+def gravar_relatorio(tabelas, destino, formatos, filtros):
+    os.makedirs(destino, exist_ok=True)
+    arquivos = []
+    for formato in formatos:
+        if formato == 'html':
+            caminho = os.path.join(destino, 'relatorio.html')
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(renderizar_html(tabelas, 'Relatório de Vendas', filtros))
+            arquivos.append(caminho)
+            continue
+        for nome, tabela in tabelas.items():
+            caminho = os.path.join(destino, f'{nome}.{formato}')
+            if formato == 'csv':
+                tabela.to_csv(caminho, index=False)
+            else:
+                tabela.to_parquet(caminho, index=False)
+            arquivos.append(caminho)
+    return arquivos
+
+
+# Dados compartilhados pelos processos do pool: carregados antes do fork e herdados
+_dados = None
+
+
+def carregar_motor():
+    global _dados
+    if _dados is None:
+        from dados import carregar_fatos, carregar_tabela
+        fatos, produtos = carregar_fatos(), carregar_tabela('produtos')
+        # Constrói os índices e caches usados pelos relatórios antes de criar os processos
+        obter_motor(fatos)
+        obter_cubo()
+        obter_recencia(fatos)
+        _dados = (fatos, produtos)
+    return _dados
+
+
+def gerar_relatorio(filtros, destino, formatos=('html',), inicio=None, fim=None, intervalo_churn=INTERVALO_CHURN):
+    fatos, produtos = carregar_motor()
+    inicio_execucao = time.perf_counter()
+    vendas = calcular_vendas(fatos, produtos, inicio, fim, **filtros)
+    churn = None
+    if intervalo_churn is not None:
+        dias_inicio, dias_fim = FAIXAS_CHURN[intervalo_churn]
+        churn = calcular_churn(fatos, dias_inicio, dias_fim, intervalo_churn, **filtros)
+    pasta = os.path.join(destino, nome_pasta(filtros))
+    arquivos = gravar_relatorio(tabelas_relatorio(vendas, churn), pasta, formatos, filtros)
+    return {
+        **filtros,
+        'pasta': pasta,
+        'arquivos': len(arquivos),
+        'receita_total': float(vendas['receita_total']),
+        'segundos': round(time.perf_counter() - inicio_execucao, 3),
+    }
+
+
+def _gerar(argumentos):
+    return gerar_relatorio(*argumentos)
+
+
+def combinacoes(paises=(None,), categorias=(None,), faixas_preco=(None,)):
+    return [
+        {'pais': pais, 'categoria': categoria, 'faixa_preco': faixa}
+        for pais in paises for categoria in categorias for faixa in faixas_preco
+    ]
+
+
+def gerar_relatorios(lista_filtros, destino, formatos=('html',), inicio=None, fim=None,
+                     intervalo_churn=INTERVALO_CHURN, processos=None):
+    carregar_motor()
+    tarefas = [(filtros, destino, formatos, inicio, fim, intervalo_churn) for filtros in lista_filtros]
+    processos = min(processos or os.cpu_count(), len(tarefas))
+    if processos <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return [_gerar(tarefa) for tarefa in tarefas]
+    # Objetos já carregados saem da coleta de lixo, que senão tocaria (e copiaria) suas páginas
+    gc.freeze()
+    try:
+        contexto = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            return list(executor.map(_gerar, tarefas, chunksize=max(1, len(tarefas) // (processos * 4))))
+    finally:
+        gc.unfreeze()
+
+
+# 'todos' expande para todos os valores da coluna; 'nenhum' é o relatório sem esse filtro
+def _valores(argumento, coluna):
+    if not argumento:
+        return [None]
+    valores = []
+    for valor in argumento:
+        if valor == 'todos':
+            fatos, _ = carregar_motor()
+            valores.extend(sorted(str(item) for item in fatos[coluna].dropna().unique()))
+        else:
+            valores.append(None if valor == 'nenhum' else valor)
+    return valores
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera os relatórios de vendas e churn sem o dashboard.')
+    parser.add_argument('--paises', nargs='+', help="países, 'todos' ou 'nenhum' (sem filtro)")
+    parser.add_argument('--categorias', nargs='+', help="categorias, 'todos' ou 'nenhum' (sem filtro)")
+    parser.add_argument('--faixas-preco', nargs='+', choices=FAIXAS_PRECO)
+    parser.add_argument('--inicio', help='início da receita diária (AAAA-MM-DD)')
+    parser.add_argument('--fim', help='fim da receita diária (AAAA-MM-DD)')
+    parser.add_argument('--intervalo-churn', default=INTERVALO_CHURN, choices=list(FAIXAS_CHURN) + ['nenhum'])
+    parser.add_argument('--formatos', nargs='+', default=['html'], choices=FORMATOS)
+    parser.add_argument('--saida', default='relatorios')
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    carregar_motor()
+    lista_filtros = combinacoes(
+        _valores(args.paises, 'Pais'), _valores(args.categorias, 'Categoria'), args.faixas_preco or [None],
+    )
+    print(f'Dados carregados em {time.perf_counter() - inicio:.2f} s; {len(lista_filtros)} relatórios')
+    resultados = gerar_relatorios(
+        lista_filtros, args.saida, args.formatos, args.inicio, args.fim,
+        None if args.intervalo_churn == 'nenhum' else args.intervalo_churn, args.processos,
+    )
+    indice = pd.DataFrame(resultados)
+    indice.to_csv(os.path.join(args.saida, 'indice.csv'), index=False)
+    print(indice.drop(columns=['pasta']).to_string(index=False))
+    print(f'{len(resultados)} relatórios em {time.perf_counter() - inicio:.2f} s')
@@ -0,0 +1,103 @@
+# Segmentação RFM dos clientes (gera a tabela de segmentacao usada pelo dashboard)
+# Recência, frequência e valor monetário saem de um único groupby sobre os itens de
+# fatura (a mesma tabela de recência da análise de churn). Os clientes são agrupados com
+# MiniBatchKMeans sobre os atributos padronizados, os segmentos são numerados de 1 (maior
+# valor monetário médio) em diante e cada segmento recebe os produtos mais comprados
+# pelos seus clientes. O resultado é gravado em Parquet tipado, lido diretamente por
+# dados.carregar_tabela('segmentacao').
+#
+# Uso: python rfm.py [--segmentos 5] [--n-produtos 5] [--csv df_treinamento_reduzido.csv]
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+from churn import construir_recencia
+from dados import ARQUIVOS_PARQUET, DIRETORIO_DADOS, carregar_tabela
+
+NUM_SEGMENTOS = 5
+N_PRODUTOS = 5
+TAMANHO_LOTE = 4096
+
+
+def calcular_rfm(itens_fatura, data_referencia=None):
+    recencia = construir_recencia(itens_fatura)
+    data_referencia = pd.Timestamp(data_referencia) if data_referencia is not None else itens_fatura['DataFatura'].max()
+    return pd.DataFrame({
+        'IDCliente': recencia['IDCliente'].to_numpy(),
+        'Recencia': (data_referencia - recencia['UltimaCompra']).dt.days.to_numpy(),
+        'Frequencia': recencia['NumeroFaturas'].to_numpy(),
+        'Monetario': recencia['Receita'].to_numpy(),
+    })
+
+
+def _atributos(rfm):
+    X = np.column_stack([
+        rfm['Recencia'].to_numpy(dtype='float64'),
+        np.log1p(rfm['Frequencia'].to_numpy(dtype='float64')),
+        np.log1p(rfm['Monetario'].clip(lower=0).to_numpy(dtype='float64')),
+    ])
+    desvio = X.std(axis=0)
+    return (X - X.mean(axis=0)) / np.where(desvio > 0, desvio, 1)
+
+
+def segmentar(rfm, num_segmentos=NUM_SEGMENTOS, semente=42):
+    agrupamento = MiniBatchKMeans(n_clusters=num_segmentos, batch_size=TAMANHO_LOTE, n_init=3, random_state=semente)
+    clusters = agrupamento.fit_predict(_atributos(rfm))
+    # Segmento 1 = maior valor monetário médio
+    media = pd.Series(rfm['Monetario'].to_numpy()).groupby(clusters).mean()
+    numeracao = pd.Series(np.arange(1, len(media) + 1), index=media.sort_values(ascending=False).index)
+    return numeracao.reindex(clusters).to_numpy()
+
+
+# Produtos mais comprados (em quantidade, só vendas) pelos clientes de cada segmento
+def produtos_por_segmento(itens_fatura, segmento_do_cliente, n=N_PRODUTOS):
+    vendas = itens_fatura[itens_fatura['Venda']]
+    segmento = segmento_do_cliente.reindex(vendas['IDCliente'].to_numpy()).to_numpy()
+    quantidades = vendas['Quantidade'].groupby(
+        [segmento, vendas['CodigoProduto'].astype(str).to_numpy()]
+    ).sum().rename_axis(['segmento', 'CodigoProduto']).reset_index()
+    quantidades = quantidades.sort_values(['segmento', 'Quantidade', 'CodigoProduto'], ascending=[True, False, True], kind='stable')
+    topo = quantidades.groupby('segmento').head(n)
+    return topo.groupby('segmento')['CodigoProduto'].agg(lambda codigos: str(list(codigos)))
+
+
+def construir_segmentacao(itens_fatura, num_segmentos=NUM_SEGMENTOS, n_produtos=N_PRODUTOS):
+    rfm = calcular_rfm(itens_fatura)
+    rfm['segmento'] = segmentar(rfm, num_segmentos)
+    segmento_do_cliente = rfm.set_index('IDCliente')['segmento']
+    recomendados = produtos_por_segmento(itens_fatura, segmento_do_cliente, n_produtos)
+    return pd.DataFrame({
+        'IDCliente': rfm['IDCliente'].astype('int64'),
+        'segmento': rfm['segmento'].astype('int8'),
+        # Uma lista por segmento: como categoria, cada texto é gravado uma única vez
+        'ProdutosRecomendados': pd.Categorical(recomendados.reindex(rfm['segmento']).fillna('[]').to_numpy()),
+    }), rfm
+
+
+def salvar_segmentacao(segmentacao, caminho):
+    temporario = caminho + '.tmp'
+    segmentacao.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recalcula a segmentação RFM dos clientes.')
+    parser.add_argument('--segmentos', type=int, default=NUM_SEGMENTOS)
+    parser.add_argument('--n-produtos', type=int, default=N_PRODUTOS)
+    parser.add_argument('--saida', default=os.path.join(DIRETORIO_DADOS, ARQUIVOS_PARQUET['segmentacao']))
+    parser.add_argument('--csv', help='gravar também uma cópia em CSV (formato de df_treinamento_reduzido.csv)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    segmentacao, rfm = construir_segmentacao(carregar_tabela('itens_fatura'), args.segmentos, args.n_produtos)
+    salvar_segmentacao(segmentacao, args.saida)
+    if args.csv:
+        segmentacao.to_csv(args.csv, index=False)
+    resumo = rfm.groupby('segmento')[['Recencia', 'Frequencia', 'Monetario']].mean()
+    resumo['Clientes'] = rfm['segmento'].value_counts().sort_index()
+    print(resumo.round(1).to_string())
+    print(f'{len(segmentacao)} clientes segmentados em {time.perf_counter() - inicio:.2f} s -> {args.saida}')
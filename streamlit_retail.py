@@ -1,200 +1,50 @@
 import streamlit as st
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.linear_model import LinearRegression
-import numpy as np
-from datetime import timedelta
+
+from associacao import CONFIANCA_MINIMA, SEPARADOR, SUPORTE_MINIMO, obter_regras, regras_do_produto
+from banco import consulta_em_cache, ler_consulta, listar_consultas
+from cache_resultados import obter_cache_resultados
+from churn import FAIXAS_CHURN
+from cliente360 import obter_cliente360
+from dados import carregar_dados, carregar_fatos
+from filtros import FAIXAS_PRECO, normalizar_filtros
+from instrumentacao import encerrar_rastro, iniciar_rastro, mostrar_painel_depuracao
+from previsao import MODELOS, prever_vendas
+from recomendacoes import obter_indice, produtos_recomendados
+from relatorios import calcular_churn, vendas_em_cache
 
 # Configuração da Página
 st.set_page_config(layout="wide")
 st.title('Relatório de Vendas e Segmentação de Clientes')
 
-# URLs dos arquivos no GitHub
-base_url = 'https://raw.githubusercontent.com/GiovanoMP/projeto_kore_data/main/'
-url_clientes = base_url + 'clientes.csv'
-url_itens_fatura = base_url + 'itens_fatura.csv'
-url_produtos = base_url + 'produtos.csv'
-url_segmentacao = base_url + 'df_treinamento_reduzido.csv'
-
-# Carregar os DataFrames
-clientes = pd.read_csv(url_clientes)
-itens_fatura = pd.read_csv(url_itens_fatura)
-produtos = pd.read_csv(url_produtos)
-segmentacao = pd.read_csv(url_segmentacao)
-
-# Preparação de Dados
-itens_fatura['DataFatura'] = pd.to_datetime(itens_fatura['DataFatura'], errors='coerce')
-itens_fatura = itens_fatura.dropna(subset=['DataFatura'])
-clientes.rename(columns=lambda x: x.strip(), inplace=True)
-itens_fatura.rename(columns=lambda x: x.strip(), inplace=True)
-produtos.rename(columns=lambda x: x.strip(), inplace=True)
-segmentacao.rename(columns=lambda x: x.strip(), inplace=True)
-
-# Merge para adicionar a categoria dos produtos
-itens_fatura = itens_fatura.merge(produtos[['CodigoProduto', 'Categoria', 'PrecoUnitario']], on='CodigoProduto', how='left')
-
-# Funções de Análise
-def calcular_receita_total(itens_fatura):
-    return itens_fatura['ValorTotal'].sum()
-
-def calcular_receita_diaria(itens_fatura, start_date, end_date):
-    filtro = (itens_fatura['DataFatura'].dt.date >= start_date) & (itens_fatura['DataFatura'].dt.date <= end_date)
-    receita_diaria = itens_fatura[filtro].groupby(itens_fatura['DataFatura'].dt.date)['ValorTotal'].sum()
-    return receita_diaria
-
-def calcular_receita_mensal(itens_fatura):
-    receita_mensal = itens_fatura.groupby(itens_fatura['DataFatura'].dt.to_period('M'))['ValorTotal'].sum()
-    return receita_mensal
-
-def calcular_receita_por_pais(itens_fatura, clientes):
-    merged_data = itens_fatura.merge(clientes, on='IDCliente')
-    if 'Pais' in merged_data.columns:
-        receita_pais = merged_data.groupby('Pais')['ValorTotal'].sum()
-        return receita_pais
-    else:
-        return pd.Series()
-
-def calcular_clientes_unicos(itens_fatura):
-    return itens_fatura['IDCliente'].nunique()
-
-def calcular_top_clientes(itens_fatura, n=100):
-    top_clientes = itens_fatura.groupby('IDCliente')['ValorTotal'].sum().nlargest(n).reset_index()
-    top_clientes['IDCliente'] = top_clientes['IDCliente'].astype(str) 
-    return top_clientes
-
-def calcular_frequencia_compras(itens_fatura):
-    frequencia = itens_fatura.groupby('IDCliente').size()
-    return frequencia
+# Painel de depuração: tempo, linhas e memória de cada etapa desta execução
+depuracao = st.sidebar.checkbox('Painel de depuração', key='depuracao')
+rastro = iniciar_rastro('streamlit_retail', ativo=depuracao)
 
-def calcular_produtos_mais_vendidos(itens_fatura, produtos):
-    vendidos = itens_fatura.groupby('CodigoProduto')['Quantidade'].sum().nlargest(10).reset_index()
-    return vendidos.merge(produtos, on='CodigoProduto')
+# Carregar os DataFrames (tipados e em cache, a partir dos CSVs locais)
+clientes, itens_fatura, produtos, segmentacao = carregar_dados()
 
-def calcular_produtos_melhor_desempenho(itens_fatura, produtos):
-    desempenho = itens_fatura.groupby('CodigoProduto')['ValorTotal'].sum().nlargest(10).reset_index()
-    return desempenho.merge(produtos, on='CodigoProduto')
+# Tabela fato com Categoria, PrecoUnitario, CategoriaPreco e Pais já incorporados
+itens_fatura = carregar_fatos()
 
-def calcular_produtos_mais_devolvidos(itens_fatura, produtos):
-    devolvidos = itens_fatura[itens_fatura['Devolucao'] == True].groupby('CodigoProduto')['Quantidade'].sum().nlargest(10).reset_index()
-    return devolvidos.merge(produtos, on='CodigoProduto')
-
-def calcular_numero_transacoes(itens_fatura):
-    return itens_fatura['NumeroFatura'].nunique()
-
-def calcular_transacoes_com_devolucoes(itens_fatura):
-    return itens_fatura[itens_fatura['Devolucao'] == True]['NumeroFatura'].nunique()
-
-def calcular_ticket_medio(itens_fatura):
-    return itens_fatura['ValorTotal'].mean()
-
-def calcular_variacao_sazonal(itens_fatura):
-    variacao = itens_fatura.groupby(itens_fatura['DataFatura'].dt.month)['ValorTotal'].sum()
-    return variacao
-
-def calcular_tendencia_vendas(itens_fatura):
-    tendencia = itens_fatura.groupby(itens_fatura['DataFatura'].dt.to_period('M'))['ValorTotal'].sum()
-    return tendencia
-
-# Função para calcular o tempo desde a última compra
-def calcular_tempo_desde_ultima_compra(itens_fatura, data_referencia):
-    ultima_compra = itens_fatura.groupby('IDCliente')['DataFatura'].max().reset_index()
-    ultima_compra['DiasDesdeUltimaCompra'] = (data_referencia - ultima_compra['DataFatura']).dt.days
-    return ultima_compra[['IDCliente', 'DiasDesdeUltimaCompra']]
-
-# Funções de Análise de Churn
-def filtrar_clientes_por_intervalo(df, dias_inicio, dias_fim, ultima_data):
-    data_inicio = ultima_data - timedelta(days=dias_inicio)
-    data_fim = ultima_data - timedelta(days=dias_fim)
-    clientes_inativos = df.groupby('IDCliente').filter(
-        lambda x: x['DataFatura'].max() <= data_inicio and x['DataFatura'].max() > data_fim
-    )
-    return clientes_inativos['IDCliente'].unique()
-
-def analisar_produtos(clientes, descricao):
-    transacoes = itens_fatura[itens_fatura['IDCliente'].isin(clientes)]
-    produtos_mais_comprados = transacoes.groupby('CodigoProduto')['Quantidade'].sum().sort_values(ascending=False).head(10)
-    produtos_devolucoes = transacoes[transacoes['Devolucao']].groupby('CodigoProduto')['Quantidade'].sum()
-    produtos_mais_comprados = produtos_mais_comprados.to_frame().join(produtos_devolucoes, rsuffix='_Devolucao').fillna(0)
-    produtos_mais_comprados.columns = ['Quantidade_Comprada', 'Quantidade_Devolvida']
-    produtos_mais_comprados['Proporcao_Devolucao'] = produtos_mais_comprados['Quantidade_Devolvida'] / produtos_mais_comprados['Quantidade_Comprada']
-    produtos_mais_comprados.reset_index(inplace=True)
-    st.write(f"Produtos mais comprados por {descricao}:")
-    st.dataframe(produtos_mais_comprados)
-    st.write("Clientes:")
-    for cliente in clientes:
-        st.write(f"Cliente {cliente}")
+# Lista de clientes paginada, renderizada como um único dataframe
+def mostrar_clientes_paginados(recencia, clientes, chave, tamanho_pagina=500):
+    total_paginas = max(1, -(-len(clientes) // tamanho_pagina))
+    pagina = st.number_input(f'Página (de {total_paginas}):', min_value=1, max_value=total_paginas, value=1, step=1, key=chave)
+    inicio = (pagina - 1) * tamanho_pagina
+    pagina_clientes = clientes[inicio:inicio + tamanho_pagina]
+    st.dataframe(recencia[recencia['IDCliente'].isin(pagina_clientes)], hide_index=True)
 
 # Função de Previsão de Vendas
-def prever_vendas(df_itens_fatura, meses_a_prever):
-    st.write("Pré-processando dados...")
-    df_itens_fatura['DataFatura'] = pd.to_datetime(df_itens_fatura['DataFatura'], errors='coerce')
-
-    # Tratamento de valores ausentes
-    df_itens_fatura.fillna(0, inplace=True)
-
-    # Criação de features baseadas nas datas
-    df_itens_fatura['Mes'] = df_itens_fatura['DataFatura'].dt.month
-    df_itens_fatura['Ano'] = df_itens_fatura['DataFatura'].dt.year
-    df_itens_fatura['DiaSemana'] = df_itens_fatura['DataFatura'].dt.dayofweek
-
-    # Separar Features Numéricas e Categóricas
-    X_numeric = df_itens_fatura[['Quantidade', 'Mes', 'Ano', 'DiaSemana']]
-    X_categorical = df_itens_fatura[['Categoria']]
-
-    # Normalizar Features Numéricas
-    scaler = StandardScaler()
-    X_numeric = scaler.fit_transform(X_numeric)
-
-    # Codificar Features Categóricas (One-Hot Encoding)
-    encoder = OneHotEncoder(handle_unknown='ignore')
-    X_categorical_encoded = encoder.fit_transform(X_categorical).toarray()
-
-    # Combinar Features
-    X = np.concatenate((X_numeric, X_categorical_encoded), axis=1)
-    y = df_itens_fatura['ValorTotal']
-
-    # Divisão em treino e teste
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # Modelo de Regressão Linear
-    model = LinearRegression()
-    model.fit(X_train, y_train)
-
-    # Previsões a partir da última data do dataframe
-    ultima_data = df_itens_fatura['DataFatura'].max()
-    datas_futuras = [ultima_data + timedelta(days=i) for i in range(1, meses_a_prever * 30 + 1)]
-
-    # Gerar features para as datas futuras
-    futuras_features = pd.DataFrame({
-        'Quantidade': [0] * len(datas_futuras),
-        'Mes': [data.month for data in datas_futuras],
-        'Ano': [data.year for data in datas_futuras],
-        'DiaSemana': [data.dayofweek for data in datas_futuras],
-        'Categoria': [''] * len(datas_futuras)  # Categoria vazia, ajustar conforme necessário
-    })
-
-    # Normalizar e codificar as features futuras
-    futuras_features_numeric = scaler.transform(futuras_features[['Quantidade', 'Mes', 'Ano', 'DiaSemana']])
-    futuras_features_categorical_encoded = encoder.transform(futuras_features[['Categoria']]).toarray()
-
-    # Combinar todas as features futuras
-    X_futuras = np.concatenate((futuras_features_numeric, futuras_features_categorical_encoded), axis=1)
-
-    # Prever valores futuros
-    y_futuras = model.predict(X_futuras)
-
-    # Formatar as datas e valores para exibição
-    datas_futuras_formatadas = [data.strftime('%d/%m/%Y') for data in datas_futuras]
-    previsoes_df = pd.DataFrame({
-        'Data': datas_futuras_formatadas,
-        'Valor Previsto': y_futuras
-    })
+# O modelo é treinado sobre a receita diária por categoria e fica em cache por versão dos dados
+def mostrar_previsao_vendas(meses_a_prever, modelo='linear'):
+    previsor, previsao, previsoes_df = prever_vendas(meses_a_prever, modelo)
 
     st.write("Previsões de Vendas:")
+    st.line_chart(previsao)
     st.dataframe(previsoes_df)
 
-    return model
+    return previsor
 
 # Interface do Streamlit
 st.sidebar.header('Menu')
@@ -212,7 +62,7 @@ if opcao == 'Relatório de Vendas':
     st.sidebar.header('Filtro de Categoria de Preço')
     categoria_preco = st.sidebar.radio(
         'Escolha uma Categoria de Preço:',
-        ['Nenhum', 'Barato (abaixo de 5,00)', 'Moderado (5,00 a 20,00)', 'Caro (acima de 20,00)']
+        ['Nenhum'] + FAIXAS_PRECO
     )
 
     st.sidebar.header('Filtro de País')
@@ -223,87 +73,99 @@ if opcao == 'Relatório de Vendas':
     categorias_produtos = ['Nenhum'] + list(produtos['Categoria'].unique())
     categoria_produto_selecionada = st.sidebar.selectbox('Escolha uma Categoria de Produto:', categorias_produtos)
 
-    # Aplicando os filtros
-    itens_fatura_filtrado = itens_fatura.copy()
-
-    if categoria_preco != 'Nenhum':
-        if categoria_preco == 'Barato (abaixo de 5,00)':
-            itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['PrecoUnitario'] < 5]
-        elif categoria_preco == 'Moderado (5,00 a 20,00)':
-            itens_fatura_filtrado = itens_fatura_filtrado[(itens_fatura_filtrado['PrecoUnitario'] >= 5) & (itens_fatura_filtrado['PrecoUnitario'] <= 20)]
-        elif categoria_preco == 'Caro (acima de 20,00)':
-            itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['PrecoUnitario'] > 20]
-
-    if pais_selecionado != 'Global':
-        itens_fatura_filtrado = itens_fatura_filtrado.merge(clientes, on='IDCliente')
-        itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['Pais'] == pais_selecionado]
-
-    if categoria_produto_selecionada != 'Nenhum':
-        itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['Categoria'] == categoria_produto_selecionada]
-
+    # Indicadores da tabela filtrada e séries de receita do cubo, pelo motor de relatórios,
+    # reaproveitados do cache de resultados quando a combinação de filtros já foi vista
+    filtros_selecionados = normalizar_filtros(categoria_preco, pais_selecionado, categoria_produto_selecionada)
+    indicadores = vendas_em_cache(itens_fatura, produtos, inicio=start_date, fim=end_date, **filtros_selecionados)
     st.header('Indicadores de Vendas')
-    st.write(f"Receita Total: ${calcular_receita_total(itens_fatura_filtrado):,.2f}")
+    st.write(f"Receita Total: ${indicadores['receita_total']:,.2f}")
     st.subheader('Receita Diária')
-    st.line_chart(calcular_receita_diaria(itens_fatura_filtrado, start_date, end_date))
+    st.line_chart(indicadores['receita_diaria'])
     st.subheader('Receita Mensal')
-    st.line_chart(calcular_receita_mensal(itens_fatura_filtrado))
+    st.line_chart(indicadores['receita_mensal'])
     st.subheader('Receita por País')
-    receita_por_pais = calcular_receita_por_pais(itens_fatura_filtrado, clientes)
+    receita_por_pais = indicadores['receita_por_pais']
     if not receita_por_pais.empty:
         st.bar_chart(receita_por_pais)
     else:
         st.write("Nenhum dado disponível para Receita por País.")
     st.header('Indicadores de Clientes')
-    st.write(f"Clientes Únicos: {calcular_clientes_unicos(itens_fatura_filtrado)}")
+    st.write(f"Clientes Únicos: {indicadores['clientes_unicos']}")
     st.subheader('Top Clientes')
-    top_clientes = calcular_top_clientes(itens_fatura_filtrado)
+    top_clientes = indicadores['top_clientes']
     st.dataframe(top_clientes)
     st.subheader('Frequência de Compras por Cliente')
-    st.bar_chart(calcular_frequencia_compras(itens_fatura_filtrado))
+    st.bar_chart(indicadores['frequencia_compras'])
     st.header('Indicadores de Produtos')
     st.subheader('Produtos Mais Vendidos')
-    st.dataframe(calcular_produtos_mais_vendidos(itens_fatura_filtrado, produtos))
+    st.dataframe(indicadores['produtos_mais_vendidos'])
     st.subheader('Produtos com Melhor Desempenho por Categoria')
-    st.dataframe(calcular_produtos_melhor_desempenho(itens_fatura_filtrado, produtos))
+    st.dataframe(indicadores['produtos_melhor_desempenho'])
     st.subheader('Produtos Mais Devolvidos')
-    st.dataframe(calcular_produtos_mais_devolvidos(itens_fatura_filtrado, produtos))
+    st.dataframe(indicadores['produtos_mais_devolvidos'])
     st.header('Indicadores de Transações')
-    st.write(f"Número de Transações: {calcular_numero_transacoes(itens_fatura_filtrado)}")
-    st.write(f"Transações com Devoluções: {calcular_transacoes_com_devolucoes(itens_fatura_filtrado)}")
-    st.write(f"Ticket Médio: ${calcular_ticket_medio(itens_fatura_filtrado):,.2f}")
+    st.write(f"Número de Transações: {indicadores['numero_transacoes']}")
+    st.write(f"Transações com Devoluções: {indicadores['transacoes_com_devolucoes']}")
+    st.write(f"Ticket Médio: ${indicadores['ticket_medio']:,.2f}")
     st.header('Análise Temporal')
     st.subheader('Variação Sazonal nas Vendas')
-    st.line_chart(calcular_variacao_sazonal(itens_fatura_filtrado))
+    st.line_chart(indicadores['variacao_sazonal'])
     st.subheader('Tendência de Vendas ao Longo do Tempo')
-    st.line_chart(calcular_tendencia_vendas(itens_fatura_filtrado))
+    st.line_chart(indicadores['tendencia_vendas'])
+    # Consultas SQL executadas no banco local com os filtros da barra lateral
+    st.header('Consultas SQL')
+    consulta = st.selectbox('Escolha uma consulta:', listar_consultas())
+    with st.expander('SQL'):
+        st.code(ler_consulta(consulta), language='sql')
+    resultado_consulta = consulta_em_cache(consulta, inicio=start_date, fim=end_date, **filtros_selecionados)
+    st.dataframe(resultado_consulta, hide_index=True)
+    st.download_button('Baixar CSV', resultado_consulta.to_csv(index=False), file_name=f'{consulta}.csv', mime='text/csv')
+    # Regras de associação entre produtos da mesma fatura, com os filtros de país e categoria
+    st.header('Regras de Associação')
+    suporte_minimo = st.slider('Suporte mínimo (% das faturas):', 0.1, 5.0, SUPORTE_MINIMO * 100, 0.1) / 100
+    confianca_minima = st.slider('Confiança mínima:', 0.05, 1.0, CONFIANCA_MINIMA, 0.05)
+    regras = obter_regras(itens_fatura, filtros_selecionados['pais'], filtros_selecionados['categoria'], suporte_minimo, confianca_minima)
+    if regras.empty:
+        st.write("Nenhuma regra encontrada com esses filtros.")
+    else:
+        descricoes = dict(zip(produtos['CodigoProduto'].astype(str), produtos['Descricao']))
+        produtos_regras = sorted({codigo for antecedente in regras['Antecedente'] for codigo in antecedente.split(SEPARADOR)})
+        produto_regra = st.selectbox('Escolha um produto:', produtos_regras, format_func=lambda codigo: f"{codigo} - {descricoes.get(codigo, '')}")
+        regras_produto = regras_do_produto(regras, produto_regra).copy()
+        regras_produto['DescricaoConsequente'] = regras_produto['Consequente'].map(
+            lambda consequente: SEPARADOR.join(str(descricoes.get(codigo, codigo)) for codigo in consequente.split(SEPARADOR))
+        )
+        st.dataframe(regras_produto, hide_index=True)
+        st.download_button('Baixar regras (CSV)', regras.to_csv(index=False), file_name='regras_associacao.csv', mime='text/csv')
 
 # Seção de Análise de Churn
 elif opcao == 'Análise de Churn':
     st.header('Análise de Churn')
-    ultima_data = pd.to_datetime(itens_fatura['DataFatura'].max())
 
     st.sidebar.header('Filtro de Churn')
-    intervalo = st.sidebar.selectbox('Selecione um intervalo de dias:', ['30-60 dias', '61-90 dias', '91-120 dias', '121-360 dias'])
-    if intervalo == '30-60 dias':
-        dias_inicio, dias_fim = 30, 60
-    elif intervalo == '61-90 dias':
-        dias_inicio, dias_fim = 61, 90
-    elif intervalo == '91-120 dias':
-        dias_inicio, dias_fim = 91, 120
-    elif intervalo == '121-360 dias':
-        dias_inicio, dias_fim = 121, 360
-
-    clientes_filtrados = filtrar_clientes_por_intervalo(itens_fatura, dias_inicio, dias_fim, ultima_data)
-    quantidade_total_clientes = itens_fatura['IDCliente'].nunique()
-    qtd_clientes_filtrados = len(clientes_filtrados)
-    st.write(f"Quantidade total de clientes: {quantidade_total_clientes}")
-    st.write(f"Clientes que não compram há {dias_fim} a {dias_inicio} dias: {qtd_clientes_filtrados}")
-    porcentagem_churn = (qtd_clientes_filtrados / quantidade_total_clientes) * 100
-    st.write(f"Porcentagem de churn: {porcentagem_churn:.2f}%")
+    intervalo = st.sidebar.selectbox('Selecione um intervalo de dias:', list(FAIXAS_CHURN) + ['Personalizado'])
+    if intervalo == 'Personalizado':
+        dias_inicio = st.sidebar.number_input('Sem comprar há pelo menos (dias):', min_value=0, value=30, step=1)
+        dias_fim = st.sidebar.number_input('E no máximo (dias):', min_value=int(dias_inicio), value=max(int(dias_inicio), 60), step=1)
+    else:
+        dias_inicio, dias_fim = FAIXAS_CHURN[intervalo]
+
+    # Recência por cliente calculada uma vez; o intervalo é resolvido por busca binária
+    churn = calcular_churn(itens_fatura, dias_inicio, dias_fim, intervalo)
+    st.write(f"Quantidade total de clientes: {churn['total_clientes']}")
+    st.write(f"Clientes que não compram há {dias_fim} a {dias_inicio} dias: {churn['clientes_no_intervalo']}")
+    st.write(f"Porcentagem de churn: {churn['porcentagem_churn']:.2f}%")
+    st.subheader('Curva de Churn')
+    st.bar_chart(churn['curva_churn'].set_index('Faixa')['PorcentagemChurn'])
+
+    # Produtos por faixa de churn, calculados para todas as faixas de uma só vez
+    st.write(f"Produtos mais comprados por clientes que não compram há {dias_fim} a {dias_inicio} dias:")
+    st.dataframe(churn['produtos_intervalo'].drop(columns='Faixa'), hide_index=True)
+    if churn['produtos_por_faixa'] is not None:
+        with st.expander('Produtos mais comprados em todas as faixas'):
+            st.dataframe(churn['produtos_por_faixa'], hide_index=True)
     st.write("Clientes:")
-    for cliente in clientes_filtrados:
-        st.write(f"Cliente {cliente}")
-    analisar_produtos(clientes_filtrados, f"clientes que não compram há {dias_fim} a {dias_inicio} dias")
+    mostrar_clientes_paginados(churn['recencia'], churn['clientes'], 'pagina_churn')
 
 # Seção de Segmentação de Clientes
 elif opcao == 'Segmentação de Clientes':
@@ -313,25 +175,18 @@ elif opcao == 'Segmentação de Clientes':
     if segmento_selecionado != 'Nenhum':
         if st.button('Mostrar Clientes'):
             segmento_numero = int(segmento_selecionado.split()[-1])
-            clientes_segmento = segmentacao[segmentacao['segmento'] == segmento_numero]
-            clientes_ids = clientes_segmento['IDCliente'].unique()
+            indice_recomendacoes = obter_indice(segmentacao, produtos)
+            clientes_ids = indice_recomendacoes.clientes_por_segmento.get(segmento_numero, [])
             st.write(f"Clientes no {segmento_selecionado}:")
 
             # Mostrar produtos recomendados para o segmento
             st.write("Produtos recomendados:")
-            produtos_recomendados = clientes_segmento['ProdutosRecomendados'].iloc[0]
-            for produto in eval(produtos_recomendados):
-                categoria = produtos[produtos['CodigoProduto'] == str(produto)]['Categoria']
-                if not categoria.empty:
-                    categoria = categoria.values[0]
-                    st.write(f"  - Produto: {produto}, Categoria: {categoria}")
-                else:
-                    st.write(f"  - Produto: {produto}, Categoria: Não encontrada")
+            for produto, categoria in indice_recomendacoes.recomendados_segmento(segmento_numero):
+                st.write(f"  - Produto: {produto}, Categoria: {categoria}")
 
             # Mostrar clientes
             st.write("Clientes:")
-            for cliente in clientes_ids:
-                st.write(f"Cliente {cliente}")
+            st.dataframe(pd.DataFrame({'IDCliente': clientes_ids}), hide_index=True)
 
 # Seção de Busca de Cliente
 elif opcao == 'Informações por Código do Cliente':
@@ -340,27 +195,21 @@ elif opcao == 'Informações por Código do Cliente':
     if id_cliente:
         try:
             id_cliente_float = float(id_cliente.replace(',', '.'))
-            cliente = segmentacao[segmentacao['IDCliente'] == id_cliente_float]
-            if not cliente.empty:
-                cliente_info = clientes[clientes['IDCliente'] == id_cliente_float]
-                valor_total = itens_fatura[itens_fatura['IDCliente'] == id_cliente_float]['ValorTotal'].sum()
-                ultimos_produtos = itens_fatura[itens_fatura['IDCliente'] == id_cliente_float].sort_values(by='DataFatura', ascending=False).head(5)
+            indice_recomendacoes = obter_indice(segmentacao, produtos)
+            if id_cliente_float.is_integer() and int(id_cliente_float) in indice_recomendacoes.por_cliente:
+                cliente_info = obter_cliente360(itens_fatura, clientes, segmentacao).consultar(int(id_cliente_float))
                 st.write(f"Informações do cliente {id_cliente}:")
-                if not cliente_info.empty:
-                    st.write(f"País: {cliente_info['Pais'].values[0]}")
-                st.write(f"Valor total de compras: ${valor_total:,.2f}")
+                if cliente_info['Pais'] is not None:
+                    st.write(f"País: {cliente_info['Pais']}")
+                if cliente_info['Segmento'] is not None:
+                    st.write(f"Segmento: {cliente_info['Segmento']}")
+                st.write(f"Valor total de compras: ${cliente_info['ValorTotal']:,.2f}")
                 st.write("Últimos produtos comprados:")
-                for _, row in ultimos_produtos.iterrows():
-                    st.write(f"  - Produto: {row['CodigoProduto']}, Data: {row['DataFatura'].date()}, Valor: ${row['ValorTotal']:,.2f}")
+                for produto, data, valor in zip(cliente_info['UltimosProdutos']['CodigoProduto'], cliente_info['UltimosProdutos']['DataFatura'], cliente_info['UltimosProdutos']['ValorTotal']):
+                    st.write(f"  - Produto: {produto}, Data: {data.date()}, Valor: ${valor:,.2f}")
                 st.write("Produtos recomendados:")
-                produtos_recomendados = eval(cliente['ProdutosRecomendados'].values[0])
-                for produto in produtos_recomendados:
-                    categoria = produtos[produtos['CodigoProduto'] == str(produto)]['Categoria']
-                    if not categoria.empty:
-                        categoria = categoria.values[0]
-                        st.write(f"  - Produto: {produto}, Categoria: {categoria}")
-                    else:
-                        st.write(f"  - Produto: {produto}, Categoria: Não encontrada")
+                for produto, categoria in produtos_recomendados(int(id_cliente_float), itens_fatura, segmentacao, produtos):
+                    st.write(f"  - Produto: {produto}, Categoria: {categoria}")
             else:
                 st.write(f"Cliente {id_cliente} não encontrado.")
         except ValueError:
@@ -432,9 +281,12 @@ elif opcao == 'Análises e Insights':
 elif opcao == 'Previsão de Vendas com Machine Learning':
     st.header('Previsão de Vendas com Machine Learning')
     meses_a_prever = st.sidebar.slider('Prever para quantos meses?', 1, 3, 1)
+    modelo_previsao = st.sidebar.selectbox('Modelo:', list(MODELOS))
     if st.button('Prever Vendas'):
-        df_previsao = itens_fatura.copy()
-        modelo_treinado = prever_vendas(df_previsao, meses_a_prever)
+        modelo_treinado = mostrar_previsao_vendas(meses_a_prever, modelo_previsao)
         if modelo_treinado:
             st.write("Modelo treinado e previsões feitas com sucesso!")
 
+# Painel de depuração ao final, com todas as etapas desta execução
+if rastro is not None:
+    mostrar_painel_depuracao(encerrar_rastro(), {'Cache de resultados': obter_cache_resultados().estatisticas()})
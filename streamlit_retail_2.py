@@ -1,87 +1,23 @@
 import streamlit as st
 import pandas as pd
 
-# Carregar os dataframes
-clientes = pd.read_csv('clientes.csv')
-itens_fatura = pd.read_csv('itens_fatura.csv')
-produtos = pd.read_csv('produtos.csv')
+from cache_resultados import obter_cache_resultados
+from dados import carregar_fatos, carregar_tabela
+from filtros import FAIXAS_PRECO, normalizar_filtros
+from instrumentacao import encerrar_rastro, iniciar_rastro, mostrar_painel_depuracao
+from relatorios import vendas_em_cache
 
-# Converter a coluna 'DataFatura' para datetime
-itens_fatura['DataFatura'] = pd.to_datetime(itens_fatura['DataFatura'], errors='coerce')
+# Painel de depuração: tempo, linhas e memória de cada etapa desta execução
+depuracao = st.sidebar.checkbox('Painel de depuração', key='depuracao')
+rastro = iniciar_rastro('streamlit_retail_2', ativo=depuracao)
 
-# Filtrar registros com datas válidas
-itens_fatura = itens_fatura.dropna(subset=['DataFatura'])
+# Carregar os dataframes (tipados e em cache, a partir dos CSVs locais)
+clientes = carregar_tabela('clientes')
+itens_fatura = carregar_tabela('itens_fatura')
+produtos = carregar_tabela('produtos')
 
-# Garantir que os nomes das colunas estejam corretos
-clientes.rename(columns=lambda x: x.strip(), inplace=True)
-itens_fatura.rename(columns=lambda x: x.strip(), inplace=True)
-produtos.rename(columns=lambda x: x.strip(), inplace=True)
-
-# Verificar se a coluna 'Categoria' existe em itens_fatura e adicionar se necessário
-if 'Categoria' not in itens_fatura.columns:
-    itens_fatura = itens_fatura.merge(produtos[['CodigoProduto', 'Categoria']], on='CodigoProduto', how='left')
-
-# Funções auxiliares para calcular os indicadores
-def calcular_receita_total(itens_fatura):
-    return itens_fatura['ValorTotal'].sum()
-
-def calcular_receita_diaria(itens_fatura, start_date, end_date):
-    filtro = (itens_fatura['DataFatura'].dt.date >= start_date) & (itens_fatura['DataFatura'].dt.date <= end_date)
-    receita_diaria = itens_fatura[filtro].groupby(itens_fatura['DataFatura'].dt.date)['ValorTotal'].sum()
-    return receita_diaria
-
-def calcular_receita_mensal(itens_fatura):
-    receita_mensal = itens_fatura.groupby(itens_fatura['DataFatura'].dt.to_period('M'))['ValorTotal'].sum()
-    return receita_mensal
-
-def calcular_receita_por_pais(itens_fatura, clientes):
-    merged_data = itens_fatura.merge(clientes, on='IDCliente')
-    if 'Pais' in merged_data.columns:
-        receita_pais = merged_data.groupby('Pais')['ValorTotal'].sum()
-        return receita_pais
-    else:
-        return pd.Series()
-
-def calcular_clientes_unicos(itens_fatura):
-    return itens_fatura['IDCliente'].nunique()
-
-def calcular_top_clientes(itens_fatura, n=100):
-    top_clientes = itens_fatura.groupby('IDCliente')['ValorTotal'].sum().nlargest(n).reset_index()
-    top_clientes['IDCliente'] = top_clientes['IDCliente'].astype(str)  # Ajustar a formatação
-    return top_clientes
-
-def calcular_frequencia_compras(itens_fatura):
-    frequencia = itens_fatura.groupby('IDCliente').size()
-    return frequencia
-
-def calcular_produtos_mais_vendidos(itens_fatura, produtos):
-    vendidos = itens_fatura.groupby('CodigoProduto')['Quantidade'].sum().nlargest(10).reset_index()
-    return vendidos.merge(produtos, on='CodigoProduto')
-
-def calcular_produtos_melhor_desempenho(itens_fatura, produtos):
-    desempenho = itens_fatura.groupby('CodigoProduto')['ValorTotal'].sum().nlargest(10).reset_index()
-    return desempenho.merge(produtos, on='CodigoProduto')
-
-def calcular_produtos_mais_devolvidos(itens_fatura, produtos):
-    devolvidos = itens_fatura[itens_fatura['Devolucao'] == True].groupby('CodigoProduto')['Quantidade'].sum().nlargest(10).reset_index()
-    return devolvidos.merge(produtos, on='CodigoProduto')
-
-def calcular_numero_transacoes(itens_fatura):
-    return itens_fatura['NumeroFatura'].nunique()
-
-def calcular_transacoes_com_devolucoes(itens_fatura):
-    return itens_fatura[itens_fatura['Devolucao'] == True]['NumeroFatura'].nunique()
-
-def calcular_ticket_medio(itens_fatura):
-    return itens_fatura['ValorTotal'].mean()
-
-def calcular_variacao_sazonal(itens_fatura):
-    variacao = itens_fatura.groupby(itens_fatura['DataFatura'].dt.month)['ValorTotal'].sum()
-    return variacao
-
-def calcular_tendencia_vendas(itens_fatura):
-    tendencia = itens_fatura.groupby(itens_fatura['DataFatura'].dt.to_period('M'))['ValorTotal'].sum()
-    return tendencia
+# Tabela fato com Categoria, PrecoUnitario, CategoriaPreco e Pais já incorporados
+itens_fatura = carregar_fatos()
 
 # Título do app
 st.title('Relatório de Vendas')
@@ -98,7 +34,7 @@ if start_date > end_date:
 st.sidebar.header('Filtro de Categoria de Preço')
 categoria_preco = st.sidebar.radio(
     'Escolha uma Categoria de Preço:',
-    ['Nenhum', 'Barato (abaixo de 5,00)', 'Moderado (5,00 a 20,00)', 'Caro (acima de 20,00)']
+    ['Nenhum'] + FAIXAS_PRECO
 )
 
 # Seleção de categoria de produtos
@@ -111,43 +47,23 @@ st.sidebar.header('Filtro de País')
 paises = ['Global'] + list(clientes['Pais'].unique())
 pais_selecionado = st.sidebar.selectbox('Escolha um País:', paises)
 
-# Filtrar dados por categoria de preço
-if categoria_preco != 'Nenhum':
-    itens_fatura_filtrado = itens_fatura.merge(produtos, on='CodigoProduto')
-    if categoria_preco == 'Barato (abaixo de 5,00)':
-        itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['PrecoUnitario'] < 5]
-    elif categoria_preco == 'Moderado (5,00 a 20,00)':
-        itens_fatura_filtrado = itens_fatura_filtrado[(itens_fatura_filtrado['PrecoUnitario'] >= 5) & (itens_fatura_filtrado['PrecoUnitario'] <= 20)]
-    elif categoria_preco == 'Caro (acima de 20,00)':
-        itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['PrecoUnitario'] > 20]
-else:
-    itens_fatura_filtrado = itens_fatura.copy()
-
-# Filtrar dados por categoria de produto
-if categoria_produto_selecionada != 'Nenhum':
-    if 'Categoria' not in itens_fatura_filtrado.columns:
-        itens_fatura_filtrado = itens_fatura_filtrado.merge(produtos[['CodigoProduto', 'Categoria']], on='CodigoProduto', how='left')
-    itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['Categoria'] == categoria_produto_selecionada]
-
-# Filtrar dados por país
-if pais_selecionado != 'Global':
-    itens_fatura_filtrado = itens_fatura_filtrado.merge(clientes, on='IDCliente')
-    itens_fatura_filtrado = itens_fatura_filtrado[itens_fatura_filtrado['Pais'] == pais_selecionado]
-else:
-    itens_fatura_filtrado = itens_fatura_filtrado.merge(clientes, on='IDCliente')
+# Aplicar os filtros de preço, categoria e país; indicadores da tabela filtrada e séries
+# de receita do cubo, pelo motor de relatórios e pelo cache de resultados
+filtros_selecionados = normalizar_filtros(categoria_preco, pais_selecionado, categoria_produto_selecionada)
+indicadores = vendas_em_cache(itens_fatura, produtos, inicio=start_date, fim=end_date, **filtros_selecionados)
 
 # Seção de Indicadores de Vendas
 st.header('Indicadores de Vendas')
-st.write(f"Receita Total: ${calcular_receita_total(itens_fatura_filtrado):,.2f}")
+st.write(f"Receita Total: ${indicadores['receita_total']:,.2f}")
 
 st.subheader('Receita Diária')
-st.line_chart(calcular_receita_diaria(itens_fatura_filtrado, start_date, end_date))
+st.line_chart(indicadores['receita_diaria'])
 
 st.subheader('Receita Mensal')
-st.line_chart(calcular_receita_mensal(itens_fatura_filtrado))
+st.line_chart(indicadores['receita_mensal'])
 
 st.subheader('Receita por País')
-receita_por_pais = calcular_receita_por_pais(itens_fatura_filtrado, clientes)
+receita_por_pais = indicadores['receita_por_pais']
 if not receita_por_pais.empty:
     st.bar_chart(receita_por_pais)
 else:
@@ -155,39 +71,43 @@ else:
 
 # Seção de Indicadores de Clientes
 st.header('Indicadores de Clientes')
-st.write(f"Clientes Únicos: {calcular_clientes_unicos(itens_fatura_filtrado)}")
+st.write(f"Clientes Únicos: {indicadores['clientes_unicos']}")
 
 st.subheader('Top Clientes')
-top_clientes = calcular_top_clientes(itens_fatura_filtrado)
+top_clientes = indicadores['top_clientes']
 st.dataframe(top_clientes)
 
 st.subheader('Frequência de Compras por Cliente')
-st.bar_chart(calcular_frequencia_compras(itens_fatura_filtrado))
+st.bar_chart(indicadores['frequencia_compras'])
 
 # Seção de Indicadores de Produtos
 st.header('Indicadores de Produtos')
 st.subheader('Produtos Mais Vendidos')
-st.dataframe(calcular_produtos_mais_vendidos(itens_fatura_filtrado, produtos))
+st.dataframe(indicadores['produtos_mais_vendidos'])
 
 st.subheader('Produtos com Melhor Desempenho por Categoria')
-st.dataframe(calcular_produtos_melhor_desempenho(itens_fatura_filtrado, produtos))
+st.dataframe(indicadores['produtos_melhor_desempenho'])
 
 st.subheader('Produtos Mais Devolvidos')
-st.dataframe(calcular_produtos_mais_devolvidos(itens_fatura_filtrado, produtos))
+st.dataframe(indicadores['produtos_mais_devolvidos'])
 
 # Seção de Indicadores de Transações
 st.header('Indicadores de Transações')
-st.write(f"Número de Transações: {calcular_numero_transacoes(itens_fatura_filtrado)}")
-st.write(f"Transações com Devoluções: {calcular_transacoes_com_devolucoes(itens_fatura_filtrado)}")
-st.write(f"Ticket Médio: ${calcular_ticket_medio(itens_fatura_filtrado):,.2f}")
+st.write(f"Número de Transações: {indicadores['numero_transacoes']}")
+st.write(f"Transações com Devoluções: {indicadores['transacoes_com_devolucoes']}")
+st.write(f"Ticket Médio: ${indicadores['ticket_medio']:,.2f}")
 
 # Seção de Análise Temporal
 st.header('Análise Temporal')
 st.subheader('Variação Sazonal nas Vendas')
-st.line_chart(calcular_variacao_sazonal(itens_fatura_filtrado))
+st.line_chart(indicadores['variacao_sazonal'])
 
 st.subheader('Tendência de Vendas ao Longo do Tempo')
-st.line_chart(calcular_tendencia_vendas(itens_fatura_filtrado))
+st.line_chart(indicadores['tendencia_vendas'])
 
 # Rodapé
 st.write('Relatório gerado por Streamlit')
+
+# Painel de depuração ao final, com todas as etapas desta execução
+if rastro is not None:
+    mostrar_painel_depuracao(encerrar_rastro(), {'Cache de resultados': obter_cache_resultados().estatisticas()})
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cliente que não está na tabela de clientes (itens com IDCliente, mas sem país)
+CLIENTE_DESCONHECIDO = 99999
+
+
+# Tabelas de origem pequenas e determinísticas, no esquema de dados.carregar_dados:
+# inclui faturas sem IDCliente e um cliente desconhecido, ambos sem país
+def _tabelas_origem():
+    rng = np.random.default_rng(0)
+    n = 2000
+    produtos = pd.DataFrame({
+        'CodigoProduto': [f'P{indice:03d}' for indice in range(40)],
+        'Descricao': [f'PRODUTO {indice}' for indice in range(40)],
+        'Categoria': pd.Categorical(rng.choice(['Cozinha', 'Decoração', 'Festas'], 40)),
+        'PrecoUnitario': rng.choice([1.25, 4.99, 5.0, 12.5, 20.0, 20.01, 35.0], 40),
+    })
+    produtos['CategoriaPreco'] = pd.Categorical(np.where(produtos['PrecoUnitario'] < 5, 'Barato', 'Outro'))
+    clientes = pd.DataFrame({
+        'IDCliente': np.arange(12000, 12060, dtype='int64'),
+        'Pais': pd.Categorical(rng.choice(['United Kingdom', 'Germany', 'France'], 60)),
+    })
+    fatura = rng.integers(0, 300, n)
+    devolucao = rng.random(n) < 0.05
+    produto = rng.integers(0, 40, n)
+    quantidade = np.where(devolucao, -1, 1) * rng.integers(1, 12, n)
+    id_cliente = pd.array(clientes['IDCliente'].to_numpy()[fatura % 60], dtype='Int64')
+    id_cliente[fatura % 37 == 0] = CLIENTE_DESCONHECIDO
+    id_cliente[fatura % 23 == 0] = pd.NA
+    itens_fatura = pd.DataFrame({
+        'NumeroFatura': np.where(devolucao, 'C', '') + (536000 + fatura).astype(str),
+        'CodigoProduto': produtos['CodigoProduto'].to_numpy()[produto],
+        'IDCliente': id_cliente,
+        'DataFatura': pd.Timestamp('2010-12-01 08:00') + pd.to_timedelta(fatura * 1.2, unit='D'),
+        'Quantidade': quantidade,
+        'ValorTotal': quantidade * produtos['PrecoUnitario'].to_numpy()[produto],
+        'Venda': ~devolucao,
+        'Devolucao': devolucao,
+    })
+    return itens_fatura, produtos, clientes
+
+
+# Tabela fato no esquema de dados.carregar_fatos
+@pytest.fixture(scope='session')
+def tabelas():
+    from dados import _construir_fatos
+
+    itens_fatura, produtos, clientes = _tabelas_origem()
+    return _construir_fatos(itens_fatura, produtos, clientes), produtos
+
+
+# As mesmas tabelas gravadas como CSV em um diretório temporário, lidas por dados.py e
+# banco.py com caches próprios do teste
+@pytest.fixture
+def diretorio_dados(tmp_path, monkeypatch):
+    import banco
+    import dados
+
+    itens_fatura, produtos, clientes = _tabelas_origem()
+    itens_fatura.to_csv(tmp_path / 'itens_fatura.csv', index=False)
+    produtos.to_csv(tmp_path / 'produtos.csv', index=False)
+    clientes.to_csv(tmp_path / 'clientes.csv', index=False)
+    cache = str(tmp_path / 'cache')
+    monkeypatch.setattr(dados, 'DIRETORIO_DADOS', str(tmp_path))
+    monkeypatch.setattr(dados, 'DIRETORIO_CACHE', cache)
+    monkeypatch.setattr(dados, '_cache', {})
+    monkeypatch.setattr(banco, 'DIRETORIO_CACHE', cache)
+    monkeypatch.setattr(banco, '_banco_atual', None)
+    return tmp_path
@@ -0,0 +1,18 @@
+import pandas as pd
+
+import cache_resultados
+from associacao import minerar_regras, obter_regras
+from cache_resultados import CacheResultados
+from dados import carregar_fatos
+
+
+def test_obter_regras_usa_o_cache_de_resultados(diretorio_dados, monkeypatch):
+    cache = CacheResultados(diretorio=None)
+    monkeypatch.setattr(cache_resultados, '_cache_atual', cache)
+    fatos = carregar_fatos()
+
+    # 10 passos de 0,1% no slider: 0.010000000000000002
+    regras = obter_regras(fatos, 'Germany', None, 0.1 * 10 / 100, 0.3)
+    assert obter_regras(fatos, 'Germany', None, 0.01, 0.3) is regras
+    assert cache.contadores['falhas'] == 1 and cache.contadores['acertos'] == 1
+    pd.testing.assert_frame_equal(regras, minerar_regras(fatos, 'Germany', None, 0.01, 0.3, processos=1))
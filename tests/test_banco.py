@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+import analises
+import banco
+from dados import carregar_fatos, carregar_tabela
+
+
+def test_consultas_por_cliente_ignoram_itens_sem_cliente(diretorio_dados):
+    itens = carregar_tabela('itens_fatura')
+    assert itens['IDCliente'].hasnans
+
+    frequencia = banco.executar_consulta('frequencia_compras_clientes')
+    assert frequencia['idcliente'].notna().all()
+    assert frequencia['idcliente'].dtype == 'int64'
+    esperado = analises.calcular_frequencia_compras(itens)
+    assert dict(zip(frequencia['idcliente'], frequencia['frequenciacompras'])) == esperado.to_dict()
+
+    top = banco.executar_consulta('top_clientes')
+    assert top['idcliente'].dtype == 'int64'
+    esperado = itens.groupby('IDCliente')['ValorTotal'].sum().sort_values(ascending=False, kind='stable')[:10]
+    assert top['idcliente'].tolist() == esperado.index.tolist()
+    assert top['totalgasto'].tolist() == pytest.approx(esperado.tolist())
+
+    unicos = banco.executar_consulta('clientes_unicos')['clientesunicos'].iloc[0]
+    assert unicos == analises.calcular_clientes_unicos(itens)
+
+
+def test_receita_por_pais_ignora_itens_sem_pais(diretorio_dados):
+    fatos = carregar_fatos()
+    assert fatos['Pais'].isna().any()
+    receita = banco.executar_consulta('receita_por_pais').set_index('pais')['receita']
+    assert receita.index.notna().all()
+    esperado = analises.calcular_receita_por_pais(fatos)
+    esperado.index = esperado.index.astype(str)
+    pd.testing.assert_series_equal(receita.sort_index(), esperado.sort_index(), check_names=False, check_index_type=False)
+
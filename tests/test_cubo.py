@@ -0,0 +1,73 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import construir_cubo
+from filtros import FAIXAS_PRECO
+
+PERIODOS = [(None, None), ('2011-02-01', '2011-05-31')]
+FILTROS = [
+    {},
+    {'pais': 'Germany'},
+    {'categoria': 'Festas', 'faixa_preco': FAIXAS_PRECO[1]},
+    {'pais': 'United Kingdom', 'faixa_preco': FAIXAS_PRECO[2]},
+    {'pais': 'Brasil'},
+]
+
+
+@pytest.fixture(scope='module')
+def cubo(tabelas):
+    return construir_cubo(tabelas[0])
+
+
+def _filtrar(fatos, inicio=None, fim=None, pais=None, categoria=None, faixa_preco=None):
+    dias = fatos['DataFatura'].dt.normalize()
+    preco = fatos['PrecoUnitario']
+    filtro = pd.Series(True, index=fatos.index)
+    if inicio is not None:
+        filtro &= dias >= pd.Timestamp(inicio)
+    if fim is not None:
+        filtro &= dias <= pd.Timestamp(fim)
+    if pais is not None:
+        filtro &= fatos['Pais'] == pais
+    if categoria is not None:
+        filtro &= fatos['Categoria'] == categoria
+    if faixa_preco is not None:
+        filtro &= {
+            FAIXAS_PRECO[0]: preco < 5, FAIXAS_PRECO[1]: (preco >= 5) & (preco <= 20), FAIXAS_PRECO[2]: preco > 20,
+        }[faixa_preco]
+    return fatos[filtro]
+
+
+@pytest.mark.parametrize('periodo, filtros', list(product(PERIODOS, FILTROS)))
+def test_series_do_cubo_iguais_ao_groupby(tabelas, cubo, periodo, filtros):
+    inicio, fim = periodo
+    filtrado = _filtrar(tabelas[0], inicio, fim, **filtros)
+    datas = filtrado['DataFatura']
+    valor = filtrado['ValorTotal']
+
+    assert cubo.receita_total(inicio=inicio, fim=fim, **filtros) == pytest.approx(valor.sum())
+    diaria = valor.groupby(datas.dt.date).sum()
+    np.testing.assert_array_equal(cubo.receita_diaria(inicio=inicio, fim=fim, **filtros).index, diaria.index)
+    np.testing.assert_allclose(cubo.receita_diaria(inicio=inicio, fim=fim, **filtros), diaria)
+    mensal = valor.groupby(datas.dt.to_period('M')).sum()
+    pd.testing.assert_series_equal(cubo.receita_mensal(inicio=inicio, fim=fim, **filtros), mensal, check_names=False)
+    sazonal = valor.groupby(datas.dt.month).sum()
+    pd.testing.assert_series_equal(cubo.variacao_sazonal(inicio=inicio, fim=fim, **filtros), sazonal,
+                                   check_names=False, check_index_type=False)
+    por_pais = valor.groupby(filtrado['Pais'], observed=True).sum()
+    pd.testing.assert_series_equal(cubo.receita_por_pais(inicio=inicio, fim=fim, **filtros), por_pais, check_names=False)
+
+
+def test_pais_nulo_fica_fora_da_receita_por_pais(tabelas, cubo):
+    fatos = tabelas[0]
+    sem_pais = fatos.loc[fatos['Pais'].isna(), 'ValorTotal'].sum()
+    assert sem_pais != 0
+    # Entra no total sem filtro de país, mas em nenhum país
+    assert cubo.receita_total() == pytest.approx(fatos['ValorTotal'].sum())
+    assert cubo.receita_por_pais().sum() == pytest.approx(fatos['ValorTotal'].sum() - sem_pais)
+    assert cubo.receita_por_pais().index.notna().all()
+    for pais in fatos['Pais'].cat.categories:
+        assert cubo.receita_total(pais=pais) == pytest.approx(fatos.loc[fatos['Pais'] == pais, 'ValorTotal'].sum())
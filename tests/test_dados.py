@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import analises
+from dados import _tipar_itens_fatura
+from memoria_compartilhada import gravar_arrow, mapear_arrow
+
+
+def _itens_brutos():
+    return pd.DataFrame({
+        'NumeroFatura': ['536365', '536365', '536366', '536367', '536368'],
+        'CodigoProduto': ['85123A', '71053', '22633', '84879', '22960'],
+        'IDCliente': [17850.0, 17850.0, np.nan, 13047.0, np.nan],
+        'DataFatura': ['2010-12-01 08:26', '2010-12-01 08:26', '2010-12-01 08:28', '2010-12-01 08:34', 'inválida'],
+        'Quantidade': [6, 6, 6, 32, 3],
+        'ValorTotal': [15.3, 20.34, 11.1, 54.08, 12.75],
+        'Venda': [True, True, True, True, True],
+        'Devolucao': [False, False, False, False, False],
+    })
+
+
+def test_itens_sem_cliente_entram_na_receita_e_nao_nas_metricas_por_cliente():
+    itens = _tipar_itens_fatura(_itens_brutos())
+    # Só a linha sem data válida é descartada
+    assert len(itens) == 4
+    assert str(itens['IDCliente'].dtype) == 'Int64'
+    assert analises.calcular_receita_total(itens) == 15.3 + 20.34 + 11.1 + 54.08
+    assert analises.calcular_numero_transacoes(itens) == 3
+    assert analises.calcular_clientes_unicos(itens) == 2
+    assert analises.calcular_frequencia_compras(itens).to_dict() == {13047: 1, 17850: 2}
+    assert sorted(analises.calcular_top_clientes(itens)['IDCliente']) == ['13047', '17850']
+
+
+def test_mapear_arrow_preserva_inteiros_com_nulos(tmp_path):
+    itens = _tipar_itens_fatura(_itens_brutos()).reset_index(drop=True)
+    caminho = str(tmp_path / 'itens.arrow')
+    gravar_arrow(itens, caminho)
+    mapeado = mapear_arrow(caminho)
+    pd.testing.assert_frame_equal(mapeado, itens)
+    # Valores lidos do arquivo, sem cópia
+    assert not mapeado['IDCliente'].array._data.flags.writeable
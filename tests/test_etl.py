@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+import etl
+from dados_sinteticos import gerar_csv
+
+
+def test_carga_mantem_linhas_da_fonte_e_reprocessar_nao_anexa(tmp_path):
+    fonte = str(tmp_path / 'online_retail.csv')
+    gerar_csv(fonte, 5000, semente=1)
+    bruto = pd.read_csv(fonte)
+    # Mesma fatura e produto com outra quantidade, no fim do arquivo (em outro bloco)
+    repetidas = bruto[bruto['CustomerID'].notna() & (bruto['UnitPrice'] > 0)].iloc[::250].head(20).copy()
+    repetidas['Quantity'] += np.where(repetidas['Quantity'] > 0, 1, -1)
+    pd.concat([bruto, repetidas]).to_csv(fonte, index=False)
+    esperado = len(etl.limpar(pd.read_csv(fonte)))
+
+    saida = str(tmp_path / 'saida')
+    primeira = etl.processar_fonte(fonte, saida, tamanho_bloco=1000)
+    assert primeira['blocos'] == 6
+    assert primeira['itens_novos'] == esperado
+    assert len(etl.ler_itens(saida)) == esperado
+
+    segunda = etl.processar_fonte(fonte, saida, tamanho_bloco=1000)
+    assert segunda['itens_novos'] == 0
+    assert len(etl.ler_itens(saida)) == esperado
@@ -0,0 +1,55 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtros import FAIXAS_PRECO, MotorFiltros
+
+PERIODOS = [(None, None), ('2011-03-01', '2011-06-30'), ('2011-01-10', '2011-01-10'), (None, '2010-12-31')]
+PAISES = [None, 'Germany', 'United Kingdom', 'Brasil']
+CATEGORIAS = [None, 'Festas', 'Cozinha']
+FAIXAS = [None] + FAIXAS_PRECO
+
+
+# Máscaras booleanas do dashboard original
+def _mascara(fatos, inicio, fim, pais, categoria, faixa_preco):
+    dias = fatos['DataFatura'].dt.date
+    filtro = pd.Series(True, index=fatos.index)
+    if inicio is not None:
+        filtro &= dias >= pd.Timestamp(inicio).date()
+    if fim is not None:
+        filtro &= dias <= pd.Timestamp(fim).date()
+    if pais is not None:
+        filtro &= fatos['Pais'] == pais
+    if categoria is not None:
+        filtro &= fatos['Categoria'] == categoria
+    preco = fatos['PrecoUnitario']
+    if faixa_preco == FAIXAS_PRECO[0]:
+        filtro &= preco < 5
+    elif faixa_preco == FAIXAS_PRECO[1]:
+        filtro &= (preco >= 5) & (preco <= 20)
+    elif faixa_preco == FAIXAS_PRECO[2]:
+        filtro &= preco > 20
+    return filtro.to_numpy()
+
+
+@pytest.fixture(scope='module')
+def motor(tabelas):
+    return MotorFiltros(tabelas[0])
+
+
+def test_fixture_cobre_limites_de_preco_e_pais_nulo(tabelas):
+    fatos = tabelas[0]
+    assert {4.99, 5.0, 20.0, 20.01} <= set(fatos['PrecoUnitario'])
+    assert fatos['Pais'].isna().any()
+
+
+@pytest.mark.parametrize('periodo, pais, categoria, faixa_preco', list(product(PERIODOS, PAISES, CATEGORIAS, FAIXAS)))
+def test_filtrar_igual_as_mascaras(tabelas, motor, periodo, pais, categoria, faixa_preco):
+    fatos = tabelas[0]
+    inicio, fim = periodo
+    filtrado = motor.filtrar(inicio, fim, pais, categoria, faixa_preco)
+    esperado = fatos[_mascara(fatos, inicio, fim, pais, categoria, faixa_preco)]
+    np.testing.assert_array_equal(filtrado.index.to_numpy(), esperado.index.to_numpy())
+    pd.testing.assert_frame_equal(filtrado, esperado)
@@ -0,0 +1,45 @@
+import inspect
+
+import pandas as pd
+import pytest
+
+import analises
+from filtros import FAIXAS_PRECO, obter_motor
+
+COMBINACOES = [
+    {},
+    {'pais': 'Germany'},
+    {'categoria': 'Festas', 'faixa_preco': FAIXAS_PRECO[0]},
+    {'inicio': '2011-03-01', 'fim': '2011-06-30', 'pais': 'United Kingdom'},
+    # Seleção vazia
+    {'pais': 'Brasil'},
+]
+
+
+def _referencia(nome, itens, produtos, inicio, fim):
+    funcao = getattr(analises, f'calcular_{nome}')
+    valores = {'itens_fatura': itens, 'produtos': produtos, 'start_date': inicio, 'end_date': fim}
+    return funcao(**{parametro: valores[parametro] for parametro in inspect.signature(funcao).parameters
+                     if parametro in valores})
+
+
+@pytest.mark.parametrize('filtros', COMBINACOES)
+def test_indicadores_iguais_as_funcoes_individuais(tabelas, filtros):
+    fatos, produtos = tabelas
+    itens = obter_motor(fatos).filtrar(**filtros)
+    inicio, fim = filtros.get('inicio'), filtros.get('fim')
+    indicadores = analises.calcular_indicadores(itens, produtos, inicio, fim)
+
+    nomes = {nome[len('calcular_'):] for nome in dir(analises)
+             if nome.startswith('calcular_') and nome != 'calcular_indicadores'}
+    assert set(indicadores) == nomes
+    for nome, valor in indicadores.items():
+        esperado = _referencia(nome, itens, produtos, inicio, fim)
+        if isinstance(esperado, pd.DataFrame):
+            pd.testing.assert_frame_equal(valor, esperado, obj=nome)
+        elif isinstance(esperado, pd.Series):
+            pd.testing.assert_series_equal(valor, esperado, obj=nome)
+        elif pd.isna(esperado):
+            assert pd.isna(valor), nome
+        else:
+            assert valor == pytest.approx(esperado), nome
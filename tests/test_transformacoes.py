@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from transformacoes import categorize_price, categorizar_precos, limpar_descricao, limpar_descricoes, marcar_devolucoes
+
+
+def test_limpar_descricoes_igual_ao_notebook():
+    descricoes = pd.Series(
+        ['WHITE HANGING HEART T-LIGHT HOLDER', np.nan, 'Set/3 Cake Tins 50\'s', np.nan, '', 'WHITE HANGING HEART T-LIGHT HOLDER'],
+        index=[10, 11, 12, 13, 14, 15], name='Descricao', dtype=object,
+    )
+    esperado = descricoes.map(limpar_descricao, na_action='ignore')
+    pd.testing.assert_series_equal(limpar_descricoes(descricoes), esperado)
+
+
+def test_limpar_descricoes_so_ausentes():
+    descricoes = pd.Series([np.nan, np.nan], name='Descricao', dtype=object)
+    pd.testing.assert_series_equal(limpar_descricoes(descricoes), descricoes)
+
+
+def test_marcar_devolucoes_igual_ao_notebook():
+    quantidades = pd.Series([6, -1, 0, -24, 12], name='Quantidade')
+    devolucao, venda = marcar_devolucoes(quantidades)
+    pd.testing.assert_series_equal(devolucao, quantidades.apply(lambda quantidade: quantidade < 0))
+    pd.testing.assert_series_equal(venda, quantidades.apply(lambda quantidade: quantidade >= 0))
+
+
+def test_categorizar_precos_igual_ao_notebook():
+    # Inclui os limites exatos (5 e 20) e preços negativos e ausentes
+    precos = pd.Series([0.42, 4.99, 5.0, 5.01, 19.99, 20.0, 20.01, 165.0, -11.06, np.nan],
+                       index=range(100, 110), name='PrecoUnitario')
+    esperado = precos.apply(categorize_price)
+    pd.testing.assert_series_equal(categorizar_precos(precos), esperado)
@@ -0,0 +1,35 @@
+import os
+
+import pandas as pd
+import pytest
+
+import banco
+import visoes
+
+
+def test_visoes_iguais_as_consultas_do_banco(diretorio_dados, monkeypatch):
+    monkeypatch.setattr(visoes, 'DIRETORIO_CACHE', str(diretorio_dados / 'cache'))
+    monkeypatch.setattr(visoes, 'CAMINHO_ESTADO', str(diretorio_dados / 'cache' / 'visoes.sqlite'))
+    destino_visoes = str(diretorio_dados / 'visoes')
+    destino_banco = str(diretorio_dados / 'banco')
+    visoes.atualizar(destino_visoes, trabalhadores=2, caminho_tempos=str(diretorio_dados / 'tempos.json'))
+    nomes = banco.regenerar_csvs(destino_banco)
+
+    assert sorted(nomes) == sorted(visoes.VISOES)
+    for nome in nomes:
+        esperado = pd.read_csv(os.path.join(destino_banco, nome + '.csv'))
+        obtido = pd.read_csv(os.path.join(destino_visoes, nome + '.csv'))
+        pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, obj=nome)
+
+
+@pytest.mark.parametrize('coluna, nomes', [
+    ('idcliente', ['top_clientes', 'frequencia_compras_clientes']),
+    ('pais', ['receita_por_pais']),
+])
+def test_visoes_sem_grupo_nulo(diretorio_dados, monkeypatch, coluna, nomes):
+    monkeypatch.setattr(visoes, 'DIRETORIO_CACHE', str(diretorio_dados / 'cache'))
+    monkeypatch.setattr(visoes, 'CAMINHO_ESTADO', str(diretorio_dados / 'cache' / 'visoes.sqlite'))
+    destino = str(diretorio_dados / 'visoes')
+    visoes.atualizar(destino, trabalhadores=2, caminho_tempos=str(diretorio_dados / 'tempos.json'))
+    for nome in nomes:
+        assert pd.read_csv(os.path.join(destino, nome + '.csv'))[coluna].notna().all()
@@ -0,0 +1,54 @@
+# Transformações de limpeza do ETL
+# Versões vetorizadas das funções aplicadas linha a linha nos notebooks. A limpeza de
+# descrições roda apenas sobre as descrições distintas (alguns milhares) e o resultado é
+# espalhado de volta para as linhas pelos códigos do factorize. As faixas de preço usam
+# os mesmos limites do filtro de preço do dashboard.
+import re
+
+import numpy as np
+import pandas as pd
+
+from filtros import LIMITE_BARATO, LIMITE_CARO
+
+CATEGORIAS_PRECO = ['Barato', 'Moderado', 'Caro']
+PADRAO_DESCRICAO = r'[^a-z\s]'
+
+
+# Funções originais dos notebooks, mantidas como referência
+def limpar_descricao(descricao):
+    descricao = descricao.lower()  # Converter para minúsculas
+    descricao = re.sub(PADRAO_DESCRICAO, '', descricao)  # Remover caracteres especiais e números
+    return descricao
+
+
+def categorize_price(price):
+    if price < LIMITE_BARATO:
+        return 'Barato'
+    elif price < LIMITE_CARO:
+        return 'Moderado'
+    else:
+        return 'Caro'
+
+
+def limpar_descricoes(descricoes):
+    codigos, distintas = pd.factorize(descricoes)
+    limpas = pd.Series(distintas, dtype=object).str.lower().str.replace(PADRAO_DESCRICAO, '', regex=True)
+    # Descrições ausentes (código -1) continuam ausentes
+    valores = np.where(codigos >= 0, limpas.to_numpy()[np.maximum(codigos, 0)] if len(limpas) else None, np.nan)
+    return pd.Series(valores, index=descricoes.index, name=descricoes.name)
+
+
+def marcar_devolucoes(quantidades):
+    devolucao = quantidades < 0
+    return devolucao, ~devolucao
+
+
+# Ao contrário do filtro do dashboard, o preço igual a LIMITE_CARO já é 'Caro', como no notebook
+def categorizar_precos(precos):
+    valores = np.asarray(precos, dtype='float64')
+    categorias = np.select(
+        [valores < LIMITE_BARATO, valores < LIMITE_CARO],
+        CATEGORIAS_PRECO[:2],
+        default=CATEGORIAS_PRECO[2],
+    )
+    return pd.Series(categorias.astype(object), index=precos.index, name=precos.name)
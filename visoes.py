@@ -0,0 +1,284 @@
+# Atualização das visões materializadas de consultas_SQL_CSV
+# Os catorze resultados formam um DAG: as tabelas de origem alimentam intermediárias
+# particionadas por mês (receita por dia, por cliente, por produto, por país e faturas),
+# e cada visão é uma consulta sobre uma ou mais intermediárias. Uma assinatura por mês
+# dos itens de fatura (e uma por tabela de dimensão) funciona como marca d'água: só os
+# meses alterados são recalculados nas intermediárias, e só as visões cujas entradas
+# mudaram são regravadas. Intermediárias e visões independentes rodam em paralelo, e o
+# tempo de cada etapa é gravado em JSON.
+#
+# Uso: python visoes.py [--destino consultas_SQL_CSV] [--trabalhadores 4] [--forcar]
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from banco import DIRETORIO_RESULTADOS
+from dados import DIRETORIO_CACHE, carregar_tabela
+
+CAMINHO_ESTADO = os.path.join(DIRETORIO_CACHE, 'visoes.sqlite')
+CAMINHO_TEMPOS = os.path.join(DIRETORIO_CACHE, 'tempos_visoes.json')
+COLUNAS_ITENS = ['NumeroFatura', 'CodigoProduto', 'IDCliente', 'DataFatura', 'Quantidade', 'ValorTotal', 'Devolucao']
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS marcas (fonte TEXT, particao TEXT, assinatura TEXT, PRIMARY KEY (fonte, particao));
+CREATE TABLE IF NOT EXISTS versoes (nome TEXT PRIMARY KEY, versao INTEGER);
+CREATE TABLE IF NOT EXISTS geradas (nome TEXT PRIMARY KEY, entradas TEXT);
+CREATE TABLE IF NOT EXISTS diario (mes TEXT, Dia TEXT, Receita REAL, Linhas INTEGER);
+CREATE TABLE IF NOT EXISTS cliente_mes (mes TEXT, IDCliente INTEGER, Receita REAL, Linhas INTEGER);
+CREATE TABLE IF NOT EXISTS produto_mes (mes TEXT, CodigoProduto TEXT, Quantidade INTEGER, QuantidadeDevolvida INTEGER, LinhasDevolucao INTEGER);
+CREATE TABLE IF NOT EXISTS pais_mes (mes TEXT, Pais TEXT, Receita REAL);
+CREATE TABLE IF NOT EXISTS faturas_mes (mes TEXT, NumeroFatura TEXT, Devolucao INTEGER);
+CREATE TABLE IF NOT EXISTS produtos (CodigoProduto TEXT PRIMARY KEY, Categoria TEXT);
+CREATE INDEX IF NOT EXISTS diario_mes ON diario (mes);
+CREATE INDEX IF NOT EXISTS cliente_mes_mes ON cliente_mes (mes);
+CREATE INDEX IF NOT EXISTS produto_mes_mes ON produto_mes (mes);
+CREATE INDEX IF NOT EXISTS pais_mes_mes ON pais_mes (mes);
+CREATE INDEX IF NOT EXISTS faturas_mes_mes ON faturas_mes (mes);
+"""
+
+
+# Intermediárias: recebem os itens dos meses a recalcular (com a coluna mes) e as dimensões.
+# Como em consultas_sql/, itens sem IDCliente ou sem país não formam um grupo de cliente
+# ou de país (o groupby descarta a chave nula, e as visões também filtram os nulos, caso
+# o estado tenha intermediárias antigas); continuam nas receitas, produtos e faturas.
+def _diario(itens, dimensoes):
+    return itens.groupby(['mes', itens['DataFatura'].dt.strftime('%Y-%m-%d').rename('Dia')]).agg(
+        Receita=('ValorTotal', 'sum'), Linhas=('ValorTotal', 'size'),
+    ).reset_index()
+
+
+def _cliente_mes(itens, dimensoes):
+    return itens.groupby(['mes', 'IDCliente'], dropna=True).agg(
+        Receita=('ValorTotal', 'sum'), Linhas=('ValorTotal', 'size'),
+    ).reset_index()
+
+
+def _produto_mes(itens, dimensoes):
+    devolucao = itens['Devolucao']
+    return itens.assign(
+        QuantidadeDevolvida=itens['Quantidade'].where(devolucao, 0),
+        LinhasDevolucao=devolucao.astype('int64'),
+    ).groupby(['mes', 'CodigoProduto'])[['Quantidade', 'QuantidadeDevolvida', 'LinhasDevolucao']].sum().reset_index()
+
+
+def _pais_mes(itens, dimensoes):
+    paises = dimensoes['clientes'].drop_duplicates(subset=['IDCliente']).set_index('IDCliente')['Pais'].astype(object)
+    pais = pd.Series(paises.reindex(itens['IDCliente']).to_numpy(), index=itens.index, name='Pais')
+    return itens.groupby(['mes', pais], dropna=True)['ValorTotal'].sum().rename('Receita').reset_index()
+
+
+def _faturas_mes(itens, dimensoes):
+    return itens.groupby(['mes', 'NumeroFatura'])['Devolucao'].max().astype('int64').reset_index()
+
+
+# nome -> (tabelas de origem, função)
+INTERMEDIARIAS = {
+    'diario': (['itens_fatura'], _diario),
+    'cliente_mes': (['itens_fatura'], _cliente_mes),
+    'produto_mes': (['itens_fatura'], _produto_mes),
+    'pais_mes': (['itens_fatura', 'clientes'], _pais_mes),
+    'faturas_mes': (['itens_fatura'], _faturas_mes),
+}
+
+# nome -> (entradas, SQL); os nomes e colunas são os mesmos de consultas_sql/
+VISOES = {
+    'receita_diaria': (['diario'], """
+        SELECT Dia AS dia, SUM(Receita) AS receitadiaria FROM diario GROUP BY Dia ORDER BY dia"""),
+    'receita_mensal': (['diario'], """
+        SELECT substr(Dia, 1, 7) || '-01' AS mes, SUM(Receita) AS receitamensal FROM diario GROUP BY 1 ORDER BY 1"""),
+    'analise_temporal': (['diario'], """
+        SELECT substr(Dia, 1, 4) || '-01-01' AS ano, SUM(Receita) AS vendasano FROM diario GROUP BY 1 ORDER BY 1"""),
+    'receita_total': (['diario'], """
+        SELECT SUM(Receita) AS receitatotal FROM diario"""),
+    'ticket_medio': (['diario'], """
+        SELECT SUM(Receita) / SUM(Linhas) AS ticketmedio FROM diario"""),
+    'top_clientes': (['cliente_mes'], """
+        SELECT IDCliente AS idcliente, SUM(Receita) AS totalgasto FROM cliente_mes WHERE IDCliente IS NOT NULL
+        GROUP BY IDCliente ORDER BY totalgasto DESC, idcliente LIMIT 10"""),
+    'frequencia_compras_clientes': (['cliente_mes'], """
+        SELECT IDCliente AS idcliente, SUM(Linhas) AS frequenciacompras FROM cliente_mes WHERE IDCliente IS NOT NULL
+        GROUP BY IDCliente ORDER BY frequenciacompras DESC, idcliente"""),
+    'clientes_unicos': (['cliente_mes'], """
+        SELECT COUNT(DISTINCT IDCliente) AS clientesunicos FROM cliente_mes"""),
+    'produtos_mais_vendidos': (['produto_mes'], """
+        SELECT CodigoProduto AS codigoproduto, SUM(Quantidade) AS totalvendido FROM produto_mes
+        GROUP BY CodigoProduto ORDER BY totalvendido DESC, codigoproduto LIMIT 10"""),
+    'produtos_mais_devolvidos': (['produto_mes'], """
+        SELECT CodigoProduto AS codigoproduto, SUM(QuantidadeDevolvida) AS totaldevolvido FROM produto_mes
+        GROUP BY CodigoProduto HAVING SUM(LinhasDevolucao) > 0 ORDER BY totaldevolvido DESC, codigoproduto LIMIT 10"""),
+    'produtos_melhor_desempenho_categoria': (['produto_mes', 'produtos'], """
+        SELECT p.Categoria AS categoria, m.CodigoProduto AS codigoproduto, SUM(m.Quantidade) AS totalvendido
+        FROM produto_mes m LEFT JOIN produtos p ON p.CodigoProduto = m.CodigoProduto
+        GROUP BY p.Categoria, m.CodigoProduto ORDER BY categoria, totalvendido DESC, codigoproduto"""),
+    'receita_por_pais': (['pais_mes'], """
+        SELECT Pais AS pais, SUM(Receita) AS receita FROM pais_mes WHERE Pais IS NOT NULL
+        GROUP BY Pais ORDER BY receita DESC"""),
+    'numeros_transacoes': (['faturas_mes'], """
+        SELECT COUNT(DISTINCT NumeroFatura) AS numerotransacoes FROM faturas_mes"""),
+    'devolucoes': (['faturas_mes'], """
+        SELECT COUNT(DISTINCT NumeroFatura) AS transacoesdevolucao FROM faturas_mes WHERE Devolucao"""),
+}
+
+
+# Assinatura de cada mês dos itens: soma (mod 2^64) dos hashes das linhas e contagem,
+# independente da ordem das linhas
+def assinaturas_mensais(itens, meses):
+    hashes = pd.util.hash_pandas_object(itens[COLUNAS_ITENS], index=False).to_numpy()
+    codigos, distintos = pd.factorize(meses, sort=True)
+    ordem = np.argsort(codigos, kind='stable')
+    inicios = np.flatnonzero(np.r_[True, np.diff(codigos[ordem]) != 0]) if len(ordem) else np.empty(0, dtype='int64')
+    somas = np.add.reduceat(hashes[ordem], inicios) if len(ordem) else np.empty(0, dtype='uint64')
+    contagens = np.diff(np.r_[inicios, len(ordem)])
+    return {mes: f'{soma}:{contagem}' for mes, soma, contagem in zip(distintos, somas, contagens)}
+
+
+def assinatura_tabela(df):
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return f'{np.add.reduce(hashes, dtype="uint64")}:{len(df)}'
+
+
+def _ler_marcas(conexao, fonte):
+    return dict(conexao.execute('SELECT particao, assinatura FROM marcas WHERE fonte = ?', (fonte,)).fetchall())
+
+
+def _gravar_marcas(conexao, fonte, marcas):
+    conexao.execute('DELETE FROM marcas WHERE fonte = ?', (fonte,))
+    conexao.executemany('INSERT INTO marcas VALUES (?, ?, ?)', [(fonte, particao, valor) for particao, valor in marcas.items()])
+
+
+def _incrementar_versao(conexao, nome):
+    conexao.execute(
+        'INSERT INTO versoes VALUES (?, 1) ON CONFLICT (nome) DO UPDATE SET versao = versao + 1', (nome,)
+    )
+
+
+def _versoes(conexao):
+    return dict(conexao.execute('SELECT nome, versao FROM versoes').fetchall())
+
+
+# Recalcula as intermediárias afetadas; devolve o tempo e os meses recalculados de cada uma
+def atualizar_intermediarias(conexao, trabalhadores=4, forcar=False):
+    itens = carregar_tabela('itens_fatura')[COLUNAS_ITENS]
+    dimensoes = {'clientes': carregar_tabela('clientes')[['IDCliente', 'Pais']]}
+    produtos = carregar_tabela('produtos').drop_duplicates(subset=['CodigoProduto'])[['CodigoProduto', 'Categoria']]
+    meses = itens['DataFatura'].dt.strftime('%Y-%m').to_numpy()
+
+    atuais = assinaturas_mensais(itens, meses)
+    anteriores = {} if forcar else _ler_marcas(conexao, 'itens_fatura')
+    meses_alterados = sorted(mes for mes in set(atuais) | set(anteriores) if atuais.get(mes) != anteriores.get(mes))
+    dimensoes_alteradas = set()
+    for nome, tabela in (('clientes', dimensoes['clientes']), ('produtos', produtos)):
+        assinatura = assinatura_tabela(tabela.astype(object))
+        if forcar or _ler_marcas(conexao, nome).get('*') != assinatura:
+            dimensoes_alteradas.add(nome)
+            _gravar_marcas(conexao, nome, {'*': assinatura})
+
+    tarefas = {}
+    for nome, (fontes, funcao) in INTERMEDIARIAS.items():
+        if forcar or any(fonte in dimensoes_alteradas for fonte in fontes):
+            tarefas[nome] = (funcao, None)
+        elif meses_alterados:
+            tarefas[nome] = (funcao, meses_alterados)
+
+    def calcular(nome):
+        funcao, particoes = tarefas[nome]
+        inicio = time.perf_counter()
+        selecionados = itens if particoes is None else itens[np.isin(meses, particoes)]
+        resultado = funcao(selecionados.assign(mes=meses if particoes is None else meses[np.isin(meses, particoes)]), dimensoes)
+        return resultado, time.perf_counter() - inicio
+
+    tempos = {}
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        resultados = dict(zip(tarefas, executor.map(calcular, tarefas)))
+    # A gravação é sequencial: o SQLite aceita um único escritor
+    for nome, (resultado, segundos) in resultados.items():
+        inicio = time.perf_counter()
+        particoes = tarefas[nome][1]
+        if particoes is None:
+            conexao.execute(f'DELETE FROM {nome}')
+        else:
+            conexao.executemany(f'DELETE FROM {nome} WHERE mes = ?', [(mes,) for mes in particoes])
+        resultado.to_sql(nome, conexao, if_exists='append', index=False)
+        _incrementar_versao(conexao, nome)
+        tempos[nome] = {
+            'segundos': round(segundos + time.perf_counter() - inicio, 4),
+            'meses': 'todos' if particoes is None else len(particoes),
+        }
+    if 'produtos' in dimensoes_alteradas:
+        conexao.execute('DELETE FROM produtos')
+        produtos.astype({'Categoria': object}).to_sql('produtos', conexao, if_exists='append', index=False)
+        _incrementar_versao(conexao, 'produtos')
+    _gravar_marcas(conexao, 'itens_fatura', atuais)
+    conexao.commit()
+    return tempos
+
+
+def _gerar_visao(nome, destino):
+    inicio = time.perf_counter()
+    with closing(sqlite3.connect(f'file:{CAMINHO_ESTADO}?mode=ro', uri=True)) as conexao:
+        resultado = pd.read_sql_query(VISOES[nome][1], conexao)
+    resultado.to_csv(os.path.join(destino, nome + '.csv'), index=False)
+    return {'segundos': round(time.perf_counter() - inicio, 4), 'linhas': len(resultado)}
+
+
+# Regrava as visões cujas entradas mudaram desde a última geração (ou cujo CSV não existe)
+def atualizar_visoes(conexao, destino=DIRETORIO_RESULTADOS, trabalhadores=4):
+    os.makedirs(destino, exist_ok=True)
+    versoes = _versoes(conexao)
+    geradas = dict(conexao.execute('SELECT nome, entradas FROM geradas').fetchall())
+    entradas = {
+        nome: json.dumps({entrada: versoes.get(entrada, 0) for entrada in dependencias})
+        for nome, (dependencias, _) in VISOES.items()
+    }
+    pendentes = [
+        nome for nome in VISOES
+        if geradas.get(nome) != entradas[nome] or not os.path.exists(os.path.join(destino, nome + '.csv'))
+    ]
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        tempos = dict(zip(pendentes, executor.map(lambda nome: _gerar_visao(nome, destino), pendentes)))
+    conexao.executemany('INSERT OR REPLACE INTO geradas VALUES (?, ?)', [(nome, entradas[nome]) for nome in pendentes])
+    conexao.commit()
+    return {nome: tempos.get(nome, {'segundos': 0.0, 'atualizada': False}) | {'atualizada': nome in tempos} for nome in VISOES}
+
+
+def atualizar(destino=DIRETORIO_RESULTADOS, trabalhadores=4, forcar=False, caminho_tempos=CAMINHO_TEMPOS):
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    inicio = time.perf_counter()
+    with closing(sqlite3.connect(CAMINHO_ESTADO)) as conexao:
+        conexao.executescript(ESQUEMA)
+        if forcar:
+            conexao.execute('DELETE FROM geradas')
+        intermediarias = atualizar_intermediarias(conexao, trabalhadores, forcar)
+        visoes = atualizar_visoes(conexao, destino, trabalhadores)
+    relatorio = {
+        'execucao': datetime.now().isoformat(timespec='seconds'),
+        'segundos': round(time.perf_counter() - inicio, 4),
+        'intermediarias': intermediarias,
+        'visoes': visoes,
+    }
+    with open(caminho_tempos, 'w') as arquivo:
+        json.dump(relatorio, arquivo, indent=2)
+    return relatorio
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Atualiza as visões materializadas de consultas_SQL_CSV.')
+    parser.add_argument('--destino', default=DIRETORIO_RESULTADOS)
+    parser.add_argument('--trabalhadores', type=int, default=4)
+    parser.add_argument('--forcar', action='store_true', help='recalcular tudo, ignorando as marcas d\'água')
+    parser.add_argument('--tempos', default=CAMINHO_TEMPOS, help='arquivo JSON com o tempo de cada etapa')
+    args = parser.parse_args()
+    relatorio = atualizar(args.destino, args.trabalhadores, args.forcar, args.tempos)
+    for nome, tempo in relatorio['intermediarias'].items():
+        print(f"{nome:<40} {tempo['segundos']:>8.3f} s  meses: {tempo['meses']}")
+    for nome, tempo in sorted(relatorio['visoes'].items(), key=lambda item: -item[1]['segundos']):
+        print(f"{nome:<40} {tempo['segundos']:>8.3f} s  {'atualizada' if tempo['atualizada'] else 'inalterada'}")
+    print(f"Total: {relatorio['segundos']:.3f} s")